@@ -0,0 +1,112 @@
+import sys
+import tempfile
+import time
+
+MODULES_PATH = "Modules/"
+
+sys.path.append(MODULES_PATH)
+
+
+
+import MediaWiki
+from MediaWiki import Fetch_Wikipedia_Category_Tree, Save_Wikipedia_Tree_Flat_To_Files, Save_Wikipedia_Tree_To_Corpus_Store
+from MediaWiki_Stand_In import MediaWikiStandIn, Generate_Fixture_Corpus
+from Http_Client import Get_Http_Client
+from urllib.parse import urlsplit
+
+
+
+
+# Corpus de test
+NB_ROOT_CATEGORIES = 5
+MAX_RECURSION_LEVEL = 2
+SUBCATEGORIES_PER_CATEGORY = 3
+PAGES_PER_CATEGORY = 20
+
+# Comportement du stand-in
+LATENCY = 0.02          # secondes par requête
+ERROR_RATE = 0.02       # proportion de réponses 503
+MAXLAG_RATE = 0.02      # proportion de réponses maxlag
+RATE_LIMIT = None       # requêtes/s au-delà desquelles le stand-in répond 429
+
+# Crawler
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 50.0
+SAVE_MODE = "Flat"      # "Flat" ou "Corpus_Store"
+
+# Échoue (code de sortie 1) si le débit descend sous ce seuil ; None pour désactiver
+MIN_PAGES_PER_SECOND = None
+
+
+
+
+def Run_Stage(Name, Stand_In, Function, *Args, **Kwargs):
+    """
+    Exécute une étape du crawler contre le stand-in et mesure son débit.
+    """
+    Client = Get_Http_Client()
+    Client.Reset_Stats()
+    Counters_Before = Stand_In.Get_Counters()
+    Start = time.perf_counter()
+    Result = Function(*Args, **Kwargs)
+    Elapsed = time.perf_counter() - Start
+    Counters_After = Stand_In.Get_Counters()
+
+    Client_Stats = Client.Get_Stats().get(urlsplit(Stand_In.Url).netloc, {})
+    Report = {Key: Counters_After[Key] - Counters_Before[Key] for Key in Counters_After}
+    Report["elapsed_s"] = Elapsed
+    Report["requests_per_s"] = Report["requests"] / Elapsed
+    Report["retries"] = Client_Stats.get("retries", 0)
+    Report["mean_latency_ms"] = Client_Stats.get("mean_latency_ms", 0.0)
+    print(f"[{Name}] {Elapsed:.2f} s, {Report['requests']} requests ({Report['requests_per_s']:.1f} req/s), "
+          f"{Report['retries']} retries, injected: {Report['errors_injected']} errors, "
+          f"{Report['maxlag_injected']} maxlag, {Report['throttled']} throttled")
+    return Result, Report
+
+
+def Run_Crawler_Benchmark():
+    Corpus = Generate_Fixture_Corpus(
+        Nb_Root_Categories=NB_ROOT_CATEGORIES,
+        Depth=MAX_RECURSION_LEVEL,
+        Subcategories_Per_Category=SUBCATEGORIES_PER_CATEGORY,
+        Pages_Per_Category=PAGES_PER_CATEGORY
+    )
+    print(f"Fixture corpus: {len(Corpus['categories'])} categories, {len(Corpus['pages'])} pages")
+
+    with MediaWikiStandIn(Corpus, Latency=LATENCY, Error_Rate=ERROR_RATE, Maxlag_Rate=MAXLAG_RATE,
+                          Rate_Limit=RATE_LIMIT) as Stand_In:
+        MediaWiki.WIKI_API_ENDPOINT = Stand_In.Url
+
+        Roots = [f"Root category {Index + 1}" for Index in range(NB_ROOT_CATEGORIES)]
+        Crawl_Stats = {}
+        Tree, Crawl_Report = Run_Stage(
+            "Category tree", Stand_In, Fetch_Wikipedia_Category_Tree,
+            Roots,
+            Max_Recursion_Level=MAX_RECURSION_LEVEL,
+            Max_Workers=MAX_WORKERS,
+            Requests_Per_Second=REQUESTS_PER_SECOND,
+            Crawl_Stats=Crawl_Stats
+        )
+        Crawl_Report.update(Crawl_Stats)
+
+        with tempfile.TemporaryDirectory() as Output_Folder:
+            Saver = Save_Wikipedia_Tree_Flat_To_Files if SAVE_MODE == "Flat" else Save_Wikipedia_Tree_To_Corpus_Store
+            _, Save_Report = Run_Stage(
+                "Save pages", Stand_In, Saver,
+                Tree, Output_Folder, Delay_Between_Requests=0.0
+            )
+
+    Nb_Pages = len(MediaWiki.Collect_Tree_Pages(Tree))
+    Total_Elapsed = Crawl_Report["elapsed_s"] + Save_Report["elapsed_s"]
+    Pages_Per_Second = Nb_Pages / Total_Elapsed
+    print(f"✅ {Nb_Pages} pages in {Total_Elapsed:.2f} s : {Pages_Per_Second:.1f} pages/s")
+    return {"pages": Nb_Pages, "pages_per_s": Pages_Per_Second, "crawl": Crawl_Report, "save": Save_Report}
+
+
+
+
+if __name__ == "__main__":
+    Results = Run_Crawler_Benchmark()
+    if MIN_PAGES_PER_SECOND is not None and Results["pages_per_s"] < MIN_PAGES_PER_SECOND:
+        print(f"❌ Throughput below {MIN_PAGES_PER_SECOND} pages/s")
+        sys.exit(1)
@@ -0,0 +1,67 @@
+import sys
+
+MODULES_PATH = "Modules/"
+
+sys.path.append(MODULES_PATH)
+
+
+
+from Distributed_Embedding import Finalize_Embedding_Job, Init_Embedding_Job, Run_Embedding_Worker, Run_Local_Workers
+
+
+
+
+# Étape lancée (ou premier argument de la ligne de commande) :
+#   "init"     : prépare le job sur le système de fichiers partagé (une seule fois)
+#   "worker"   : lance un worker sur cet hôte (autant d'hôtes que voulu, sur le même JOB_FOLDER)
+#   "finalize" : assemble les shards dans EMBEDDINGS_FILE et construit l'index Annoy
+#   "local"    : les trois étapes sur cette machine, avec NB_LOCAL_WORKERS processus
+MODE = sys.argv[1] if len(sys.argv) > 1 else "local"
+# Dossier partagé entre les hôtes (NFS, ...) : job.json, shards/, leases/, done/
+JOB_FOLDER = "Embeddings/job"
+CHUNK_STORE_FOLDER = "Chunks/chunk_store"
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+EMBEDDING_BACKEND = "PyTorch"
+QUANTIZE_EMBEDDINGS = False
+EMBEDDINGS_DTYPE = "float32"
+SHARD_SIZE = 20000
+BATCH_SIZE_EMBEDDING = 64
+TOKEN_BUDGET_EMBEDDING = 16384
+# Un bail non rafraîchi depuis LEASE_SECONDS (worker mort) est repris par un autre worker
+LEASE_SECONDS = 600
+NB_LOCAL_WORKERS = 2
+EMBEDDINGS_FILE = "Embeddings/embeddings.npy"
+INDEX_FILE = "Annoy_Index/wikipedia_index.ann"
+NUM_TREES = 100
+
+
+
+
+def Init_Job():
+    Init_Embedding_Job(JOB_FOLDER, CHUNK_STORE_FOLDER, EMBEDDING_MODEL, Shard_Size=SHARD_SIZE, Dtype=EMBEDDINGS_DTYPE,
+                       Backend=EMBEDDING_BACKEND, Quantize=QUANTIZE_EMBEDDINGS, Batch_Size=BATCH_SIZE_EMBEDDING,
+                       Token_Budget=TOKEN_BUDGET_EMBEDDING)
+
+
+def Finalize_Job():
+    Finalize_Embedding_Job(JOB_FOLDER, EMBEDDINGS_FILE, Index_Path=INDEX_FILE, Num_Trees=NUM_TREES)
+
+
+
+
+if __name__ == "__main__":
+    if MODE == "init":
+        Init_Job()
+    elif MODE == "worker":
+        Run_Embedding_Worker(JOB_FOLDER, Lease_Seconds=LEASE_SECONDS)
+    elif MODE == "finalize":
+        Finalize_Job()
+    elif MODE == "local":
+        Init_Job()
+        if any(Exit_Code != 0 for Exit_Code in Run_Local_Workers(JOB_FOLDER, Nb_Workers=NB_LOCAL_WORKERS, Lease_Seconds=LEASE_SECONDS)):
+            print("❌ A local worker failed")
+            sys.exit(1)
+        Finalize_Job()
+    else:
+        print(f"[Error] Unknown mode {MODE} (expected init, worker, finalize or local)")
+        sys.exit(1)
@@ -0,0 +1,87 @@
+import sys
+
+MODULES_PATH = "Modules/"
+
+sys.path.append(MODULES_PATH)
+
+
+
+import numpy as np
+
+from Chunking import Create_Text_Splitter
+from Embeddings_Chunks import Count_Cores, Create_Embedder, Embed_Chunks, Embed_Chunks_Parallel
+from Splitter_Benchmark import Load_Texts
+
+
+
+
+# Chunks embeddés : échantillon du corpus (dossier de .txt ou corpus compacté, corpus de test sinon)
+DATA_FOLDER_PATH = "Data_Clean"
+NB_CHUNKS = 512
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+# Modes comparés : batches fixes dans l'ordre du corpus, puis batches triés sous un budget de tokens
+BATCH_SIZE = 64
+TOKEN_BUDGET = 16384
+# Nombres de processus comparés pour le passage à l'échelle (None : jusqu'au nombre de cœurs)
+NB_PROCESSES_LIST = None
+
+
+
+
+def Load_Sample_Chunks():
+    Texts = Load_Texts(DATA_FOLDER_PATH)
+    Chunks = Create_Text_Splitter(CHUNK_SIZE, CHUNK_OVERLAP).create_documents(Texts)
+    # Échantillon réparti sur tout le corpus (longueurs variées : fins d'articles, sections courtes)
+    Step = max(1, len(Chunks) // NB_CHUNKS)
+    return Chunks[::Step][:NB_CHUNKS]
+
+
+def Run_Embedding_Benchmark():
+    Chunks = Load_Sample_Chunks()
+    Embedder = Create_Embedder(Embedding_Model=EMBEDDING_MODEL)
+    print(f"{len(Chunks)} chunks, model {EMBEDDING_MODEL}")
+
+    Reports = {}
+    Results = {}
+    for Name, Kwargs in (("Fixed", {"batch_size": BATCH_SIZE}), ("Token_Budget", {"token_budget": TOKEN_BUDGET})):
+        Reports[Name] = {}
+        Results[Name] = np.asarray(Embed_Chunks(Chunks, Embedder, embedding_stats=Reports[Name], **Kwargs), dtype=np.float32)
+        print(f"[{Name}] {Reports[Name]['elapsed_s']:.2f} s, {Reports[Name]['chunks_per_s']:.1f} chunks/s, "
+              f"padding {100 * Reports[Name]['padding_ratio']:.1f} %")
+
+    # Les vecteurs du mode trié doivent revenir dans l'ordre d'origine
+    Max_Difference = float(np.abs(Results["Fixed"] - Results["Token_Budget"]).max())
+    print(f"Max difference between modes: {Max_Difference:.2e}")
+    print(f"Speedup: x{Reports['Fixed']['elapsed_s'] / Reports['Token_Budget']['elapsed_s']:.2f}")
+    return Reports, Max_Difference
+
+
+def Run_Scaling_Benchmark():
+    """
+    Débit du pool d'embedding pour plusieurs nombres de processus, comparé au processus unique.
+    """
+    Chunks = Load_Sample_Chunks()
+    Nb_Processes_List = NB_PROCESSES_LIST or [N for N in (1, 2, 4, 8, 16, 32, 64) if N < Count_Cores()] + [Count_Cores()]
+    Reports = {}
+    Reference = None
+    for Nb_Processes in Nb_Processes_List:
+        Reports[Nb_Processes] = {}
+        Embeddings = np.asarray(Embed_Chunks_Parallel(Chunks, EMBEDDING_MODEL, nb_workers=Nb_Processes, token_budget=TOKEN_BUDGET,
+                                                      embedding_stats=Reports[Nb_Processes]), dtype=np.float32)
+        Reference = Embeddings if Reference is None else Reference
+        Speedup = Reports[Nb_Processes_List[0]]["elapsed_s"] / Reports[Nb_Processes]["elapsed_s"]
+        print(f"[{Nb_Processes} process(es)] {Reports[Nb_Processes]['chunks_per_s']:.1f} chunks/s, speedup x{Speedup:.2f}, "
+              f"efficiency {100 * Speedup / Nb_Processes:.0f} %, max difference {np.abs(Embeddings - Reference).max():.2e}")
+    return Reports
+
+
+
+
+if __name__ == "__main__":
+    _, Max_Difference = Run_Embedding_Benchmark()
+    Run_Scaling_Benchmark()
+    if Max_Difference > 1e-3:
+        print("❌ Embeddings differ between batching modes")
+        sys.exit(1)
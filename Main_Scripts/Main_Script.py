@@ -1,3 +1,4 @@
+import os
 import sys 
 
 MODULES_PATH = "Modules/"
@@ -7,6 +8,7 @@ sys.path.append(MODULES_PATH)
 
 
 from Wikipedia_Rag import WikipediaRAG
+from MediaWiki import Fetch_Wikipedia_Category_Tree, Collect_Tree_Pages
 
 
 
@@ -15,70 +17,190 @@ from Wikipedia_Rag import WikipediaRAG
 
 
 #
-CHUNKING = True
-EMBEDDING_CHUNKS = True
-SAVE_EMBEDDINGS = EMBEDDING_CHUNKS and True
-LOAD_EMBEDDINGS = not EMBEDDING_CHUNKS and True
-CREATE_ANNOY_INDEX = True
+# PIPELINE_MODE : téléchargement, nettoyage, découpage, embedding et index en flux
+# (files bornées, mémoire constante) au lieu des étapes successives ci-dessous
+PIPELINE_MODE = False
+# INCREMENTAL : seuls les articles ajoutés ou modifiés sont redécoupés et ré-embeddés
+INCREMENTAL = False
+CLEANING = not PIPELINE_MODE and True
+CHUNKING = not PIPELINE_MODE and True
+# DEDUPLICATE : retire les chunks en double (exacts et quasi-doublons) avant l'embedding
+DEDUPLICATE = CHUNKING and True
+# EMBEDDING_CHUNKS : embedde les chunks par shards écrits sur disque au fil du calcul.
+# RESUME_EMBEDDINGS : un calcul interrompu reprend aux shards manquants, et si tout est déjà fait
+# la matrice est simplement rechargée ; False pour tout recalculer.
+# Avec EMBEDDING_CHUNKS = False, l'index Annoy est construit à partir de la matrice déjà sauvegardée
+EMBEDDING_CHUNKS = not PIPELINE_MODE and True
+RESUME_EMBEDDINGS = True
+CREATE_ANNOY_INDEX = not PIPELINE_MODE and True
 SAVE_ANNOY_INDEX = CREATE_ANNOY_INDEX and True
-LOAD_ANNOY_INDEX = not CREATE_ANNOY_INDEX and True
+LOAD_ANNOY_INDEX = not PIPELINE_MODE and not CREATE_ANNOY_INDEX and True
 
 
 
 # HYPERPARAMETERS
+# ================ CLEANING =====================
+# Les pages dont le texte nettoyé fait moins de MIN_CHARACTERS caractères sont ignorées (ébauches)
+MIN_CHARACTERS = 500
 # ================ CHUNKING =====================
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Nombre de processus de découpage (1 : séquentiel, None : un par cœur)
+NB_CHUNKING_WORKERS = None
+FILES_PER_CHUNKING_TASK = 16
+# ================ DEDUPLICATION =================
+# Similarité de Jaccard (shingles de 5 mots, estimée par MinHash) à partir de laquelle deux chunks sont des doublons
+DEDUP_THRESHOLD = 0.85
+DEDUP_NUM_PERM = 128
 # ================ EMBEDDING =======================
 BATCH_SIZE_EMBEDDING = 64
+# Tokens paddés par batch : les chunks sont triés par longueur et regroupés sous ce budget
+# (moins de padding, surtout sur CPU) ; None pour des batches de BATCH_SIZE_EMBEDDING chunks dans l'ordre
+TOKEN_BUDGET_EMBEDDING = 16384
+# Processus d'embedding, chacun avec son modèle et cœurs / processus threads (1 : un seul processus, None : un par cœur)
+NB_EMBEDDING_PROCESSES = 1
+# Backend d'inférence : "PyTorch" ou "Onnx" (ONNX Runtime, plus rapide sur CPU) ; QUANTIZE_EMBEDDINGS : modèle ONNX int8
+# (voir Main_Scripts/Onnx_Benchmark.py pour l'accord avec PyTorch)
+EMBEDDING_BACKEND = "PyTorch"
+QUANTIZE_EMBEDDINGS = False
 # You can try "BAAI/bge-base-en-v1.5" which is larger and more performant, still free for research/commercial use.
 EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
 # EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
 # La taille de l'embedding pour "BAAI/bge-base-en-v1.5" est 768 et de 
 # "BAAI/bge-small-en-v1.5" est 384.
 PATH_SAVING_EMBEDDINGS = "Embeddings"
+# Matrice .npy memory-mappée (description dans embeddings.json) ; "float16" divise sa taille par deux
+EMBEDDINGS_FILE = f"{PATH_SAVING_EMBEDDINGS}/embeddings.npy"
+EMBEDDINGS_DTYPE = "float32"
+# Shards de EMBEDDING_SHARD_SIZE chunks (et leur manifeste) dans EMBEDDING_SHARDS_FOLDER
+EMBEDDING_SHARDS_FOLDER = f"{PATH_SAVING_EMBEDDINGS}/shards"
+EMBEDDING_SHARD_SIZE = 20000
+# Cache persistant des embeddings (modèle, texte normalisé) : les chunks déjà vus ne repassent pas par le modèle.
+# None pour le désactiver ; au-delà de EMBEDDING_CACHE_MAX_GB, les entrées les moins récemment utilisées sont supprimées
+EMBEDDING_CACHE_PATH = f"{PATH_SAVING_EMBEDDINGS}/cache.sqlite"
+EMBEDDING_CACHE_MAX_GB = 4
 # ================ ANNOY INDEX ====================
 NUM_TREES = 100
 PATH_SAVING_ANNOY_INDEX = "Annoy_Index"
-
-
-DATA_FOLDER_PATH = "Data"
+# ================ PIPELINE =======================
+PIPELINE_CATEGORIES = ["Physics", "Chemistry", "Biology", "Mathematics", "Computer science"]
+PIPELINE_MAX_RECURSION_LEVEL = 1
+PIPELINE_MAX_PAGES_PER_CATEGORY = 50
+NB_DOWNLOAD_WORKERS = 4
+# Débit maximal de requêtes API, partagé par les threads de téléchargement
+PIPELINE_REQUESTS_PER_SECOND = 10.0
+# Wikitexte téléchargé par le pipeline (CorpusStore), à part des pages .txt de RAW_DATA_FOLDER_PATH
+PIPELINE_RAW_STORE_FOLDER_PATH = "Data_Store"
+
+
+RAW_DATA_FOLDER_PATH = "Data"
+DATA_FOLDER_PATH = "Data_Clean" if CLEANING else RAW_DATA_FOLDER_PATH
 PATH_SAVING_CHUNKS = "Chunks"
 
 RAG = WikipediaRAG(
     Data_Folder_Path=DATA_FOLDER_PATH,
     Embedding_Model=EMBEDDING_MODEL,
     Batch_Size_Embedding=BATCH_SIZE_EMBEDDING,
+    Token_Budget_Embedding=TOKEN_BUDGET_EMBEDDING,
+    Nb_Embedding_Processes=NB_EMBEDDING_PROCESSES,
+    Embeddings_Dtype=EMBEDDINGS_DTYPE,
+    Embedding_Backend=EMBEDDING_BACKEND,
+    Quantize_Embeddings=QUANTIZE_EMBEDDINGS,
+    Embedding_Cache_Path=EMBEDDING_CACHE_PATH,
+    Embedding_Cache_Max_Bytes=int(EMBEDDING_CACHE_MAX_GB * 1024 ** 3),
     Api_Url="http://localhost:11434/api/generate", 
     Model_Name="llama3"
 )
 
 
+if PIPELINE_MODE:
+    print("============================================\n       STREAMING PIPELINE.       \n============================================\n")
+    Tree = Fetch_Wikipedia_Category_Tree(
+        Input_Category_List=PIPELINE_CATEGORIES,
+        Max_Recursion_Level=PIPELINE_MAX_RECURSION_LEVEL,
+        Max_Pages_Per_Category=PIPELINE_MAX_PAGES_PER_CATEGORY
+    )
+    RAG.Run_Pipeline(
+        Titles=Collect_Tree_Pages(Tree),
+        Chunks_Path=f"{PATH_SAVING_CHUNKS}/chunks.jsonl",
+        Index_Path=f"{PATH_SAVING_ANNOY_INDEX}/wikipedia_index.ann",
+        Chunk_Store_Folder=f"{PATH_SAVING_CHUNKS}/chunk_store",
+        Num_Trees=NUM_TREES,
+        Raw_Store_Folder=PIPELINE_RAW_STORE_FOLDER_PATH,
+        Min_Characters=MIN_CHARACTERS,
+        Chunk_Size=CHUNK_SIZE,
+        Chunk_Overlap=CHUNK_OVERLAP,
+        Nb_Download_Workers=NB_DOWNLOAD_WORKERS,
+        Requests_Per_Second=PIPELINE_REQUESTS_PER_SECOND
+    )
+
+if CLEANING:
+    print("============================================\n       CLEANING ARTICLES.       \n============================================\n")
+    RAG.Clean_Articles(Raw_Data_Folder_Path=RAW_DATA_FOLDER_PATH, Min_Characters=MIN_CHARACTERS,
+                       Chunk_Size=CHUNK_SIZE, Chunk_Overlap=CHUNK_OVERLAP)
+
+dedup_stats = None
+seconds_per_chunk = None
+# Chunks du passage précédent (mode INCREMENTAL), chargés par l'étape de découpage
+previous_chunks = None
+previous_embedded_chunks = None
+
 if CHUNKING:
     print("============================================\n       CHUNKING ARTICLES.       \n============================================\n")
-    chunks = RAG.Chunk_Articles(Chunk_Size=CHUNK_SIZE, Chunk_Overlap=CHUNK_OVERLAP)
+    if INCREMENTAL:
+        if os.path.isfile(f"{PATH_SAVING_CHUNKS}/chunks.pickle"):
+            previous_chunks = RAG.Load_Chunks(Saving_Path=f"{PATH_SAVING_CHUNKS}/chunks.pickle")
+        # Les embeddings sont alignés sur les chunks du store (dédupliqués), pas sur le pickle complet
+        previous_embedded_chunks = previous_chunks
+        if os.path.isdir(f"{PATH_SAVING_CHUNKS}/chunk_store"):
+            with RAG.Load_Chunks(Saving_Path=f"{PATH_SAVING_CHUNKS}/chunk_store") as previous_store:
+                previous_embedded_chunks = previous_store.To_Documents()
+        chunks, delta = RAG.Chunk_Articles_Incremental(Previous_Chunks=previous_chunks,
+                                                      Manifest_Path=f"{PATH_SAVING_CHUNKS}/manifest.json",
+                                                      Chunk_Size=CHUNK_SIZE, Chunk_Overlap=CHUNK_OVERLAP)
+        RAG.Save_Chunk_Delta(Delta=delta, Saving_Path=f"{PATH_SAVING_CHUNKS}/delta.json")
+    else:
+        chunks = RAG.Chunk_Articles(Chunk_Size=CHUNK_SIZE, Chunk_Overlap=CHUNK_OVERLAP,
+                                    Nb_Workers=NB_CHUNKING_WORKERS, Files_Per_Task=FILES_PER_CHUNKING_TASK)
 
     print(f"Number of chunks created: {len(chunks)}\n")
-    # Save chunks to pickle file
+    # Save chunks to pickle file (complete list, reused by the incremental mode)
     RAG.Save_Chunks(Chunks=chunks, Saving_Path=f"{PATH_SAVING_CHUNKS}/chunks.pickle")
+
+    if DEDUPLICATE:
+        print("============================================\n       DEDUPLICATING CHUNKS.       \n============================================\n")
+        chunks, _, dedup_stats = RAG.Deduplicate_Chunks(Chunks=chunks, Threshold=DEDUP_THRESHOLD, Num_Perm=DEDUP_NUM_PERM,
+                                                        Duplicates_Path=f"{PATH_SAVING_CHUNKS}/duplicates.json")
+        print(f"Number of chunks kept: {len(chunks)}\n")
+
+    # Chunk store read by the webapp, aligned with the embeddings and the Annoy index
+    RAG.Save_Chunks(Chunks=chunks, Saving_Path=f"{PATH_SAVING_CHUNKS}/chunk_store")
                                                             
 
 if EMBEDDING_CHUNKS:
     print("============================================\n       EMBEDDING CHUNKS.       \n============================================\n")
-    embeddings = RAG.Embed_Chunks(Chunks=chunks)
-    print(f"Number of embeddings created: {len(embeddings)}\n")
-    print(f"Size of each embedding: {len(embeddings[0])}\n")
-    if SAVE_EMBEDDINGS:
+    if not CHUNKING:
+        chunks = RAG.Load_Chunks(Saving_Path=f"{PATH_SAVING_CHUNKS}/chunk_store").To_Documents()
+    if INCREMENTAL and previous_embedded_chunks is not None and os.path.isfile(EMBEDDINGS_FILE):
+        previous_embeddings = RAG.Load_Embeddings_Of_Chunks(Saving_Path=EMBEDDINGS_FILE)
+        embeddings = RAG.Embed_Chunks_Incremental(Chunks=chunks, Previous_Chunks=previous_embedded_chunks,
+                                                  Previous_Embeddings=previous_embeddings)
         print("============================================\n       SAVING EMBEDDINGS.       \n============================================\n")
-        RAG.Save_Embeddings_Of_Chunks(Embeddings=embeddings, Saving_Path=f"{PATH_SAVING_EMBEDDINGS}/embeddings.pth")
-        print(f"Embeddings saved to {PATH_SAVING_EMBEDDINGS}/embeddings.pth\n")
-
-if LOAD_EMBEDDINGS:
+        RAG.Save_Embeddings_Of_Chunks(Embeddings=embeddings, Saving_Path=EMBEDDINGS_FILE)
+    else:
+        # Each shard is saved as soon as it is embedded, then the shards are assembled into EMBEDDINGS_FILE
+        shard_stats = {}
+        embeddings = RAG.Embed_Chunks_Resumable(Chunks=chunks, Shards_Folder=EMBEDDING_SHARDS_FOLDER, Output_Path=EMBEDDINGS_FILE,
+                                                Shard_Size=EMBEDDING_SHARD_SIZE, Resume=RESUME_EMBEDDINGS, Shard_Stats=shard_stats)
+        if shard_stats["embedded_chunks"]:
+            seconds_per_chunk = shard_stats["elapsed_s"] / shard_stats["embedded_chunks"]
+    print(f"Embeddings saved to {EMBEDDINGS_FILE}\n")
+    print(f"Number of embeddings: {len(embeddings)}\n")
+    print(f"Size of each embedding: {len(embeddings[0])}\n")
+elif CREATE_ANNOY_INDEX:
     print("============================================\n       LOADING EMBEDDINGS.       \n============================================\n")
-    embeddings = RAG.Load_Embeddings_Of_Chunks(Loading_Path=f"{PATH_SAVING_EMBEDDINGS}/embeddings.pth")
-    print(f"Embeddings loaded from {PATH_SAVING_EMBEDDINGS}/embeddings.pth\n")
-    print("Number of embeddings loaded: ", len(embeddings))
-    print("Embedding size: ", len(embeddings[0]))
+    embeddings = RAG.Load_Embeddings_Of_Chunks(Saving_Path=EMBEDDINGS_FILE)
+    print(f"Embeddings loaded from {EMBEDDINGS_FILE}\n")
 
 if CREATE_ANNOY_INDEX:
     print("============================================\n       CREATING ANNOY INDEX.       \n============================================\n")
@@ -86,6 +208,9 @@ if CREATE_ANNOY_INDEX:
     print(f"Annoy index created with {NUM_TREES} trees and saved to {PATH_SAVING_ANNOY_INDEX}/wikipedia_index.ann\n")
     if SAVE_ANNOY_INDEX:
         print("Annoy index saved successfully.\n")
+    if dedup_stats is not None and seconds_per_chunk is not None:
+        RAG.Report_Deduplication_Savings(Stats=dedup_stats, Seconds_Per_Chunk=seconds_per_chunk, Embedding_Size=len(embeddings[0]),
+                                         Index_Bytes=os.path.getsize(f"{PATH_SAVING_ANNOY_INDEX}/wikipedia_index.ann"))
 
 if LOAD_ANNOY_INDEX:
     print("============================================\n       LOADING ANNOY INDEX.       \n============================================\n")
@@ -0,0 +1,58 @@
+import sys
+
+MODULES_PATH = "Modules/"
+
+sys.path.append(MODULES_PATH)
+
+
+
+from Embedding_Benchmark import Load_Sample_Chunks
+from Embeddings_Chunks import Create_Embedder
+from Onnx_Embeddings import Check_Embedder_Parity, Time_Embedder
+
+
+
+
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+QUERIES = [
+    "What is the speed of light in a vacuum?",
+    "How do enzymes lower the activation energy of a reaction?",
+    "Who proved the incompleteness theorems?",
+    "What is the structure of DNA?",
+    "How does a transistor work?",
+]
+NUM_RESULTS = 10
+# Seuils d'acceptation du backend ONNX face à PyTorch
+MIN_MEAN_COSINE = 0.99
+MIN_MEAN_OVERLAP = 0.8
+
+
+
+
+def Run_Onnx_Benchmark():
+    """
+    Compare PyTorch, ONNX float32 et ONNX int8 : débit des documents, latence d'une requête,
+    accord des vecteurs et des plus proches voisins avec PyTorch.
+    """
+    Texts = [Chunk.page_content for Chunk in Load_Sample_Chunks()]
+    Reference = Create_Embedder(Embedding_Model=EMBEDDING_MODEL)
+    Reports = {"PyTorch": Time_Embedder(Reference, Texts, QUERIES[0])}
+    for Name, Quantize in (("Onnx", False), ("Onnx_Int8", True)):
+        Embedder = Create_Embedder(Embedding_Model=EMBEDDING_MODEL, Backend="Onnx", Quantize=Quantize)
+        Reports[Name] = Time_Embedder(Embedder, Texts, QUERIES[0])
+        print(f"[{Name}]", end=" ")
+        Reports[Name].update(Check_Embedder_Parity(Texts, QUERIES, Reference, Embedder, Num_Results=NUM_RESULTS))
+    for Name, Report in Reports.items():
+        print(f"[{Name}] {Report['chunks_per_s']:.1f} chunks/s, query latency {Report['query_latency_ms']:.1f} ms")
+    return Reports
+
+
+
+
+if __name__ == "__main__":
+    Reports = Run_Onnx_Benchmark()
+    Failed = [Name for Name in ("Onnx", "Onnx_Int8")
+              if Reports[Name]["mean_cosine"] < MIN_MEAN_COSINE or Reports[Name]["mean_overlap"] < MIN_MEAN_OVERLAP]
+    if Failed:
+        print(f"❌ {', '.join(Failed)} disagree(s) with PyTorch")
+        sys.exit(1)
@@ -0,0 +1,85 @@
+import sys
+import time
+
+MODULES_PATH = "Modules/"
+
+sys.path.append(MODULES_PATH)
+
+
+
+from Embedding_Benchmark import Load_Sample_Chunks
+from Embedder_Registry import Get_Embedder
+from Embeddings_Chunks import Create_Annoy_Index, Embed_Chunks
+from Query_Cache import Get_Query_Cache
+from Retrieval import Retrieve_Batch, Search_Annoy_Index
+
+
+
+
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+NUM_TREES = 50
+NUM_RESULTS = 10
+SEARCH_K = 500
+# Reformulations d'une même question, comme celles du mode multi-requêtes / RAG-Fusion
+QUERIES = [
+    "What is the speed of light in a vacuum?",
+    "How fast does light travel in empty space?",
+    "Value of the speed of light constant c",
+    "Speed of electromagnetic waves in vacuum",
+    "Why is the speed of light the same for all observers?",
+    "Who first measured the speed of light?",
+    "How is the metre defined from the speed of light?",
+    "Can anything travel faster than light?",
+    "Speed of light in glass compared to vacuum",
+    "What limits the speed of information in physics?",
+]
+NB_QUERIES_LIST = [1, 5, 10]
+REPEATS = 5
+
+
+
+
+def Run_Retrieval_Benchmark():
+    """
+    Compare, pour N reformulations, la boucle requête par requête (embed_query puis
+    Search_Annoy_Index) et l'API par lot (une passe du modèle, recherches en parallèle),
+    puis l'API par lot sur des requêtes répétées (servies par le cache de requêtes).
+    """
+    Embedder = Get_Embedder(EMBEDDING_MODEL, Warm_Up=True)
+    Embeddings = Embed_Chunks(Load_Sample_Chunks(), Embedder.Embedder)
+    Index = Create_Annoy_Index(Embeddings, num_trees=NUM_TREES)
+
+    Mismatches = 0
+    for Nb_Queries in NB_QUERIES_LIST:
+        Queries = QUERIES[:Nb_Queries]
+        Start = time.perf_counter()
+        for _ in range(REPEATS):
+            Loop_Indices = [Search_Annoy_Index(Index, Embedder.embed_query(Query), NUM_RESULTS, search_k=SEARCH_K)[0]
+                            for Query in Queries]
+        Loop_Seconds = (time.perf_counter() - Start) / REPEATS
+        Batch_Seconds = 0.0
+        for _ in range(REPEATS):
+            # Cache de requêtes vidé : seul le regroupement est mesuré
+            Get_Query_Cache().Clear()
+            Start = time.perf_counter()
+            Batch_Indices, _ = Retrieve_Batch(EMBEDDING_MODEL, Index, Queries, NUM_RESULTS, Search_K=SEARCH_K)
+            Batch_Seconds += (time.perf_counter() - Start) / REPEATS
+        Start = time.perf_counter()
+        for _ in range(REPEATS):
+            Retrieve_Batch(EMBEDDING_MODEL, Index, Queries, NUM_RESULTS, Search_K=SEARCH_K)
+        Cached_Seconds = (time.perf_counter() - Start) / REPEATS
+        # Les voisins doivent être les mêmes (à l'ordre près des distances égales)
+        Mismatches += sum(set(Row) != set(int(i) for i in Batch_Row if i >= 0)
+                          for Row, Batch_Row in zip(Loop_Indices, Batch_Indices))
+        print(f"[{Nb_Queries} queries] loop {1000 * Loop_Seconds:.1f} ms, batch {1000 * Batch_Seconds:.1f} ms, "
+              f"speedup x{Loop_Seconds / Batch_Seconds:.2f}, repeated (query cache) {1000 * Cached_Seconds:.1f} ms")
+    return Mismatches
+
+
+
+
+if __name__ == "__main__":
+    Mismatches = Run_Retrieval_Benchmark()
+    if Mismatches:
+        print(f"❌ {Mismatches} query result(s) differ between the loop and the batch API")
+        sys.exit(1)
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+MODULES_PATH = "Modules/"
+
+sys.path.append(MODULES_PATH)
+
+
+
+from Chunking import Create_Text_Splitter, List_Files_Of_Folder
+from Corpus_Store import CorpusStore, Is_Corpus_Store
+from Fast_Splitter import Check_Splitter_Parity, Benchmark_Splitters
+from MediaWiki_Stand_In import Generate_Fixture_Corpus
+
+
+
+
+# Corpus comparé : dossier de .txt ou corpus compacté ; corpus de test généré s'il n'existe pas
+DATA_FOLDER_PATH = "Data_Clean"
+MAX_DOCUMENTS = None
+# (Chunk_Size, Chunk_Overlap) vérifiés pour la parité ; le premier sert au benchmark.
+# (200, 200) : cas limite Chunk_Overlap == Chunk_Size
+SPLITTER_SETTINGS = [(1000, 200), (500, 50), (200, 0), (2000, 400), (200, 200)]
+REPEATS = 3
+
+
+
+
+def Load_Texts(Folder_Path, Max_Documents=None):
+    if Is_Corpus_Store(Folder_Path):
+        with CorpusStore(Folder_Path, Read_Only=True) as Store:
+            Texts = [Text for _, Text in Store.Iterate_Documents()]
+    elif Path(Folder_Path).is_dir():
+        Texts = [File.read_text(encoding="utf-8") for File in List_Files_Of_Folder(Folder_Path)]
+    else:
+        print(f"[Warn] {Folder_Path} not found, using a generated fixture corpus.")
+        Corpus = Generate_Fixture_Corpus(Nb_Root_Categories=5, Depth=2, Pages_Per_Category=20, Page_Size=8000)
+        Texts = [Page["content"] for Page in Corpus["pages"].values()]
+    return Texts[:Max_Documents] if Max_Documents else Texts
+
+
+def Run_Splitter_Benchmark():
+    Texts = Load_Texts(DATA_FOLDER_PATH, MAX_DOCUMENTS)
+    print(f"{len(Texts)} documents, {sum(len(Text) for Text in Texts) / 1e6:.1f} M characters")
+
+    Nb_Mismatches = 0
+    for Chunk_Size, Chunk_Overlap in SPLITTER_SETTINGS:
+        Mismatches = Check_Splitter_Parity(
+            Texts,
+            Create_Text_Splitter(Chunk_Size, Chunk_Overlap, Backend="LangChain"),
+            Create_Text_Splitter(Chunk_Size, Chunk_Overlap, Backend="Native")
+        )
+        Status = "✅" if not Mismatches else "❌"
+        print(f"{Status} Parity Chunk_Size={Chunk_Size}, Chunk_Overlap={Chunk_Overlap}: {len(Mismatches)} mismatching document(s)")
+        Nb_Mismatches += len(Mismatches)
+
+    Chunk_Size, Chunk_Overlap = SPLITTER_SETTINGS[0]
+    Report = Benchmark_Splitters(Texts, {
+        "LangChain": Create_Text_Splitter(Chunk_Size, Chunk_Overlap, Backend="LangChain"),
+        "Native": Create_Text_Splitter(Chunk_Size, Chunk_Overlap, Backend="Native"),
+    }, Repeats=REPEATS)
+    print(f"Speedup: x{Report['LangChain']['seconds'] / Report['Native']['seconds']:.2f}")
+    return Nb_Mismatches, Report
+
+
+
+
+if __name__ == "__main__":
+    Nb_Mismatches, _ = Run_Splitter_Benchmark()
+    if Nb_Mismatches:
+        sys.exit(1)
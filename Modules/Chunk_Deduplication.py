@@ -0,0 +1,213 @@
+import hashlib
+import json
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+
+
+MINHASH_PRIME = 4294967311  # premier > 2^32 : (a * x + b) % p reste exact en uint64 pour a, b < 2^31
+WORD_PATTERN = re.compile(r"\w+")
+
+
+
+
+# ================ SIGNATURES =====================
+def Normalize_Chunk_Text(Text: str) -> str:
+    return " ".join(Text.lower().split())
+
+
+def Exact_Hash(Text: str) -> str:
+    return hashlib.sha1(Normalize_Chunk_Text(Text).encode("utf-8")).hexdigest()
+
+
+class MinHasher:
+    """
+    Signatures MinHash d'ensembles de shingles de mots (Shingle_Size mots consécutifs).
+    Les permutations sont tirées avec une graine fixe : les signatures sont
+    reproductibles d'un passage à l'autre.
+    """
+    def __init__(self, Num_Perm: int = 128, Shingle_Size: int = 5, Seed: int = 1):
+        Random = np.random.RandomState(Seed)
+        self.Num_Perm = Num_Perm
+        self.Shingle_Size = Shingle_Size
+        self.A = Random.randint(1, 2**31, size=Num_Perm, dtype=np.uint64)
+        self.B = Random.randint(0, 2**31, size=Num_Perm, dtype=np.uint64)
+        # Coefficients de combinaison des hashs de mots en hash de shingle
+        self.Shingle_Weights = Random.randint(1, 2**31, size=Shingle_Size, dtype=np.uint64)
+        self.Word_Hashes = {}
+
+    def Hash_Words(self, Text: str) -> np.ndarray:
+        Word_Hashes = self.Word_Hashes
+        Hashes = []
+        for Word in WORD_PATTERN.findall(Text.lower()):
+            Hash = Word_Hashes.get(Word)
+            if Hash is None:
+                Hash = Word_Hashes[Word] = zlib.crc32(Word.encode("utf-8"))
+            Hashes.append(Hash)
+        return np.asarray(Hashes, dtype=np.uint64)
+
+    def Signature(self, Text: str) -> np.ndarray:
+        """
+        Returns:
+            la signature MinHash, ou None si le texte n'a aucun mot (pas de shingle à comparer).
+        """
+        Words = self.Hash_Words(Text)
+        Size = min(self.Shingle_Size, len(Words))
+        if Size == 0:
+            return None
+        Nb_Shingles = len(Words) - Size + 1
+        Shingles = np.zeros(Nb_Shingles, dtype=np.uint64)
+        for Offset in range(Size):
+            Shingles += Words[Offset:Offset + Nb_Shingles] * self.Shingle_Weights[Offset]
+        Shingles &= np.uint64(0xFFFFFFFF)
+        Permuted = (Shingles[:, None] * self.A[None, :] + self.B[None, :]) % np.uint64(MINHASH_PRIME)
+        return Permuted.min(axis=0)
+
+
+def Choose_Bands(Num_Perm: int, Threshold: float) -> Tuple[int, int]:
+    """
+    Choisit (bandes, lignes par bande) pour le LSH : le plus grand nombre de lignes
+    dont le seuil de la courbe en S, (1/b)^(1/r), reste sous Threshold. Les paires
+    candidates sont ensuite vérifiées sur la signature complète.
+    """
+    Best = (Num_Perm, 1)
+    for Rows in range(1, Num_Perm + 1):
+        if Num_Perm % Rows:
+            continue
+        Bands = Num_Perm // Rows
+        if (1 / Bands) ** (1 / Rows) <= Threshold:
+            Best = (Bands, Rows)
+    return Best
+
+
+
+
+# ================ DEDUPLICATION =====================
+def Deduplicate_Chunks(
+    Chunks: List,
+    Threshold: float = 0.85,
+    Num_Perm: int = 128,
+    Shingle_Size: int = 5,
+    Near_Duplicates: bool = True
+) -> Tuple[List, Dict[int, int], Dict]:
+    """
+    Élimine les chunks en double avant l'embedding : doublons exacts (texte normalisé
+    identique) puis quasi-doublons (similarité de Jaccard estimée par MinHash >= Threshold,
+    candidats trouvés par LSH). Le premier chunk rencontré est gardé comme canonique.
+
+    Args:
+        Chunks: liste de Documents, dans l'ordre du découpage.
+        Threshold: similarité de Jaccard (sur les shingles de mots) à partir de laquelle deux chunks sont des doublons.
+        Num_Perm: nombre de permutations MinHash.
+        Shingle_Size: nombre de mots par shingle.
+        Near_Duplicates: False pour ne retirer que les doublons exacts.
+
+    Returns:
+        (chunks gardés, {indice du doublon: indice de son chunk canonique} dans Chunks, statistiques)
+    """
+    Hasher = MinHasher(Num_Perm=Num_Perm, Shingle_Size=Shingle_Size)
+    Bands, Rows = Choose_Bands(Num_Perm, Threshold)
+    Buckets = [{} for _ in range(Bands)]
+    Signatures = {}
+    Exact_Index = {}
+    Duplicate_Map = {}
+    Kept = []
+    Stats = {"chunks": len(Chunks), "exact_duplicates": 0, "near_duplicates": 0, "candidates_checked": 0,
+             "bands": Bands, "rows": Rows, "threshold": Threshold}
+
+    for Index, Chunk in enumerate(Chunks):
+        Key = Exact_Hash(Chunk.page_content)
+        if Key in Exact_Index:
+            Duplicate_Map[Index] = Exact_Index[Key]
+            Stats["exact_duplicates"] += 1
+            continue
+        # Un chunk sans mot (symboles, formules) n'est comparé que par son hash exact
+        Signature = Hasher.Signature(Chunk.page_content) if Near_Duplicates else None
+        if Signature is not None:
+            Band_Keys = [Signature[Band * Rows:(Band + 1) * Rows].tobytes() for Band in range(Bands)]
+            Canonical = None
+            Checked = set()
+            for Band, Band_Key in enumerate(Band_Keys):
+                for Candidate in Buckets[Band].get(Band_Key, ()):
+                    if Candidate in Checked:
+                        continue
+                    Checked.add(Candidate)
+                    if np.mean(Signatures[Candidate] == Signature) >= Threshold:
+                        Canonical = Candidate
+                        break
+                if Canonical is not None:
+                    break
+            Stats["candidates_checked"] += len(Checked)
+            if Canonical is not None:
+                Duplicate_Map[Index] = Canonical
+                Stats["near_duplicates"] += 1
+                continue
+            Signatures[Index] = Signature
+            for Band, Band_Key in enumerate(Band_Keys):
+                Buckets[Band].setdefault(Band_Key, []).append(Index)
+        Exact_Index[Key] = Index
+        Kept.append(Chunk)
+
+    Stats["kept"] = len(Kept)
+    Stats["dropped"] = len(Duplicate_Map)
+    print(f"Deduplication: {Stats['dropped']} / {Stats['chunks']} chunk(s) dropped "
+          f"({Stats['exact_duplicates']} exact, {Stats['near_duplicates']} near duplicates, threshold {Threshold}).")
+    return Kept, Duplicate_Map, Stats
+
+
+def Save_Duplicate_Map(Chunks: List, Duplicate_Map: Dict[int, int], Saving_Path: str):
+    """
+    Sauvegarde la correspondance doublon -> chunk canonique. Les chunks sont désignés
+    par leur chunk_id quand il existe, sinon par leur indice dans la liste découpée.
+    """
+    def Describe(Index):
+        Metadata = Chunks[Index].metadata
+        return {"index": Index, "chunk_id": Metadata.get("chunk_id"), "source": Metadata.get("source")}
+
+    with open(Saving_Path, "w", encoding="utf-8") as f:
+        json.dump([{"duplicate": Describe(Index), "canonical": Describe(Canonical)}
+                   for Index, Canonical in sorted(Duplicate_Map.items())], f, ensure_ascii=False)
+
+
+def Report_Deduplication_Savings(Stats: Dict, Seconds_Per_Chunk: float, Embedding_Size: int, Index_Bytes: int = None) -> Dict:
+    """
+    Estime ce que la déduplication a économisé à partir de mesures faites sur les chunks gardés.
+
+    Args:
+        Seconds_Per_Chunk: temps d'embedding mesuré par chunk.
+        Embedding_Size: dimension des embeddings (stockés en float32).
+        Index_Bytes: taille de l'index Annoy construit ; elle croît linéairement avec le
+            nombre d'éléments. Sans elle, seul le stockage des vecteurs (12 + 4 * dim octets
+            par élément) est compté.
+    """
+    Dropped, Kept = Stats["dropped"], Stats["kept"]
+    Savings = {
+        "embedding_seconds_saved": Dropped * Seconds_Per_Chunk,
+        "embedding_bytes_saved": Dropped * 4 * Embedding_Size,
+        "index_items_saved": Dropped,
+        "index_bytes_saved": Index_Bytes * Dropped / Kept if Index_Bytes and Kept else Dropped * (12 + 4 * Embedding_Size),
+        "fraction_saved": Dropped / Stats["chunks"] if Stats["chunks"] else 0.0,
+    }
+    print(f"Deduplication saved ~{Savings['embedding_seconds_saved']:.1f} s of embedding, "
+          f"{Savings['embedding_bytes_saved'] / 1e6:.1f} MB of embeddings and "
+          f"~{Savings['index_bytes_saved'] / 1e6:.1f} MB of Annoy index ({100 * Savings['fraction_saved']:.1f} % of the chunks).")
+    return Savings
+
+
+if __name__ == "__main__":
+    # Example usage
+    from langchain_core.documents import Document
+
+    Chunks = [
+        Document(page_content="The photon is the quantum of the electromagnetic field, including light.", metadata={"source": "A"}),
+        Document(page_content="The photon is the quantum of the electromagnetic field, including  light.", metadata={"source": "B"}),
+        Document(page_content="The photon is the quantum of the electromagnetic field, including radio waves.", metadata={"source": "C"}),
+        Document(page_content="A protein is a large biomolecule made of amino acid residues.", metadata={"source": "D"}),
+    ]
+    Kept, Duplicate_Map, Stats = Deduplicate_Chunks(Chunks, Threshold=0.5)
+    print(Duplicate_Map, Stats)
+    Report_Deduplication_Savings(Stats, Seconds_Per_Chunk=0.01, Embedding_Size=768)
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+from typing import Callable, Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from Chunking import Chunk_Text_From_File_Path, List_Files_Of_Folder
+from Corpus_Store import CorpusStore, Is_Corpus_Store
+
+
+
+
+MANIFEST_VERSION = 1
+
+
+
+
+def Chunk_Id(Source: str, Text: str, Occurrence: int = 0) -> str:
+    """
+    Identifiant stable d'un chunk : empreinte de sa source et de son texte
+    (Occurrence distingue deux chunks identiques d'une même source). Un chunk
+    inchangé garde son identifiant même si le reste de la page a été modifié.
+    """
+    return hashlib.sha1(f"{Source}\0{Occurrence}\0{Text}".encode("utf-8")).hexdigest()[:20]
+
+
+def Assign_Chunk_Ids(Chunks: List[Document], Source: str) -> List[str]:
+    """
+    Ajoute metadata["chunk_id"] aux chunks d'une source et retourne leurs identifiants.
+    """
+    Occurrences = {}
+    Ids = []
+    for Chunk in Chunks:
+        Occurrence = Occurrences.get(Chunk.page_content, 0)
+        Occurrences[Chunk.page_content] = Occurrence + 1
+        Chunk.metadata["chunk_id"] = Chunk_Id(Source, Chunk.page_content, Occurrence)
+        Ids.append(Chunk.metadata["chunk_id"])
+    return Ids
+
+
+def Hash_File(Path: str) -> str:
+    Digest = hashlib.sha1()
+    with open(Path, "rb") as f:
+        for Block in iter(lambda: f.read(1 << 20), b""):
+            Digest.update(Block)
+    return Digest.hexdigest()
+
+
+
+
+class ChunkManifest:
+    """
+    Manifeste du découpage : pour chaque source (fichier ou page du corpus
+    compacté), l'empreinte de son contenu et les identifiants de ses chunks.
+
+    Il est lié aux paramètres du découpeur : si Chunk_Size ou Chunk_Overlap
+    changent, le manifeste est considéré vide et tout est redécoupé.
+    """
+    def __init__(self, Manifest_Path="Chunks/manifest.json", Chunk_Size=1000, Chunk_Overlap=200):
+        self.Manifest_Path = Manifest_Path
+        self.Settings = {"chunk_size": Chunk_Size, "chunk_overlap": Chunk_Overlap}
+        self.Files = {}
+        if os.path.isfile(Manifest_Path):
+            with open(Manifest_Path, "r", encoding="utf-8") as f:
+                Data = json.load(f)
+            if Data.get("version") == MANIFEST_VERSION and Data.get("settings") == self.Settings:
+                self.Files = Data["files"]
+            else:
+                print(f"[Warn] Chunk manifest {Manifest_Path} was built with other settings, rebuilding.")
+
+    def Save(self):
+        """
+        Écrit le manifeste de façon atomique (fichier temporaire puis renommage).
+        """
+        Folder = os.path.dirname(self.Manifest_Path)
+        if Folder:
+            os.makedirs(Folder, exist_ok=True)
+        Temporary_Path = f"{self.Manifest_Path}.tmp"
+        with open(Temporary_Path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "settings": self.Settings, "files": self.Files}, f, ensure_ascii=False)
+        os.replace(Temporary_Path, self.Manifest_Path)
+
+    def Chunk_Ids(self) -> List[str]:
+        return [Chunk_Id for Entry in self.Files.values() for Chunk_Id in Entry["chunk_ids"]]
+
+
+
+
+def Scan_Sources(Data_Folder_Path: str, Manifest: ChunkManifest, Extension: str = ".txt") -> Dict[str, Dict]:
+    """
+    Liste les sources actuelles {source: {"hash", "size", "mtime_ns"}} dans l'ordre
+    du découpage complet. Un fichier dont la taille et la date de modification n'ont
+    pas changé reprend l'empreinte du manifeste sans être relu.
+    """
+    Sources = {}
+    if Is_Corpus_Store(Data_Folder_Path):
+        Store = CorpusStore(Data_Folder_Path, Read_Only=True)
+        for Title, (_, _, _, Content_Hash) in Store.Entries.items():
+            Sources[Title] = {"hash": Content_Hash}
+        Store.Close()
+        return Sources
+
+    for File in List_Files_Of_Folder(Data_Folder_Path, Extension):
+        Source = str(File)
+        Stat = File.stat()
+        Previous = Manifest.Files.get(Source)
+        if Previous is not None and Previous.get("size") == Stat.st_size and Previous.get("mtime_ns") == Stat.st_mtime_ns:
+            Content_Hash = Previous["hash"]
+        else:
+            Content_Hash = Hash_File(Source)
+        Sources[Source] = {"hash": Content_Hash, "size": Stat.st_size, "mtime_ns": Stat.st_mtime_ns}
+    return Sources
+
+
+def Rechunk_Incremental(
+    Data_Folder_Path: str,
+    Text_Splitter,
+    Manifest: ChunkManifest,
+    Previous_Chunks: List[Document] = None,
+    Extension: str = ".txt"
+) -> Tuple[List[Document], Dict]:
+    """
+    Redécoupe uniquement les sources ajoutées ou modifiées depuis le dernier passage
+    et reprend les chunks des autres depuis Previous_Chunks. La liste obtenue est
+    identique (même ordre, mêmes identifiants) à un découpage complet.
+
+    Le manifeste est mis à jour (mais pas sauvegardé). Le delta retourné indique les
+    chunks à embedder ("added") et les identifiants à retirer ("removed_ids").
+
+    Returns:
+        (chunks, delta)
+    """
+    Sources = Scan_Sources(Data_Folder_Path, Manifest, Extension)
+    Previous_By_Source = {}
+    for Chunk in Previous_Chunks or []:
+        if "chunk_id" in Chunk.metadata:
+            Previous_By_Source.setdefault(Chunk.metadata["source"], []).append(Chunk)
+
+    Store = CorpusStore(Data_Folder_Path, Read_Only=True) if Is_Corpus_Store(Data_Folder_Path) else None
+    Previous_Ids = set(Manifest.Chunk_Ids())
+    Delta = {"added": [], "removed_ids": [], "added_sources": [], "changed_sources": [],
+             "removed_sources": [], "unchanged_sources": 0}
+    Chunks = []
+    New_Files = {}
+
+    for Source, Entry in Sources.items():
+        Previous = Manifest.Files.get(Source)
+        Reusable = Previous_By_Source.get(Source)
+        if (Previous is not None and Previous["hash"] == Entry["hash"] and Reusable is not None
+                and [Chunk.metadata["chunk_id"] for Chunk in Reusable] == Previous["chunk_ids"]):
+            Source_Chunks = Reusable
+            Delta["unchanged_sources"] += 1
+        else:
+            if Store is not None:
+                Source_Chunks = Text_Splitter.split_documents([Document(page_content=Store.Get(Source), metadata={"source": Source})])
+            else:
+                Source_Chunks = Chunk_Text_From_File_Path(Source, Text_Splitter)
+            Assign_Chunk_Ids(Source_Chunks, Source)
+            Delta["changed_sources" if Previous is not None else "added_sources"].append(Source)
+        New_Files[Source] = dict(Entry, chunk_ids=[Chunk.metadata["chunk_id"] for Chunk in Source_Chunks])
+        Chunks.extend(Source_Chunks)
+
+    if Store is not None:
+        Store.Close()
+
+    Current_Ids = set()
+    for Chunk in Chunks:
+        Current_Ids.add(Chunk.metadata["chunk_id"])
+        if Chunk.metadata["chunk_id"] not in Previous_Ids:
+            Delta["added"].append(Chunk)
+    Delta["removed_ids"] = sorted(Previous_Ids - Current_Ids)
+    Delta["removed_sources"] = [Source for Source in Manifest.Files if Source not in Sources]
+    Manifest.Files = New_Files
+
+    print(f"Rechunking: {len(Delta['added_sources'])} added, {len(Delta['changed_sources'])} changed, "
+          f"{len(Delta['removed_sources'])} removed, {Delta['unchanged_sources']} unchanged source(s) ; "
+          f"{len(Delta['added'])} chunk(s) added, {len(Delta['removed_ids'])} removed.")
+    return Chunks, Delta
+
+
+def Save_Chunk_Delta(Delta: Dict, Saving_Path: str):
+    """
+    Sauvegarde le delta (identifiants ajoutés et retirés) pour les étapes suivantes.
+    """
+    with open(Saving_Path, "w", encoding="utf-8") as f:
+        json.dump({
+            "added_ids": [Chunk.metadata["chunk_id"] for Chunk in Delta["added"]],
+            "removed_ids": Delta["removed_ids"],
+            "added_sources": Delta["added_sources"],
+            "changed_sources": Delta["changed_sources"],
+            "removed_sources": Delta["removed_sources"],
+        }, f, ensure_ascii=False)
+
+
+def Update_Embeddings(
+    Previous_Chunks: List[Document],
+    Previous_Embeddings: List,
+    Chunks: List[Document],
+    Embed_Function: Callable[[List[Document]], List]
+) -> List:
+    """
+    Retourne les embeddings alignés sur Chunks en réutilisant ceux des chunks déjà
+    connus (même chunk_id) ; seuls les nouveaux chunks sont passés à Embed_Function.
+    """
+    Embeddings_By_Id = {
+        Chunk.metadata.get("chunk_id"): Embedding for Chunk, Embedding in zip(Previous_Chunks or [], Previous_Embeddings if Previous_Embeddings is not None else [])
+    }
+    Embeddings_By_Id.pop(None, None)
+    Missing_Chunks = [Chunk for Chunk in Chunks if Chunk.metadata["chunk_id"] not in Embeddings_By_Id]
+    if Missing_Chunks:
+        for Chunk, Embedding in zip(Missing_Chunks, Embed_Function(Missing_Chunks)):
+            Embeddings_By_Id[Chunk.metadata["chunk_id"]] = Embedding
+    print(f"{len(Chunks) - len(Missing_Chunks)} embedding(s) reused, {len(Missing_Chunks)} computed.")
+    return [Embeddings_By_Id[Chunk.metadata["chunk_id"]] for Chunk in Chunks]
+
+
+if __name__ == "__main__":
+    # Example usage
+    from Chunking import Create_Text_Splitter, Save_Chunks_To_Pickle, Load_Chunks_From_Pickle
+
+    Manifest = ChunkManifest("Chunks/manifest.json", Chunk_Size=1000, Chunk_Overlap=200)
+    Previous_Chunks = Load_Chunks_From_Pickle("Chunks/chunks.pickle") if os.path.isfile("Chunks/chunks.pickle") else None
+    Chunks, Delta = Rechunk_Incremental("Data", Create_Text_Splitter(1000, 200), Manifest, Previous_Chunks)
+    Save_Chunks_To_Pickle(Chunks, "Chunks/chunks.pickle")
+    Save_Chunk_Delta(Delta, "Chunks/delta.json")
+    Manifest.Save()
@@ -0,0 +1,227 @@
+import json
+import mmap
+import os
+from typing import Iterator, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+
+
+CHUNK_STORE_VERSION = 1
+TEXTS_FILE_NAME = "texts.bin"
+META_FILE_NAME = "meta.json"
+# Séparateur inséré entre deux chunks consécutifs d'une même source qui ne se chevauchent pas
+NO_OVERLAP_SEPARATOR = "\n\n"
+
+
+def Is_Chunk_Store(Folder: str) -> bool:
+    return os.path.isfile(os.path.join(Folder, META_FILE_NAME)) and os.path.isfile(os.path.join(Folder, TEXTS_FILE_NAME))
+
+
+
+
+def Merge_Chunk_Into_Text(Text: str, Chunk: str, Max_Overlap: int, Min_Position: int = 0) -> int:
+    """
+    Retourne la position (>= Min_Position) de Chunk si son début recouvre la fin
+    de Text (chevauchement du découpeur), -1 sinon.
+    """
+    Window_Start = max(Min_Position, len(Text) - min(len(Chunk), Max_Overlap))
+    Position = Text.find(Chunk[:1], Window_Start) if Chunk else -1
+    while Position >= 0:
+        Tail = Text[Position:]
+        if Chunk.startswith(Tail):
+            return Position
+        Position = Text.find(Chunk[:1], Position + 1)
+    return -1
+
+
+def Position_From_Span(Text: str, Text_End_In_Source: int, Start_Index: int, Min_Position: int = 0) -> int:
+    """
+    Position (>= Min_Position) d'un chunk dans Text à partir de sa position dans la source
+    (metadata["start_index"] du découpeur), sachant que Text se termine à Text_End_In_Source.
+    Retourne -1 si le chunk commence après la fin de Text (chunk intermédiaire retiré).
+    """
+    Position = len(Text) - (Text_End_In_Source - Start_Index)
+    return Position if Min_Position <= Position <= len(Text) else -1
+
+
+def Save_Chunks_To_Chunk_Store(Chunks, Store_Folder: str, Max_Overlap: int = 2000, Nb_Chunks: int = None):
+    """
+    Écrit les chunks dans un stockage compact : le texte de chaque source n'est
+    stocké qu'une fois (les chunks consécutifs qui se chevauchent sont fusionnés)
+    dans texts.bin, et chaque chunk est décrit par un span (doc_id, début, fin)
+    en octets, dans des tableaux NumPy. Les chunks du FastRecursiveSplitter portent
+    leur position dans la source (metadata["start_index"]) : le recouvrement est alors
+    déduit des spans, sans recherche dans le texte.
+
+    Args:
+        Chunks: liste de Documents (ou dicts {page_content, metadata}) dans l'ordre des identifiants Annoy.
+        Store_Folder: dossier de sortie.
+        Max_Overlap: chevauchement maximal recherché entre deux chunks consécutifs (en caractères).
+        Nb_Chunks: nombre de chunks, si Chunks est un itérable sans len (lecture en flux).
+    """
+    if Nb_Chunks is None:
+        Nb_Chunks = len(Chunks)
+    os.makedirs(Store_Folder, exist_ok=True)
+    Sources = []
+    Doc_Byte_Offsets = [0]
+    Doc_Ids = np.empty(Nb_Chunks, dtype=np.int32)
+    Starts = np.empty(Nb_Chunks, dtype=np.int64)
+    Ends = np.empty(Nb_Chunks, dtype=np.int64)
+    Chunk_Ids = []
+
+    Current_Source = None
+    Current_Text = ""
+    # Position dans la source de la fin de Current_Text (None si un chunk n'a pas de start_index)
+    Current_Source_End = None
+    # Conversion caractères -> octets tenue à jour au fil de l'eau (pas de réencodage du texte complet)
+    Encoded_Chars = 0
+    Encoded_Bytes = 0
+
+    with open(os.path.join(Store_Folder, TEXTS_FILE_NAME), "wb") as Texts_File:
+        for Index, Chunk in enumerate(Chunks):
+            Text = Chunk.page_content if hasattr(Chunk, "page_content") else Chunk["page_content"]
+            Metadata = Chunk.metadata if hasattr(Chunk, "metadata") else Chunk.get("metadata", {})
+            Source = Metadata.get("source", "")
+            Chunk_Ids.append(Metadata.get("chunk_id", ""))
+            Start_Index = Metadata.get("start_index")
+
+            if Source != Current_Source:
+                if Current_Source is not None:
+                    Data = Current_Text.encode("utf-8")
+                    Texts_File.write(Data)
+                    Doc_Byte_Offsets.append(Doc_Byte_Offsets[-1] + len(Data))
+                Sources.append(Source)
+                Current_Source, Current_Text = Source, Text
+                Encoded_Chars, Encoded_Bytes = 0, 0
+                Position = 0
+            else:
+                if Start_Index is not None and Current_Source_End is not None:
+                    Position = Position_From_Span(Current_Text, Current_Source_End, Start_Index, Encoded_Chars)
+                else:
+                    Position = Merge_Chunk_Into_Text(Current_Text, Text, Max_Overlap, Encoded_Chars)
+                if Position < 0:
+                    Position = len(Current_Text) + len(NO_OVERLAP_SEPARATOR)
+                    Current_Text += NO_OVERLAP_SEPARATOR + Text
+                else:
+                    Current_Text += Text[len(Current_Text) - Position:]
+            if Start_Index is None:
+                Current_Source_End = None
+            elif Position + len(Text) >= len(Current_Text):
+                Current_Source_End = Start_Index + len(Text)
+
+            Encoded_Bytes += len(Current_Text[Encoded_Chars:Position].encode("utf-8"))
+            Encoded_Chars = Position
+            Doc_Ids[Index] = len(Sources) - 1
+            Starts[Index] = Doc_Byte_Offsets[-1] + Encoded_Bytes
+            Ends[Index] = Starts[Index] + len(Text.encode("utf-8"))
+
+        if Current_Source is not None:
+            Data = Current_Text.encode("utf-8")
+            Texts_File.write(Data)
+            Doc_Byte_Offsets.append(Doc_Byte_Offsets[-1] + len(Data))
+
+    np.save(os.path.join(Store_Folder, "doc_ids.npy"), Doc_Ids)
+    np.save(os.path.join(Store_Folder, "starts.npy"), Starts)
+    np.save(os.path.join(Store_Folder, "ends.npy"), Ends)
+    np.save(os.path.join(Store_Folder, "doc_offsets.npy"), np.asarray(Doc_Byte_Offsets, dtype=np.int64))
+    Has_Chunk_Ids = any(Chunk_Ids)
+    if Has_Chunk_Ids:
+        np.save(os.path.join(Store_Folder, "chunk_ids.npy"), np.asarray(Chunk_Ids, dtype="S"))
+    with open(os.path.join(Store_Folder, "sources.json"), "w", encoding="utf-8") as f:
+        json.dump(Sources, f, ensure_ascii=False)
+    with open(os.path.join(Store_Folder, META_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": CHUNK_STORE_VERSION,
+            "nb_chunks": Nb_Chunks,
+            "nb_documents": len(Sources),
+            "text_bytes": int(Doc_Byte_Offsets[-1]),
+            "chunk_bytes": int((Ends - Starts).sum()) if Nb_Chunks else 0,
+            "has_chunk_ids": Has_Chunk_Ids,
+        }, f)
+    print(f"✅ {Nb_Chunks} chunks saved to {Store_Folder}")
+
+
+
+
+class ChunkStore:
+    """
+    Lecture d'un stockage de chunks compact : texts.bin et les tableaux de spans
+    sont memory-mappés, l'ouverture est quasi instantanée et seuls les chunks lus
+    sont chargés en mémoire.
+
+    Se comporte comme une liste de textes (len, indexation, itération), ce qui
+    permet de la passer directement à Get_Chunk_By_Index et aux fonctions de Retrieval.
+    """
+    def __init__(self, Store_Folder: str):
+        self.Store_Folder = Store_Folder
+        with open(os.path.join(Store_Folder, META_FILE_NAME), "r", encoding="utf-8") as f:
+            self.Meta = json.load(f)
+        self.Doc_Ids = np.load(os.path.join(Store_Folder, "doc_ids.npy"), mmap_mode="r")
+        self.Starts = np.load(os.path.join(Store_Folder, "starts.npy"), mmap_mode="r")
+        self.Ends = np.load(os.path.join(Store_Folder, "ends.npy"), mmap_mode="r")
+        self.Chunk_Ids = np.load(os.path.join(Store_Folder, "chunk_ids.npy"), mmap_mode="r") if self.Meta["has_chunk_ids"] else None
+        self.Sources = None
+        self.Texts_File = open(os.path.join(Store_Folder, TEXTS_FILE_NAME), "rb")
+        self.Map = mmap.mmap(self.Texts_File.fileno(), 0, access=mmap.ACCESS_READ) if self.Meta["text_bytes"] else b""
+
+    def __len__(self):
+        return self.Meta["nb_chunks"]
+
+    def __getitem__(self, Index):
+        if isinstance(Index, slice):
+            return [self.Get_Text(i) for i in range(*Index.indices(len(self)))]
+        return self.Get_Text(Index)
+
+    def __iter__(self) -> Iterator[str]:
+        for Index in range(len(self)):
+            yield self.Get_Text(Index)
+
+    def Get_Text(self, Index: int) -> str:
+        if Index < 0:
+            Index += len(self)
+        if not 0 <= Index < len(self):
+            raise IndexError(f"Chunk index {Index} out of range.")
+        return self.Map[int(self.Starts[Index]):int(self.Ends[Index])].decode("utf-8")
+
+    def Get_Source(self, Index: int) -> str:
+        if self.Sources is None:
+            with open(os.path.join(self.Store_Folder, "sources.json"), "r", encoding="utf-8") as f:
+                self.Sources = json.load(f)
+        return self.Sources[int(self.Doc_Ids[Index])]
+
+    def Get_Document(self, Index: int) -> Document:
+        """
+        Reconstruit le Document LangChain d'un chunk (texte, source et chunk_id s'il existe).
+        """
+        Metadata = {"source": self.Get_Source(Index)}
+        if self.Chunk_Ids is not None:
+            Metadata["chunk_id"] = self.Chunk_Ids[Index].decode("ascii")
+        return Document(page_content=self.Get_Text(Index), metadata=Metadata)
+
+    def To_Documents(self) -> List[Document]:
+        return [self.Get_Document(Index) for Index in range(len(self))]
+
+    def Close(self):
+        if isinstance(self.Map, mmap.mmap):
+            self.Map.close()
+        self.Texts_File.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *Exc_Info):
+        self.Close()
+
+
+if __name__ == "__main__":
+    # Example usage
+    from Chunking import Load_Chunks_From_Pickle
+
+    Chunks = Load_Chunks_From_Pickle("Chunks/chunks.pickle")
+    Save_Chunks_To_Chunk_Store(Chunks, "Chunks/chunk_store")
+    Store = ChunkStore("Chunks/chunk_store")
+    print(Store.Meta)
+    print(Store[0][:100])
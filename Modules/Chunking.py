@@ -1,16 +1,33 @@
 from langchain.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pathlib import Path
+from Fast_Splitter import FastRecursiveSplitter
+from Corpus_Store import CorpusStore
 
 
 
 
-def Create_Text_Splitter(Chunk_Size=1000, Chunk_Overlap=200):
+# Séparateurs anglais et LaTeX, du plus grossier au plus fin
+TEXT_SEPARATORS = ["$$", "\\[", "\\]", "\n\n", "\n", ".", "!", "?", ",", " ", ""]
+
+
+def Create_Text_Splitter(Chunk_Size=1000, Chunk_Overlap=200, Backend="Native"):
+    """
+    Crée le découpeur de texte.
+
+    Args:
+        Backend: "Native" (FastRecursiveSplitter, mêmes chunks en travaillant sur des positions)
+                 ou "LangChain" (RecursiveCharacterTextSplitter).
+    """
+    if Backend == "Native":
+        return FastRecursiveSplitter(Chunk_Size=Chunk_Size, Chunk_Overlap=Chunk_Overlap, Separators=TEXT_SEPARATORS)
+    if Backend != "LangChain":
+        raise ValueError(f"Unknown splitter backend: {Backend}")
     # Use RecursiveCharacterTextSplitter with English-specific separators for better performance
     Text_Splitter = RecursiveCharacterTextSplitter(
         chunk_size=Chunk_Size,
         chunk_overlap=Chunk_Overlap,
-        separators=    ["$$", "\\[", "\\]", "\n\n", "\n", ".", "!", "?", ",", " ", ""]
+        separators=TEXT_SEPARATORS
     )
     return Text_Splitter
 
@@ -47,13 +64,17 @@ def Chunk_Text_From_File_Path(file_path, text_splitter):
 
 
 
+def List_Files_Of_Folder(Folder_Path, Extension=".txt"):
+    """
+    Retourne les fichiers Extension du dossier, triés par nom : l'ordre des chunks
+    (et donc leurs indices) ne dépend pas de l'ordre du système de fichiers.
+    """
+    return sorted(File for File in Path(Folder_Path).glob(f"*{Extension}") if File.is_file())
+
+
 def Chunk_Text_Of_Folder(Folder_Path, Text_Splitter,Extension=".txt"):
-    Folder_Path = Path(Folder_Path)
     Chunks = []
-    for File in Folder_Path.glob(f"*{Extension}"):
-        if not File.is_file():
-            continue
-
+    for File in List_Files_Of_Folder(Folder_Path, Extension):
         File_Chunks = Chunk_Text_From_File_Path(File, Text_Splitter)
         Chunks.extend(File_Chunks)
     return Chunks
@@ -61,9 +82,78 @@ def Chunk_Text_Of_Folder(Folder_Path, Text_Splitter,Extension=".txt"):
 
 
 
+from concurrent.futures import ProcessPoolExecutor
+from tqdm.auto import tqdm
+
+# Découpeur de chaque processus worker, transmis une seule fois à son démarrage
+Worker_Text_Splitter = None
+
+
+def Init_Chunking_Worker(Text_Splitter):
+    global Worker_Text_Splitter
+    Worker_Text_Splitter = Text_Splitter
+
+
+def Chunk_File_In_Worker(File):
+    return Chunk_Text_From_File_Path(File, Worker_Text_Splitter)
+
+
+def Iterate_Chunks_Of_Folder_Parallel(Folder_Path, Text_Splitter, Extension=".txt", Nb_Workers=None, Files_Per_Task=16):
+    """
+    Découpe les fichiers du dossier dans un pool de Nb_Workers processus et
+    produit les chunks de chaque fichier au fil de l'eau, dans l'ordre des fichiers.
+
+    Args:
+        Nb_Workers: nombre de processus (par défaut, le nombre de cœurs).
+        Files_Per_Task: nombre de fichiers envoyés à un worker en une fois.
+    """
+    Files = List_Files_Of_Folder(Folder_Path, Extension)
+    with ProcessPoolExecutor(max_workers=Nb_Workers, initializer=Init_Chunking_Worker, initargs=(Text_Splitter,)) as Executor:
+        for File_Chunks in Executor.map(Chunk_File_In_Worker, Files, chunksize=max(1, Files_Per_Task)):
+            yield File_Chunks
+
+
+def Chunk_Text_Of_Folder_Parallel(Folder_Path, Text_Splitter, Extension=".txt", Nb_Workers=None, Files_Per_Task=16):
+    """
+    Version parallèle de Chunk_Text_Of_Folder : même résultat, dans le même ordre.
+    """
+    Chunks = []
+    for File_Chunks in tqdm(Iterate_Chunks_Of_Folder_Parallel(Folder_Path, Text_Splitter, Extension, Nb_Workers, Files_Per_Task),
+                            total=len(List_Files_Of_Folder(Folder_Path, Extension)), desc="Chunking files", unit="file"):
+        Chunks.extend(File_Chunks)
+    return Chunks
+
+
+
+
+def Iterate_Documents_Of_Corpus_Store(Store_Folder):
+    """
+    Parcourt les pages d'un corpus compacté sous forme de Document, une page à la fois.
+    """
+    Store = CorpusStore(Store_Folder, Read_Only=True)
+    try:
+        for Title, Text in Store.Iterate_Documents():
+            yield Document(page_content=Text, metadata={"source": Title})
+    finally:
+        Store.Close()
+
+
+def Chunk_Text_Of_Corpus_Store(Store_Folder, Text_Splitter):
+    """
+    Découpe en chunks toutes les pages d'un corpus compacté, lues en flux depuis les shards.
+    """
+    Chunks = []
+    for Page_Document in Iterate_Documents_Of_Corpus_Store(Store_Folder):
+        Chunks.extend(Text_Splitter.split_documents([Page_Document]))
+    return Chunks
+
+
+
+
 import json
 import pickle
 from tqdm.auto import tqdm
+from Chunk_Store import ChunkStore
 
 def Save_Chunks_To_Pickle(Chunks, Saving_Path):
     """
@@ -84,6 +174,19 @@ def Load_Chunks_From_Pickle(Saving_Path):
     return Chunks
 
 
+def Load_Chunks_From_Jsonl(Saving_Path):
+    """
+    Charge les chunks écrits en flux (une ligne JSON {page_content, metadata} par chunk).
+    """
+    Chunks = []
+    with open(Saving_Path, "r", encoding="utf-8") as f:
+        for Line in f:
+            Record = json.loads(Line)
+            Chunks.append(Document(page_content=Record["page_content"], metadata=Record["metadata"]))
+    print(f"✅ Chunks loaded from {Saving_Path}")
+    return Chunks
+
+
 def Access_Text_Of_Chunk(chunk):
     """
     Accède au texte d'un chunk.
@@ -98,7 +201,10 @@ def Access_Text_Of_Chunk(chunk):
 def Acces_Text_Of_Chunks(Chunks):
     """
     Retourne une liste des textes de chaque chunk dans Chunks, avec une barre de progression.
+    Un ChunkStore se comporte déjà comme une liste de textes : il est retourné tel quel (aucune copie).
     """
+    if isinstance(Chunks, ChunkStore):
+        return Chunks
     Texts_Of_Chunks = []
     for chunk in tqdm(Chunks, desc="Extraction des textes des chunks"):
         Texts_Of_Chunks.append(Access_Text_Of_Chunk(chunk))
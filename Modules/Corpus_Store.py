@@ -0,0 +1,268 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+
+
+
+INDEX_FILE_NAME = "index.jsonl"
+SHARD_MAX_BYTES = 256 * 1024 * 1024
+
+
+def Safe_File_Name(Title: str) -> str:
+    """
+    Transforme un titre de page en nom de fichier sûr.
+    """
+    return Title.replace("/", "_").replace("\\", "_")
+
+
+def Is_Corpus_Store(Folder: str) -> bool:
+    """
+    Indique si Folder contient un corpus compacté (présence de l'index).
+    """
+    return os.path.isfile(os.path.join(Folder, INDEX_FILE_NAME))
+
+
+
+
+class CorpusStore:
+    """
+    Corpus compacté : les textes des pages sont ajoutés à la suite dans des
+    fichiers shard_XXXXX.bin (append-only) et un index index.jsonl associe à
+    chaque titre son emplacement (shard, offset, longueur) et l'empreinte du texte.
+
+    La lecture se fait par memory-mapping des shards, sans ouvrir un fichier par
+    page. Une page partagée par plusieurs catégories n'est stockée qu'une fois,
+    et deux titres au contenu identique pointent vers les mêmes octets.
+    """
+    def __init__(self, Root_Folder="Data", Shard_Max_Bytes=SHARD_MAX_BYTES, Read_Only=False):
+        self.Root_Folder = Root_Folder
+        self.Shard_Max_Bytes = Shard_Max_Bytes
+        self.Read_Only = Read_Only
+        if not Read_Only:
+            os.makedirs(Root_Folder, exist_ok=True)
+
+        self.Lock = threading.RLock()
+        self.Entries = {}              # titre -> (shard, offset, longueur, empreinte)
+        self.Locations_By_Hash = {}    # empreinte -> (shard, offset, longueur)
+        self.Titles_By_File_Name = {}
+        self.Maps = {}
+        self.Active_Shard = 0
+        self.Active_File = None
+        self.Index_File = None
+        self.Load_Index()
+
+    # ================ INDEX =====================
+
+    def Index_Path(self):
+        return os.path.join(self.Root_Folder, INDEX_FILE_NAME)
+
+    def Shard_Path(self, Shard):
+        return os.path.join(self.Root_Folder, f"shard_{Shard:05d}.bin")
+
+    def Register(self, Title, Shard, Offset, Length, Content_Hash):
+        self.Entries[Title] = (Shard, Offset, Length, Content_Hash)
+        self.Locations_By_Hash.setdefault(Content_Hash, (Shard, Offset, Length))
+        self.Titles_By_File_Name[f"{Safe_File_Name(Title)}.txt"] = Title
+
+    def Unregister(self, Title):
+        if self.Entries.pop(Title, None) is not None:
+            self.Titles_By_File_Name.pop(f"{Safe_File_Name(Title)}.txt", None)
+
+    def Load_Index(self):
+        """
+        Relit l'index ; les entrées qui pointent au-delà de la fin d'un shard
+        (écriture interrompue) sont ignorées.
+        """
+        if not os.path.isfile(self.Index_Path()):
+            return
+        Shard_Sizes = {}
+        with open(self.Index_Path(), "r", encoding="utf-8") as f:
+            for Line in f:
+                try:
+                    Record = json.loads(Line)
+                except json.JSONDecodeError:
+                    break
+                if Record.get("deleted"):
+                    self.Unregister(Record["title"])
+                    continue
+                Shard = Record["shard"]
+                if Shard not in Shard_Sizes:
+                    Path = self.Shard_Path(Shard)
+                    Shard_Sizes[Shard] = os.path.getsize(Path) if os.path.exists(Path) else 0
+                if Record["offset"] + Record["length"] > Shard_Sizes[Shard]:
+                    continue
+                self.Register(Record["title"], Shard, Record["offset"], Record["length"], Record["hash"])
+        if Shard_Sizes:
+            self.Active_Shard = max(Shard_Sizes)
+
+    # ================ ÉCRITURE =====================
+
+    def Put(self, Title: str, Text: str) -> bool:
+        """
+        Ajoute ou remplace le texte d'une page. Retourne False si la page était
+        déjà stockée avec le même contenu (aucun octet écrit).
+        """
+        if self.Read_Only:
+            raise PermissionError("Corpus store opened in read-only mode.")
+        Data = Text.encode("utf-8")
+        Content_Hash = hashlib.sha1(Data).hexdigest()
+        with self.Lock:
+            Entry = self.Entries.get(Title)
+            if Entry is not None and Entry[3] == Content_Hash:
+                return False
+
+            Location = self.Locations_By_Hash.get(Content_Hash)
+            if Location is None:
+                Location = self.Append(Data)
+            Shard, Offset, Length = Location
+
+            if self.Index_File is None:
+                self.Index_File = open(self.Index_Path(), "a", encoding="utf-8")
+            self.Index_File.write(json.dumps({
+                "title": Title, "shard": Shard, "offset": Offset, "length": Length, "hash": Content_Hash
+            }, ensure_ascii=False) + "\n")
+            self.Register(Title, Shard, Offset, Length, Content_Hash)
+            return True
+
+    def Delete(self, Title: str) -> bool:
+        """
+        Retire une page de l'index (une ligne "deleted" est ajoutée à l'index ; ses
+        octets restent dans le shard). Retourne False si la page n'était pas stockée.
+        """
+        if self.Read_Only:
+            raise PermissionError("Corpus store opened in read-only mode.")
+        with self.Lock:
+            if Title not in self.Entries:
+                return False
+            if self.Index_File is None:
+                self.Index_File = open(self.Index_Path(), "a", encoding="utf-8")
+            self.Index_File.write(json.dumps({"title": Title, "deleted": True}, ensure_ascii=False) + "\n")
+            self.Unregister(Title)
+            return True
+
+    def Append(self, Data: bytes) -> Tuple[int, int, int]:
+        if self.Active_File is None:
+            self.Active_File = open(self.Shard_Path(self.Active_Shard), "ab")
+        Offset = self.Active_File.tell()
+        if Offset > 0 and Offset + len(Data) > self.Shard_Max_Bytes:
+            self.Active_File.close()
+            self.Active_Shard += 1
+            self.Active_File = open(self.Shard_Path(self.Active_Shard), "ab")
+            Offset = 0
+        self.Active_File.write(Data)
+        return self.Active_Shard, Offset, len(Data)
+
+    def Flush(self):
+        with self.Lock:
+            if self.Active_File is not None:
+                self.Active_File.flush()
+            if self.Index_File is not None:
+                self.Index_File.flush()
+
+    # ================ LECTURE =====================
+
+    def Map_Of(self, Shard, End):
+        """
+        Retourne le memory-map d'un shard couvrant au moins End octets (remappé si le shard a grandi).
+        """
+        Map = self.Maps.get(Shard)
+        if Map is None or len(Map) < End:
+            if Shard == self.Active_Shard and self.Active_File is not None:
+                self.Active_File.flush()
+            if Map is not None:
+                Map.close()
+            with open(self.Shard_Path(Shard), "rb") as f:
+                Map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.Maps[Shard] = Map
+        return Map
+
+    def Get(self, Title: str) -> str:
+        """
+        Retourne le texte d'une page (KeyError si elle n'est pas stockée).
+        """
+        with self.Lock:
+            Shard, Offset, Length, _ = self.Entries[Title]
+            if Length == 0:
+                return ""
+            Map = self.Map_Of(Shard, Offset + Length)
+            return Map[Offset:Offset + Length].decode("utf-8")
+
+    def Get_By_File_Name(self, File_Name: str) -> str:
+        """
+        Retourne le texte d'une page à partir de son nom de fichier ('<titre sûr>.txt').
+        """
+        return self.Get(self.Titles_By_File_Name[File_Name])
+
+    def Titles(self) -> List[str]:
+        with self.Lock:
+            return list(self.Entries)
+
+    def File_Names(self) -> List[str]:
+        with self.Lock:
+            return list(self.Titles_By_File_Name)
+
+    def Iterate_Documents(self) -> Iterator[Tuple[str, str]]:
+        """
+        Parcourt les pages (titre, texte) une par une, dans l'ordre d'insertion.
+        """
+        for Title in self.Titles():
+            yield Title, self.Get(Title)
+
+    def Stats(self) -> Dict[str, int]:
+        with self.Lock:
+            return {
+                "pages": len(self.Entries),
+                "unique_texts": len(self.Locations_By_Hash),
+                "stored_bytes": sum(Length for _, _, Length in self.Locations_By_Hash.values()),
+            }
+
+    def __len__(self):
+        return len(self.Entries)
+
+    def __contains__(self, Title):
+        return Title in self.Entries
+
+    def Close(self):
+        with self.Lock:
+            self.Flush()
+            for File in (self.Active_File, self.Index_File):
+                if File is not None:
+                    File.close()
+            self.Active_File = None
+            self.Index_File = None
+            for Map in self.Maps.values():
+                Map.close()
+            self.Maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *Exc_Info):
+        self.Close()
+
+
+def Convert_Folder_To_Corpus_Store(Folder_Path, Store_Folder, Extension=".txt"):
+    """
+    Importe les fichiers texte d'un dossier (un fichier par page) dans un corpus compacté.
+    """
+    Nb_Written = 0
+    with CorpusStore(Store_Folder) as Store:
+        for File_Name in sorted(os.listdir(Folder_Path)):
+            if not File_Name.endswith(Extension):
+                continue
+            with open(os.path.join(Folder_Path, File_Name), "r", encoding="utf-8") as f:
+                Nb_Written += Store.Put(File_Name[:-len(Extension)], f.read())
+        print(f"✅ {Nb_Written} pages written to {Store_Folder} ({Store.Stats()})")
+    return Nb_Written
+
+
+if __name__ == "__main__":
+    # Example usage
+    Convert_Folder_To_Corpus_Store("Data", "Data_Store")
+    Store = CorpusStore("Data_Store", Read_Only=True)
+    for Title in Store.Titles()[:3]:
+        print(Title, Store.Get(Title)[:100])
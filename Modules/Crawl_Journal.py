@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+
+
+
+
+def Hash_Content(Text: str) -> str:
+    """
+    Empreinte SHA-1 du contenu d'une page.
+    """
+    return hashlib.sha1(Text.encode("utf-8")).hexdigest()
+
+
+
+
+class CrawlJournal:
+    """
+    Journal persistant (SQLite) d'un crawl Wikipedia.
+
+    Il enregistre, pour chaque page, sa révision (revid, timestamp), l'empreinte
+    de son contenu et les fichiers écrits, ainsi que les listes de membres des
+    catégories déjà parcourues. Un crawl interrompu reprend là où il s'est arrêté,
+    un rafraîchissement ne télécharge que les pages dont le revid a changé, et les
+    étapes suivantes (chunking, embedding) peuvent demander quels fichiers ont
+    changé depuis leur dernier passage.
+    """
+    def __init__(self, Db_Path="Crawl_Journal.sqlite"):
+        Folder = os.path.dirname(Db_Path)
+        if Folder:
+            os.makedirs(Folder, exist_ok=True)
+        self.Db_Path = Db_Path
+        self.Lock = threading.Lock()
+        self.Connection = sqlite3.connect(Db_Path, check_same_thread=False)
+        with self.Lock, self.Connection:
+            self.Connection.executescript("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    title TEXT PRIMARY KEY,
+                    revid INTEGER,
+                    timestamp TEXT,
+                    content_hash TEXT,
+                    file_paths TEXT,
+                    updated_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS categories (
+                    category TEXT PRIMARY KEY,
+                    members TEXT,
+                    completed_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS stages (
+                    stage TEXT PRIMARY KEY,
+                    consumed_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS pages_updated_at ON pages (updated_at);
+            """)
+
+    # ================ CATÉGORIES =====================
+
+    def Get_Category_Members(self, Category: str) -> Optional[List[Dict]]:
+        """
+        Retourne les membres d'une catégorie déjà listée, ou None si elle ne l'a pas été.
+        """
+        with self.Lock:
+            Row = self.Connection.execute(
+                "SELECT members FROM categories WHERE category = ?", (Category,)
+            ).fetchone()
+        return json.loads(Row[0]) if Row else None
+
+    def Record_Category_Members(self, Category: str, Members: List[Dict]):
+        """
+        Marque la liste des membres d'une catégorie comme complète.
+        """
+        with self.Lock, self.Connection:
+            self.Connection.execute(
+                "INSERT OR REPLACE INTO categories (category, members, completed_at) VALUES (?, ?, ?)",
+                (Category, json.dumps(Members), time.time())
+            )
+
+    def Reset_Categories(self):
+        """
+        Oublie les listes de catégories pour qu'un rafraîchissement les relise sur l'API.
+        """
+        with self.Lock, self.Connection:
+            self.Connection.execute("DELETE FROM categories")
+
+    # ================ PAGES =====================
+
+    def Get_Pages(self, Titles: List[str]) -> Dict[str, Dict]:
+        """
+        Retourne les entrées connues {titre: {revid, timestamp, content_hash, file_paths}}.
+        """
+        Result = {}
+        Titles = list(Titles)
+        with self.Lock:
+            for Start in range(0, len(Titles), 500):
+                Batch = Titles[Start:Start + 500]
+                Rows = self.Connection.execute(
+                    f"SELECT title, revid, timestamp, content_hash, file_paths FROM pages "
+                    f"WHERE title IN ({','.join('?' * len(Batch))})",
+                    Batch
+                ).fetchall()
+                for Title, Revid, Timestamp, Content_Hash, File_Paths in Rows:
+                    Result[Title] = {
+                        "revid": Revid,
+                        "timestamp": Timestamp,
+                        "content_hash": Content_Hash,
+                        "file_paths": json.loads(File_Paths),
+                    }
+        return Result
+
+    def Titles_To_Fetch(self, Probed_Revisions: Dict[str, Optional[Dict]], Store=None) -> List[str]:
+        """
+        À partir d'une sonde {titre: {revid, timestamp} ou None}, retourne les titres
+        à (re)télécharger : inconnus du journal, revid modifié ou fichier disparu.
+        Les pages manquantes côté Wikipedia (None) sont ignorées.
+
+        Args:
+            Store: corpus compacté (CorpusStore) où les pages sont écrites, sans fichier
+                par page : une page absente du corpus est aussi retéléchargée.
+        """
+        Known = self.Get_Pages(Probed_Revisions)
+        Titles = []
+        for Title, Revision in Probed_Revisions.items():
+            if Revision is None:
+                continue
+            Entry = Known.get(Title)
+            if (
+                Entry is None
+                or Entry["revid"] != Revision.get("revid")
+                or not all(os.path.exists(Path) for Path in Entry["file_paths"])
+                or (Store is not None and Title not in Store)
+            ):
+                Titles.append(Title)
+        return Titles
+
+    def Record_Pages(self, Records: List[Dict]):
+        """
+        Enregistre un lot de pages écrites, chaque entrée ayant les clés
+        title, revid, timestamp, content et file_paths.
+        La date de mise à jour n'avance que si le contenu ou les fichiers ont changé.
+        """
+        Now = time.time()
+        Known = self.Get_Pages([Record["title"] for Record in Records])
+        with self.Lock, self.Connection:
+            for Record in Records:
+                Content_Hash = Hash_Content(Record["content"])
+                Entry = Known.get(Record["title"])
+                Changed = (
+                    Entry is None
+                    or Entry["content_hash"] != Content_Hash
+                    or Entry["file_paths"] != Record["file_paths"]
+                )
+                self.Connection.execute(
+                    "INSERT INTO pages (title, revid, timestamp, content_hash, file_paths, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(title) DO UPDATE SET revid = excluded.revid, timestamp = excluded.timestamp, "
+                    "content_hash = excluded.content_hash, file_paths = excluded.file_paths, "
+                    "updated_at = CASE WHEN ? THEN excluded.updated_at ELSE pages.updated_at END",
+                    (
+                        Record["title"], Record.get("revid"), Record.get("timestamp"),
+                        Content_Hash, json.dumps(Record["file_paths"]), Now, Changed
+                    )
+                )
+
+    # ================ ÉTAPES SUIVANTES =====================
+
+    def Changed_Pages(self, Stage: str) -> List[Tuple[str, List[str]]]:
+        """
+        Retourne les pages [(titre, fichiers)] écrites ou modifiées depuis le dernier Mark_Stage_Consumed(Stage).
+        """
+        with self.Lock:
+            Row = self.Connection.execute(
+                "SELECT consumed_at FROM stages WHERE stage = ?", (Stage,)
+            ).fetchone()
+            Since = Row[0] if Row else 0.0
+            Rows = self.Connection.execute(
+                "SELECT title, file_paths FROM pages WHERE updated_at > ? ORDER BY updated_at", (Since,)
+            ).fetchall()
+        return [(Title, json.loads(File_Paths)) for Title, File_Paths in Rows]
+
+    def Get_Changed_Files(self, Stage: str) -> List[str]:
+        """
+        Retourne les fichiers écrits ou modifiés depuis le dernier Mark_Stage_Consumed(Stage).
+        """
+        return [Path for _, File_Paths in self.Changed_Pages(Stage) for Path in File_Paths]
+
+    def Get_Changed_Titles(self, Stage: str) -> List[str]:
+        """
+        Retourne les titres écrits ou modifiés depuis le dernier Mark_Stage_Consumed(Stage)
+        (utile pour un corpus compacté, où les pages ne sont pas des fichiers).
+        """
+        return [Title for Title, _ in self.Changed_Pages(Stage)]
+
+    def Mark_Stage_Consumed(self, Stage: str, Timestamp: float = None):
+        """
+        Indique que l'étape Stage a traité tous les fichiers modifiés jusqu'à Timestamp (maintenant par défaut).
+        """
+        with self.Lock, self.Connection:
+            self.Connection.execute(
+                "INSERT OR REPLACE INTO stages (stage, consumed_at) VALUES (?, ?)",
+                (Stage, Timestamp if Timestamp is not None else time.time())
+            )
+
+    def Close(self):
+        with self.Lock:
+            self.Connection.close()
@@ -0,0 +1,308 @@
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+from Chunk_Store import ChunkStore
+from Embedding_Shards import (SHARD_SIZE, SHARDS_MANIFEST_FILE, SHARDS_MANIFEST_VERSION, Assemble_Shards,
+                              Fingerprint_Texts, Shard_File_Name, Write_Json_Atomic)
+from Embeddings_Chunks import Create_Annoy_Index, Create_Embedder, Embed_Chunks, Embedder_Name, Save_Annoy_Index
+
+
+
+
+JOB_FILE = "job.json"
+LEASE_SECONDS = 600
+POLL_SECONDS = 5
+
+
+
+
+# ================ JOB =====================
+def Job_Paths(Job_Folder: str) -> Dict[str, str]:
+    return {"job": os.path.join(Job_Folder, JOB_FILE), "shards": os.path.join(Job_Folder, "shards"),
+            "leases": os.path.join(Job_Folder, "leases"), "done": os.path.join(Job_Folder, "done")}
+
+
+def Init_Embedding_Job(
+    Job_Folder: str,
+    Chunk_Store_Folder: str,
+    Embedding_Model: str,
+    Shard_Size: int = SHARD_SIZE,
+    Dtype: str = "float32",
+    Backend: str = "PyTorch",
+    Quantize: bool = False,
+    Batch_Size: int = 16,
+    Token_Budget: int = None
+) -> Dict:
+    """
+    Prépare un job d'embedding distribué dans Job_Folder (système de fichiers partagé) :
+    job.json décrit le modèle, le ChunkStore à lire et l'empreinte des textes de chaque shard.
+    Un job existant avec les mêmes réglages et les mêmes textes est repris tel quel.
+    """
+    Paths = Job_Paths(Job_Folder)
+    for Name in ("shards", "leases", "done"):
+        os.makedirs(Paths[Name], exist_ok=True)
+    with ChunkStore(Chunk_Store_Folder) as Store:
+        Nb_Chunks = len(Store)
+        Fingerprints = [Fingerprint_Texts(Store[Start:Start + Shard_Size]) for Start in range(0, Nb_Chunks, Shard_Size)]
+    Job = {"version": SHARDS_MANIFEST_VERSION, "chunk_store": os.path.abspath(Chunk_Store_Folder),
+           "model": Embedding_Model, "backend": Backend, "quantize": Quantize, "dtype": np.dtype(Dtype).name,
+           "shard_size": Shard_Size, "batch_size": Batch_Size, "token_budget": Token_Budget,
+           "nb_chunks": Nb_Chunks, "fingerprints": Fingerprints}
+
+    if os.path.isfile(Paths["job"]):
+        with open(Paths["job"], "r", encoding="utf-8") as f:
+            Previous_Job = json.load(f)
+        if Previous_Job == Job:
+            print(f"Job {Job_Folder} already initialised, resuming it.")
+            return Job
+        # Les shards terminés d'un autre job ne sont plus valides
+        print(f"[Warn] Job {Job_Folder} had other settings or texts, restarting it.")
+        for Name in ("done", "leases", "shards"):
+            for File_Name in os.listdir(Paths[Name]):
+                os.remove(os.path.join(Paths[Name], File_Name))
+    Write_Json_Atomic(Job, Paths["job"])
+    print(f"✅ Job {Job_Folder}: {Nb_Chunks} chunks in {len(Fingerprints)} shard(s) of {Shard_Size}")
+    return Job
+
+
+def Marker_File_Name(Shard_Index: int, Extension: str) -> str:
+    return f"shard_{Shard_Index:05d}{Extension}"
+
+
+def Read_Job(Job_Folder: str) -> Dict:
+    with open(Job_Paths(Job_Folder)["job"], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def Done_Shards(Job_Folder: str) -> List[int]:
+    return sorted(int(File_Name[len("shard_"):-len(".json")]) for File_Name in os.listdir(Job_Paths(Job_Folder)["done"])
+                  if File_Name.endswith(".json"))
+
+
+
+
+# ================ LEASES =====================
+class ShardLease:
+    """
+    Bail sur un shard : fichier leases/shard_XXXXX.lease créé avec O_CREAT | O_EXCL (un seul
+    worker l'obtient). Tant que le worker tient le bail, un thread rafraîchit sa date de
+    modification ; un bail dont la date a plus de Lease_Seconds est expiré (worker mort) et peut
+    être repris : il est d'abord renommé (atomique, un seul worker réussit) puis recréé.
+
+    Deux workers peuvent exceptionnellement calculer le même shard (bail volé à un worker
+    seulement lent) : l'écriture des shards est idempotente (même contenu, renommage atomique).
+    """
+    def __init__(self, Leases_Folder: str, Shard_Index: int, Worker_Id: str, Lease_Seconds: int = LEASE_SECONDS):
+        self.Path = os.path.join(Leases_Folder, Marker_File_Name(Shard_Index, ".lease"))
+        self.Worker_Id = Worker_Id
+        self.Lease_Seconds = Lease_Seconds
+        self.Stop_Event = threading.Event()
+        self.Heartbeat = None
+
+    def Try_Create(self) -> bool:
+        try:
+            File_Descriptor = os.open(self.Path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(File_Descriptor, "w", encoding="utf-8") as f:
+            json.dump({"worker": self.Worker_Id, "host": socket.gethostname(), "pid": os.getpid(), "created": time.time()}, f)
+        return True
+
+    def Is_Expired(self) -> bool:
+        try:
+            return time.time() - os.path.getmtime(self.Path) > self.Lease_Seconds
+        except FileNotFoundError:
+            return True
+
+    def Acquire(self) -> bool:
+        if self.Try_Create():
+            self.Start_Heartbeat()
+            return True
+        if not self.Is_Expired():
+            return False
+        Stolen_Path = f"{self.Path}.expired.{self.Worker_Id}"
+        try:
+            os.rename(self.Path, Stolen_Path)
+        except FileNotFoundError:
+            return False  # repris par un autre worker
+        if time.time() - os.path.getmtime(Stolen_Path) <= self.Lease_Seconds:
+            # Bail rafraîchi entre le test et le renommage : il est remis en place s'il n'a pas été remplacé
+            try:
+                os.link(Stolen_Path, self.Path)
+            except FileExistsError:
+                pass
+            os.remove(Stolen_Path)
+            return False
+        os.remove(Stolen_Path)
+        print(f"[Warn] Lease {os.path.basename(self.Path)} expired, taking the shard over.")
+        return self.Acquire()
+
+    def Start_Heartbeat(self):
+        def Refresh():
+            while not self.Stop_Event.wait(self.Lease_Seconds / 3):
+                try:
+                    os.utime(self.Path)
+                except FileNotFoundError:
+                    return
+        self.Heartbeat = threading.Thread(target=Refresh, daemon=True)
+        self.Heartbeat.start()
+
+    def Release(self):
+        self.Stop_Event.set()
+        if self.Heartbeat is not None:
+            self.Heartbeat.join()
+        try:
+            with open(self.Path, "r", encoding="utf-8") as f:
+                Owner = json.load(f).get("worker")
+        except (FileNotFoundError, ValueError):
+            return
+        if Owner == self.Worker_Id:
+            os.remove(self.Path)
+
+
+
+
+# ================ WORKERS =====================
+def Run_Embedding_Worker(Job_Folder: str, Worker_Id: str = None, Lease_Seconds: int = LEASE_SECONDS,
+                         Poll_Seconds: float = POLL_SECONDS, Wait: bool = True, Num_Threads: int = None) -> int:
+    """
+    Worker d'embedding : charge le modèle une fois, puis prend les shards libres (ou dont le bail
+    a expiré) un par un jusqu'à ce que tous soient terminés. Chaque shard est écrit dans
+    shards/ (fichier temporaire renommé) puis marqué terminé dans done/.
+
+    Args:
+        Wait: si True, attend la fin des shards tenus par d'autres workers (pour reprendre
+            ceux d'un worker mort) ; sinon s'arrête dès qu'il n'y a plus de shard libre.
+
+    Returns:
+        le nombre de shards calculés par ce worker.
+    """
+    Worker_Id = Worker_Id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    Paths = Job_Paths(Job_Folder)
+    Job = Read_Job(Job_Folder)
+    Nb_Shards = len(Job["fingerprints"])
+    Embedder = Create_Embedder(Embedding_Model=Job["model"], Backend=Job["backend"], Quantize=Job["quantize"],
+                               Num_Threads=Num_Threads)
+    Nb_Embedded = 0
+    with ChunkStore(Job["chunk_store"]) as Store:
+        while True:
+            Done = set(Done_Shards(Job_Folder))
+            if len(Done) == Nb_Shards:
+                break
+            Lease = None
+            for Shard_Index in range(Nb_Shards):
+                if Shard_Index in Done:
+                    continue
+                Candidate = ShardLease(Paths["leases"], Shard_Index, Worker_Id, Lease_Seconds)
+                if Candidate.Acquire():
+                    Lease = Candidate
+                    break
+            if Lease is None:
+                if not Wait:
+                    break
+                time.sleep(Poll_Seconds)
+                continue
+            try:
+                # Terminé par un autre worker entre la liste et le bail
+                if not os.path.isfile(os.path.join(Paths["done"], Marker_File_Name(Shard_Index, ".json"))):
+                    Embed_Shard(Job, Paths, Store, Shard_Index, Embedder, Worker_Id)
+                    Nb_Embedded += 1
+            finally:
+                Lease.Release()
+    print(f"Worker {Worker_Id}: {Nb_Embedded} shard(s) embedded.")
+    return Nb_Embedded
+
+
+def Embed_Shard(Job: Dict, Paths: Dict, Store: ChunkStore, Shard_Index: int, Embedder, Worker_Id: str):
+    Start = Shard_Index * Job["shard_size"]
+    Chunks = [Store.Get_Document(Index) for Index in range(Start, min(Start + Job["shard_size"], len(Store)))]
+    Fingerprint = Fingerprint_Texts([Chunk.page_content for Chunk in Chunks])
+    if Fingerprint != Job["fingerprints"][Shard_Index]:
+        raise RuntimeError(f"Chunk store {Job['chunk_store']} changed since the job was initialised (shard {Shard_Index}).")
+    Start_Time = time.perf_counter()
+    Embeddings = np.asarray(Embed_Chunks(Chunks, Embedder, batch_size=Job["batch_size"], token_budget=Job["token_budget"]),
+                            dtype=np.float32)
+    Shard_Path = os.path.join(Paths["shards"], Shard_File_Name(Shard_Index))
+    Temporary_Path = f"{Shard_Path}.{Worker_Id}.tmp"
+    with open(Temporary_Path, "wb") as f:
+        np.save(f, Embeddings.astype(Job["dtype"]))
+    os.replace(Temporary_Path, Shard_Path)
+    Write_Json_Atomic({"rows": len(Chunks), "fingerprint": Fingerprint, "worker": Worker_Id,
+                       "seconds": time.perf_counter() - Start_Time},
+                      os.path.join(Paths["done"], Marker_File_Name(Shard_Index, ".json")))
+    print(f"✅ [{Worker_Id}] shard {Shard_Index + 1}/{len(Job['fingerprints'])} embedded ({len(Chunks)} chunks)")
+
+
+def Run_Local_Workers(Job_Folder: str, Nb_Workers: int = 2, Lease_Seconds: int = LEASE_SECONDS,
+                      Poll_Seconds: float = POLL_SECONDS, Threads_Per_Worker: int = 1):
+    """
+    Lance Nb_Workers workers dans des processus de cette machine sur le même job
+    (même protocole que des workers sur plusieurs hôtes).
+    """
+    Context = multiprocessing.get_context("spawn")
+    Processes = [Context.Process(target=Run_Embedding_Worker, args=(Job_Folder, f"local-{Index}", Lease_Seconds, Poll_Seconds,
+                                                                     True, Threads_Per_Worker))
+                 for Index in range(Nb_Workers)]
+    for Process in Processes:
+        Process.start()
+    for Process in Processes:
+        Process.join()
+    return [Process.exitcode for Process in Processes]
+
+
+
+
+# ================ FINALIZER =====================
+def Finalize_Embedding_Job(Job_Folder: str, Output_Path: str, Index_Path: str = None, Num_Trees: int = 10):
+    """
+    Vérifie que tous les shards sont terminés, les concatène dans la matrice .npy Output_Path
+    et construit l'index Annoy (Index_Path). Écrit aussi le manifeste de Embedding_Shards, ce
+    qui permet de reprendre ces shards avec Embed_Chunks_Sharded.
+
+    Returns:
+        la matrice des embeddings (memory-mappée).
+    """
+    Paths = Job_Paths(Job_Folder)
+    Job = Read_Job(Job_Folder)
+    Nb_Shards = len(Job["fingerprints"])
+    Missing = sorted(set(range(Nb_Shards)) - set(Done_Shards(Job_Folder)))
+    if Missing:
+        raise RuntimeError(f"{len(Missing)} shard(s) not embedded yet: {Missing[:10]}")
+
+    Shards = {}
+    for Shard_Index in range(Nb_Shards):
+        with open(os.path.join(Paths["done"], Marker_File_Name(Shard_Index, ".json")), "r", encoding="utf-8") as f:
+            Done = json.load(f)
+        if Done["fingerprint"] != Job["fingerprints"][Shard_Index]:
+            raise RuntimeError(f"Shard {Shard_Index} was embedded from other texts.")
+        Shards[str(Shard_Index)] = {"file": Shard_File_Name(Shard_Index), "rows": Done["rows"], "fingerprint": Done["fingerprint"]}
+
+    Model_Name = Embedder_Name(Job["model"], Job["backend"], Job["quantize"])
+    Embeddings = Assemble_Shards(Paths["shards"], Nb_Shards, Output_Path=Output_Path, Dtype=Job["dtype"], Model_Name=Model_Name)
+    Write_Json_Atomic({"version": SHARDS_MANIFEST_VERSION, "model": Model_Name, "shard_size": Job["shard_size"],
+                       "dtype": Job["dtype"], "shards": Shards, "assembled": Fingerprint_Texts(Job["fingerprints"])},
+                      os.path.join(Paths["shards"], SHARDS_MANIFEST_FILE))
+    print(f"✅ {len(Embeddings)} embeddings assembled from {Nb_Shards} shard(s) into {Output_Path}")
+
+    if Index_Path:
+        Index_Folder = os.path.dirname(Index_Path)
+        if Index_Folder:
+            os.makedirs(Index_Folder, exist_ok=True)
+        Save_Annoy_Index(Create_Annoy_Index(Embeddings, num_trees=Num_Trees), Index_Path)
+        print(f"✅ Annoy index with {Num_Trees} trees saved to {Index_Path}")
+    return Embeddings
+
+
+if __name__ == "__main__":
+    # Example usage
+    Init_Embedding_Job("Embeddings/job", "Chunks/chunk_store", "BAAI/bge-small-en-v1.5", Shard_Size=1000)
+    Run_Local_Workers("Embeddings/job", Nb_Workers=2)
+    Finalize_Embedding_Job("Embeddings/job", "Embeddings/embeddings.npy", Index_Path="Annoy_Index/wikipedia_index.ann")
@@ -1,6 +1,8 @@
 import wikipediaapi
+import requests
 from typing import List, Dict, Tuple
 from tqdm.auto import tqdm
+from Http_Client import Call_With_Retries, NETWORK_ERRORS, DEFAULT_TIMEOUT, USER_AGENT
 
 def Fetch_Wikipedia_Category_Tree(
     Wiki_Api: wikipediaapi.Wikipedia,
@@ -44,18 +46,14 @@ def Fetch_Wikipedia_Category_Tree(
                         if Max_Subcategories_Per_Category is None or subcats_added < Max_Subcategories_Per_Category:
                             subcats_added += 1
                             subcat_title = member.title.replace("Category:", "")
-                            # Retry logic for network errors
-                            for attempt in range(3):
-                                try:
-                                    subcategories[subcat_title] = Build_Category_Tree(
-                                        member.categorymembers,
-                                        Current_Level + 1
-                                    )
-                                    break
-                                except (requests.exceptions.RequestException, TimeoutError, requests.exceptions.ReadTimeout) as e:
-                                    print(f"[Warn] Network error on '{subcat_title}' (attempt {attempt+1}/3): {e}")
-                                    time.sleep(2 * (attempt + 1))
-                            else:
+                            try:
+                                subcategories[subcat_title] = Call_With_Retries(
+                                    Build_Category_Tree,
+                                    Args=(member.categorymembers, Current_Level + 1),
+                                    Max_Retries=2,
+                                    Description=f"'{subcat_title}'"
+                                )
+                            except NETWORK_ERRORS:
                                 print(f"[Error] Failed to fetch subcategory '{subcat_title}' after 3 attempts.")
             except (requests.exceptions.RequestException, TimeoutError, requests.exceptions.ReadTimeout) as e:
                 print(f"[Error] Network error on member '{getattr(member, 'title', str(member))}': {e}")
@@ -74,15 +72,15 @@ def Fetch_Wikipedia_Category_Tree(
             page = Wiki_Api.page(formatted_category)
             progress.set_description(f"Processing: {formatted_category}")
             if page.exists():
-                for attempt in range(3):
-                    try:
-                        tree = Build_Category_Tree(page.categorymembers, Current_Level=0)
-                        result_tree[category_name] = tree
-                        break
-                    except (requests.exceptions.RequestException, TimeoutError, requests.exceptions.ReadTimeout) as e:
-                        print(f"[Warn] Network error on root '{formatted_category}' (attempt {attempt+1}/3): {e}")
-                        time.sleep(2 * (attempt + 1))
-                else:
+                try:
+                    result_tree[category_name] = Call_With_Retries(
+                        Build_Category_Tree,
+                        Args=(page.categorymembers,),
+                        Kwargs={"Current_Level": 0},
+                        Max_Retries=2,
+                        Description=f"root '{formatted_category}'"
+                    )
+                except NETWORK_ERRORS:
                     print(f"[Error] Failed to fetch root category '{formatted_category}' after 3 attempts.")
             else:
                 print(f"Category '{formatted_category}' does not exist.")
@@ -221,11 +219,13 @@ import wikipediaapi
 import time
 import requests
 from tqdm.auto import tqdm
+from Crawl_Journal import CrawlJournal
 
 def Save_Wikipedia_Tree_Flat_To_Files(
     Wiki_Api: wikipediaapi.Wikipedia,
     Tree_Dict: dict,
-    Root_Folder: str = "Data"
+    Root_Folder: str = "Data",
+    Journal: CrawlJournal = None
 ):
     """
     Sauvegarde le contenu des pages Wikipédia dans un seul dossier plat,
@@ -235,6 +235,8 @@ def Save_Wikipedia_Tree_Flat_To_Files(
         Wiki_Api: instance wikipediaapi.Wikipedia initialisée.
         Tree_Dict: arbre {cat: ([pages], {subcats})}
         Root_Folder: chemin racine pour créer les fichiers.
+        Journal: journal de crawl ; les pages dont le revid n'a pas changé depuis
+            le dernier passage (et dont le fichier existe) ne sont pas retéléchargées.
     """
     os.makedirs(Root_Folder, exist_ok=True)
 
@@ -247,8 +249,15 @@ def Save_Wikipedia_Tree_Flat_To_Files(
                         # Nettoyer le titre pour un nom de fichier sûr
                         safe_title = page_title.replace("/", "_").replace("\\", "_")
                         file_path = os.path.join(Root_Folder, f"{safe_title}.txt")
+                        if Journal is not None:
+                            # Sonde légère (prop=info) avant de télécharger le texte
+                            revision = {"revid": page.lastrevid, "timestamp": page.touched}
+                            if not Journal.Titles_To_Fetch({page_title: revision}):
+                                continue
                         with open(file_path, "w", encoding="utf-8") as f:
                             f.write(page.text)
+                        if Journal is not None:
+                            Journal.Record_Pages([dict(revision, title=page_title, content=page.text, file_paths=[file_path])])
                         time.sleep(0.5)  # éviter d’abuser du serveur
                     else:
                         print(f"Page '{page_title}' introuvable.")
@@ -263,8 +272,9 @@ def Save_Wikipedia_Tree_Flat_To_Files(
 
 if __name__ == "__main__":
     wiki = wikipediaapi.Wikipedia(
-        user_agent="My_Project_Name (merlin@example.com)",
-        language='en'
+        user_agent=USER_AGENT,
+        language='en',
+        timeout=DEFAULT_TIMEOUT
     )
 
     Input_Categories = [
@@ -517,5 +527,6 @@ if __name__ == "__main__":
     Save_Wikipedia_Tree_Flat_To_Files(
         Wiki_Api=wiki,
         Tree_Dict=tree,
-        Root_Folder="Data"
+        Root_Folder="Data",
+        Journal=CrawlJournal("Data/Crawl_Journal.sqlite")
     )
\ No newline at end of file
@@ -0,0 +1,482 @@
+import bz2
+import gzip
+import io
+import mmap
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from MediaWiki import Fetch_Wikipedia_Category_Tree, Collect_Tree_Pages, Normalize_Title
+from Corpus_Store import CorpusStore, Safe_File_Name
+
+
+
+
+# Début d'un flux bz2 (en-tête "BZh" + niveau + marqueur du premier bloc), aligné sur un octet
+BZ2_STREAM_MAGIC = re.compile(rb"BZh[1-9]1AY&SY")
+# Taille (compressée) visée pour chaque tâche de décompression parallèle
+TASK_BYTES = 16 * 1024 * 1024
+CATEGORY_LINK_PATTERN = re.compile(r"\[\[\s*Category\s*:\s*([^\]|]+?)\s*(?:\|([^\]]*))?\]\]", re.IGNORECASE)
+SQL_TOKEN_PATTERN = re.compile(r"\(|\)|'((?:[^'\\]|\\.)*)'|(NULL)|(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)")
+SQL_ESCAPE_PATTERN = re.compile(r"\\(.)")
+SQL_ESCAPES = {"0": "\0", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+MEDIAWIKI_XMLNS = "http://www.mediawiki.org/xml/export-0.11/"
+
+
+
+
+# ================ LECTURE DU DUMP XML =====================
+
+def Local_Name(Tag: str) -> str:
+    return Tag.rsplit("}", 1)[-1]
+
+
+def Iterate_Dump_Pages(Xml_File) -> Iterator[Tuple[int, str, Optional[str], str]]:
+    """
+    Parcourt en flux les éléments <page> d'un dump XML (document complet ou
+    fragment enveloppé) et produit des tuples (namespace, titre, cible de redirection, wikitexte).
+    """
+    Root = None
+    for Event, Element in ET.iterparse(Xml_File, events=("start", "end")):
+        if Root is None:
+            Root = Element
+        if Event != "end" or Local_Name(Element.tag) != "page":
+            continue
+        Namespace, Title, Redirect, Text = 0, "", None, ""
+        for Child in Element:
+            Name = Local_Name(Child.tag)
+            if Name == "ns":
+                Namespace = int(Child.text or 0)
+            elif Name == "title":
+                Title = Child.text or ""
+            elif Name == "redirect":
+                Redirect = Child.get("title")
+            elif Name == "revision":
+                for Field in Child:
+                    if Local_Name(Field.tag) == "text":
+                        Text = Field.text or ""
+        yield Namespace, Title, Redirect, Text
+        Root.clear()
+
+
+def Wrap_Xml_Fragment(Data: bytes) -> io.BytesIO:
+    """
+    Extrait les éléments <page> complets d'un morceau de dump décompressé
+    (les flux du dump multistream contiennent ~100 pages entières) et les enveloppe
+    dans un élément racine pour pouvoir les analyser seuls.
+    """
+    Start = Data.find(b"<page>")
+    End = Data.rfind(b"</page>")
+    if Start < 0 or End < 0:
+        return io.BytesIO(b"<pages/>")
+    return io.BytesIO(b"<pages>" + Data[Start:End + len(b"</page>")] + b"</pages>")
+
+
+def Find_Stream_Offsets(Dump_Path: str, Index_Path: str = None) -> List[int]:
+    """
+    Retourne les positions de début des flux bz2 d'un dump multistream, lues dans
+    le fichier d'index (offset:page_id:titre) s'il est fourni, sinon détectées en
+    recherchant l'en-tête bz2 dans le fichier. Un dump non multistream n'a qu'un flux.
+    """
+    Offsets = {0}
+    if Index_Path is not None:
+        Opener = bz2.open if Index_Path.endswith(".bz2") else open
+        with Opener(Index_Path, "rt", encoding="utf-8") as f:
+            for Line in f:
+                Offsets.add(int(Line.split(":", 1)[0]))
+    else:
+        with open(Dump_Path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as Map:
+            Offsets.update(Match.start() for Match in BZ2_STREAM_MAGIC.finditer(Map))
+    return sorted(Offsets)
+
+
+def Read_Stream_Index(Index_Path: str) -> Dict[str, int]:
+    """
+    Lit l'index d'un dump multistream : {titre: position du flux qui contient la page}.
+    """
+    Offset_By_Title = {}
+    Opener = bz2.open if Index_Path.endswith(".bz2") else open
+    with Opener(Index_Path, "rt", encoding="utf-8") as f:
+        for Line in f:
+            Offset, _, Title = Line.rstrip("\n").split(":", 2)
+            Offset_By_Title[Title] = int(Offset)
+    return Offset_By_Title
+
+
+def Group_Streams_Into_Tasks(Offsets: List[int], File_Size: int, Task_Bytes: int = TASK_BYTES) -> List[Tuple[int, int]]:
+    """
+    Regroupe des flux bz2 consécutifs en tâches [début, fin) d'environ Task_Bytes octets compressés.
+    """
+    Tasks = []
+    Boundaries = [Offset for Offset in Offsets if Offset < File_Size] + [File_Size]
+    Start = Boundaries[0]
+    for Boundary in Boundaries[1:]:
+        if Boundary - Start >= Task_Bytes or Boundary == File_Size:
+            Tasks.append((Start, Boundary))
+            Start = Boundary
+    return Tasks
+
+
+
+
+# ================ WORKERS =====================
+
+Worker_Selected_Titles = None
+
+
+def Init_Worker(Selected_Titles):
+    global Worker_Selected_Titles
+    Worker_Selected_Titles = Selected_Titles
+
+
+def Extract_From_Pages(Pages, Mode: str) -> List[Tuple]:
+    """
+    Mode "links" : (namespace, titre, [(catégorie, clé de tri)]) des articles et catégories.
+    Mode "texts" : (titre, cible de redirection, wikitexte) des articles sélectionnés.
+    """
+    Results = []
+    for Namespace, Title, Redirect, Text in Pages:
+        if Mode == "links":
+            if Namespace in (0, 14):
+                Links = [(Normalize_Title(Match.group(1)), (Match.group(2) or Title).strip())
+                         for Match in CATEGORY_LINK_PATTERN.finditer(Text)]
+                Results.append((Namespace, Title, Links))
+        elif Namespace == 0 and Title in Worker_Selected_Titles:
+            Results.append((Title, Normalize_Title(Redirect) if Redirect else None, Text))
+    return Results
+
+
+def Process_Dump_Task(Dump_Path: str, Start: int, End: int, Mode: str) -> List[Tuple]:
+    """
+    Décompresse les flux bz2 de [Start, End) et en extrait les pages (exécuté dans un processus worker).
+    """
+    with open(Dump_Path, "rb") as f:
+        f.seek(Start)
+        Data = bz2.decompress(f.read(End - Start))
+    return Extract_From_Pages(Iterate_Dump_Pages(Wrap_Xml_Fragment(Data)), Mode)
+
+
+def Run_Dump_Pass(
+    Dump_Path: str,
+    Mode: str,
+    Selected_Titles=None,
+    Tasks: List[Tuple[int, int]] = None,
+    Max_Workers: int = None
+) -> Iterator[Tuple]:
+    """
+    Parcourt le dump et produit les résultats de Extract_From_Pages, dans l'ordre du fichier.
+
+    Avec plusieurs flux bz2 (dump multistream), les tâches sont décompressées et
+    analysées en parallèle par Max_Workers processus ; sinon le dump est lu en flux
+    dans le processus courant.
+    """
+    if not Tasks or len(Tasks) == 1 and Tasks[0][0] == 0 and Tasks[0][1] == os.path.getsize(Dump_Path):
+        Init_Worker(Selected_Titles)
+        with bz2.open(Dump_Path, "rb") as f:
+            yield from Extract_From_Pages(tqdm(Iterate_Dump_Pages(f), desc=f"Dump ({Mode})", unit="page"), Mode)
+        return
+
+    with ProcessPoolExecutor(max_workers=Max_Workers, initializer=Init_Worker, initargs=(Selected_Titles,)) as Executor:
+        Futures = [Executor.submit(Process_Dump_Task, Dump_Path, Start, End, Mode) for Start, End in Tasks]
+        for Future in tqdm(Futures, desc=f"Dump ({Mode})", unit="task"):
+            yield from Future.result()
+
+
+
+
+# ================ TABLES SQL =====================
+
+def Unescape_Sql_String(Value: str) -> str:
+    return SQL_ESCAPE_PATTERN.sub(lambda Match: SQL_ESCAPES.get(Match.group(1), Match.group(1)), Value)
+
+
+def Iterate_Sql_Rows(Sql_Path: str, Table: str) -> Iterator[List]:
+    """
+    Parcourt en flux les lignes des instructions INSERT d'un dump SQL MediaWiki (.sql ou .sql.gz).
+    """
+    Prefix = f"INSERT INTO `{Table}` VALUES "
+    Opener = gzip.open if Sql_Path.endswith(".gz") else open
+    with Opener(Sql_Path, "rt", encoding="utf-8", errors="replace") as f:
+        for Line in f:
+            if not Line.startswith(Prefix):
+                continue
+            Row = None
+            for Match in SQL_TOKEN_PATTERN.finditer(Line, len(Prefix)):
+                Token = Match.group(0)
+                if Token == "(":
+                    Row = []
+                elif Token == ")":
+                    yield Row
+                elif Match.group(1) is not None:
+                    Row.append(Unescape_Sql_String(Match.group(1)))
+                elif Match.group(2) is not None:
+                    Row.append(None)
+                else:
+                    Row.append(Match.group(3))
+
+
+def Load_Category_Members_From_Sql(Categorylinks_Path: str, Page_Table_Path: str) -> Dict[str, List[Dict]]:
+    """
+    Construit {catégorie: [membres {'ns', 'title'}]} à partir des tables page et
+    categorylinks, avec l'ordre de l'API (pages, puis sous-catégories, triées par clé de tri).
+    """
+    Pages_By_Id = {}
+    for Row in tqdm(Iterate_Sql_Rows(Page_Table_Path, "page"), desc="page table", unit="row"):
+        Namespace = int(Row[1])
+        if Namespace in (0, 14):
+            Pages_By_Id[int(Row[0])] = (Namespace, Row[2].replace("_", " "))
+
+    Links = {}
+    for Row in tqdm(Iterate_Sql_Rows(Categorylinks_Path, "categorylinks"), desc="categorylinks table", unit="row"):
+        Page = Pages_By_Id.get(int(Row[0]))
+        if Page is None:
+            continue
+        Links.setdefault(Normalize_Title(Row[1]), []).append((Page[0], Row[2], Page[1]))
+    return Sort_Category_Members(Links)
+
+
+def Load_Category_Members_From_Dump(Dump_Path: str, Tasks=None, Max_Workers: int = None) -> Dict[str, List[Dict]]:
+    """
+    À défaut des tables SQL, reconstruit les membres des catégories à partir des
+    liens [[Category:...]] présents dans le wikitexte des articles et des pages de
+    catégorie (les catégories ajoutées par des modèles ne sont pas vues).
+    """
+    Links = {}
+    for Namespace, Title, Page_Links in Run_Dump_Pass(Dump_Path, "links", Tasks=Tasks, Max_Workers=Max_Workers):
+        for Category, Sort_Key in Page_Links:
+            Links.setdefault(Category, []).append((Namespace, Sort_Key.upper(), Title.split(":", 1)[-1] if Namespace == 14 else Title))
+    return Sort_Category_Members(Links)
+
+
+def Sort_Category_Members(Links: Dict[str, List[Tuple[int, str, str]]]) -> Dict[str, List[Dict]]:
+    return {
+        Category: [
+            {"ns": Namespace, "title": f"Category:{Title}" if Namespace == 14 else Title}
+            for Namespace, _, Title in sorted(Members, key=lambda Member: (Member[0], Member[1], Member[2]))
+        ]
+        for Category, Members in Links.items()
+    }
+
+
+
+
+# ================ INGESTION =====================
+
+def Ingest_Wikipedia_Dump(
+    Dump_Path: str,
+    Input_Category_List: List[str],
+    Output_Folder: str = "Data",
+    Output_Format: str = "Flat",
+    Index_Path: str = None,
+    Categorylinks_Path: str = None,
+    Page_Table_Path: str = None,
+    Max_Recursion_Level: int = 3,
+    Max_Pages_Per_Category: int = None,
+    Max_Subcategories_Per_Category: int = None,
+    Max_Workers: int = None,
+    Task_Bytes: int = TASK_BYTES
+) -> Dict[str, Tuple[List[str], Dict]]:
+    """
+    Construit le corpus à partir d'un dump local (pages-articles[-multistream].xml.bz2)
+    au lieu de l'API : même sélection de catégories que Fetch_Wikipedia_Category_Tree
+    (les listes de membres viennent des tables SQL categorylinks/page, ou à défaut
+    des liens [[Category:...]] du dump) et même format de sortie que les fonctions
+    de sauvegarde de MediaWiki (dossier plat de .txt ou corpus compacté).
+
+    Le dump est décompressé et analysé en parallèle, flux bz2 par flux bz2, par
+    Max_Workers processus. Une page de la sélection qui est une redirection est
+    sauvegardée avec le texte de sa cible, comme avec l'API.
+
+    Args:
+        Dump_Path: dump pages-articles (.xml.bz2).
+        Input_Category_List: catégories racines (sans 'Category:').
+        Output_Folder: dossier de sortie.
+        Output_Format: "Flat" (un .txt par page) ou "Corpus_Store".
+        Index_Path: index du dump multistream (offsets des flux) ; détectés dans le fichier sinon.
+        Categorylinks_Path, Page_Table_Path: tables SQL (.sql.gz) des liens de catégories et des pages.
+
+    Returns:
+        L'arbre {cat: ([pages], {subcats})} sélectionné.
+    """
+    Offsets = Find_Stream_Offsets(Dump_Path, Index_Path)
+    Tasks = Group_Streams_Into_Tasks(Offsets, os.path.getsize(Dump_Path), Task_Bytes)
+    print(f"{len(Offsets)} flux bz2, {len(Tasks)} tâche(s) de décompression.")
+
+    if Categorylinks_Path and Page_Table_Path:
+        Members = Load_Category_Members_From_Sql(Categorylinks_Path, Page_Table_Path)
+    else:
+        Members = Load_Category_Members_From_Dump(Dump_Path, Tasks, Max_Workers)
+
+    Tree = Fetch_Wikipedia_Category_Tree(
+        Input_Category_List,
+        Max_Recursion_Level=Max_Recursion_Level,
+        Max_Pages_Per_Category=Max_Pages_Per_Category,
+        Max_Subcategories_Per_Category=Max_Subcategories_Per_Category,
+        Listing_Function=lambda Category: Members.get(Category, [])
+    )
+    Titles = Collect_Tree_Pages(Tree)
+    Selected_Titles = frozenset(Titles)
+
+    Texts = {}
+    Redirects = {}
+    for Title, Redirect, Text in Run_Dump_Pass(Dump_Path, "texts", Selected_Titles, Tasks, Max_Workers):
+        if Redirect is None:
+            Texts[Title] = Text
+        else:
+            Redirects[Title] = Redirect
+
+    # Cibles des redirections absentes de la sélection : seuls les flux qui les
+    # contiennent sont relus si l'index est disponible
+    Targets = set()
+    for Title in Redirects:
+        Target = Redirects[Title]
+        if Target not in Texts:
+            Targets.add(Target)
+    for _ in range(3):
+        if not Targets:
+            break
+        Target_Tasks = Tasks
+        if Index_Path is not None:
+            Offset_By_Title = Read_Stream_Index(Index_Path)
+            Target_Offsets = sorted({Offset_By_Title[Target] for Target in Targets if Target in Offset_By_Title})
+            Ends = {Start: End for Start, End in zip(Offsets, Offsets[1:] + [os.path.getsize(Dump_Path)])}
+            Target_Tasks = [(Offset, Ends[Offset]) for Offset in Target_Offsets]
+        Next_Targets = set()
+        for Title, Redirect, Text in Run_Dump_Pass(Dump_Path, "texts", frozenset(Targets), Target_Tasks, Max_Workers):
+            if Redirect is None:
+                Texts[Title] = Text
+            elif Redirect not in Texts:
+                Redirects[Title] = Redirect
+                Next_Targets.add(Redirect)
+        Targets = Next_Targets
+
+    Nb_Written = 0
+    Nb_Aliases = 0
+    Written_Canonical = set()
+    Store = CorpusStore(Output_Folder) if Output_Format == "Corpus_Store" else None
+    os.makedirs(Output_Folder, exist_ok=True)
+    for Title in Titles:
+        Canonical = Title
+        Seen = {Canonical}
+        while Canonical in Redirects and Redirects[Canonical] not in Seen:
+            Canonical = Redirects[Canonical]
+            Seen.add(Canonical)
+        if Canonical not in Texts:
+            continue
+        if Canonical in Written_Canonical:
+            Nb_Aliases += 1
+            continue
+        Written_Canonical.add(Canonical)
+        if Store is not None:
+            Store.Put(Title, Texts[Canonical])
+        else:
+            with open(os.path.join(Output_Folder, f"{Safe_File_Name(Title)}.txt"), "w", encoding="utf-8") as f:
+                f.write(Texts[Canonical])
+        Nb_Written += 1
+    if Store is not None:
+        print(f"Corpus store {Output_Folder}: {Store.Stats()}")
+        Store.Close()
+
+    print(f"✅ {Nb_Written} page(s) écrite(s) dans {Output_Folder} ({len(Titles) - Nb_Written - Nb_Aliases} introuvable(s), "
+          f"{Nb_Aliases} redirection(s) vers une page déjà écrite).")
+    return Tree
+
+
+
+
+# ================ DUMP DE TEST =====================
+
+def Write_Fixture_Dump(Corpus: Dict, Folder: str, Pages_Per_Stream: int = 20, Include_Category_Links: bool = False) -> Dict[str, str]:
+    """
+    Écrit un petit dump multistream (xml.bz2 + index) et les tables page/categorylinks
+    (.sql.gz) à partir d'un corpus {categories, pages, redirects} (voir
+    MediaWiki_Stand_In.Generate_Fixture_Corpus), pour tester l'ingestion hors ligne.
+
+    Avec Include_Category_Links, les liens [[Category:...]] sont ajoutés au wikitexte
+    (ingestion sans tables SQL). Retourne les chemins des fichiers écrits.
+    """
+    from xml.sax.saxutils import escape, quoteattr
+
+    os.makedirs(Folder, exist_ok=True)
+    Parents = {}
+    for Category, Members in Corpus["categories"].items():
+        for Member in Members:
+            Parents.setdefault(Member, []).append(Category)
+
+    Records = []  # (id, ns, titre, redirection, texte)
+    for Title, Page in Corpus["pages"].items():
+        Records.append((len(Records) + 1, 0, Title, None, Page["content"]))
+    for Title, Target in Corpus["redirects"].items():
+        Records.append((len(Records) + 1, 0, Title, Target, f"#REDIRECT [[{Target}]]"))
+    for Category in Corpus["categories"]:
+        Records.append((len(Records) + 1, 14, f"Category:{Category}", None, f"Pages about {Category.lower()}."))
+    Ids = {Title: Page_Id for Page_Id, _, Title, _, _ in Records}
+
+    Paths = {
+        "dump": os.path.join(Folder, "pages-articles-multistream.xml.bz2"),
+        "index": os.path.join(Folder, "pages-articles-multistream-index.txt.bz2"),
+        "page": os.path.join(Folder, "page.sql.gz"),
+        "categorylinks": os.path.join(Folder, "categorylinks.sql.gz"),
+    }
+    Index_Lines = []
+    with open(Paths["dump"], "wb") as f:
+        f.write(bz2.compress(f'<mediawiki xmlns="{MEDIAWIKI_XMLNS}" xml:lang="en">\n  <siteinfo>\n'
+                             f'    <sitename>Wikipedia</sitename>\n  </siteinfo>\n'.encode("utf-8")))
+        for Start in range(0, len(Records), Pages_Per_Stream):
+            Offset = f.tell()
+            Xml = []
+            for Page_Id, Namespace, Title, Redirect, Text in Records[Start:Start + Pages_Per_Stream]:
+                Member_Title = Title.split(":", 1)[1] if Namespace == 14 else Title
+                Member_Key = f"Category:{Member_Title}" if Namespace == 14 else Title
+                if Include_Category_Links:
+                    Text += "".join(f"\n[[Category:{Parent}]]" for Parent in Parents.get(Member_Key, []))
+                Redirect_Xml = f"    <redirect title={quoteattr(Redirect)} />\n" if Redirect else ""
+                Xml.append(
+                    f"  <page>\n    <title>{escape(Title)}</title>\n    <ns>{Namespace}</ns>\n    <id>{Page_Id}</id>\n"
+                    f"{Redirect_Xml}    <revision>\n      <id>{1000 + Page_Id}</id>\n"
+                    f"      <text bytes=\"{len(Text)}\" xml:space=\"preserve\">{escape(Text)}</text>\n"
+                    f"    </revision>\n  </page>\n"
+                )
+                Index_Lines.append(f"{Offset}:{Page_Id}:{Title}\n")
+            f.write(bz2.compress("".join(Xml).encode("utf-8")))
+        f.write(bz2.compress(b"</mediawiki>\n"))
+    with bz2.open(Paths["index"], "wt", encoding="utf-8") as f:
+        f.writelines(Index_Lines)
+
+    def Sql_String(Value):
+        return "'" + Value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+    with gzip.open(Paths["page"], "wt", encoding="utf-8") as f:
+        Rows = [f"({Page_Id},{Namespace},{Sql_String(Title.split(':', 1)[-1] if Namespace == 14 else Title).replace(' ', '_')},"
+                f"{1 if Redirect else 0})" for Page_Id, Namespace, Title, Redirect, _ in Records]
+        f.write(f"INSERT INTO `page` VALUES {','.join(Rows)};\n")
+    with gzip.open(Paths["categorylinks"], "wt", encoding="utf-8") as f:
+        Rows = []
+        for Category, Members in Corpus["categories"].items():
+            for Member in Members:
+                if Member not in Ids:
+                    continue
+                Member_Title = Member.split(":", 1)[1] if Member.startswith("Category:") else Member
+                Rows.append(f"({Ids[Member]},{Sql_String(Category.replace(' ', '_'))},{Sql_String(Member_Title.upper())},"
+                            f"'2025-01-01 00:00:00','','uppercase',{Sql_String('subcat' if Member.startswith('Category:') else 'page')})")
+        f.write(f"INSERT INTO `categorylinks` VALUES {','.join(Rows)};\n")
+    return Paths
+
+
+if __name__ == "__main__":
+    # Example usage
+    Ingest_Wikipedia_Dump(
+        Dump_Path="Dumps/enwiki-latest-pages-articles-multistream.xml.bz2",
+        Index_Path="Dumps/enwiki-latest-pages-articles-multistream-index.txt.bz2",
+        Categorylinks_Path="Dumps/enwiki-latest-categorylinks.sql.gz",
+        Page_Table_Path="Dumps/enwiki-latest-page.sql.gz",
+        Input_Category_List=["Physics", "Chemistry", "Biology"],
+        Output_Folder="Data",
+        Max_Recursion_Level=1,
+        Max_Pages_Per_Category=10,
+        Max_Subcategories_Per_Category=3
+    )
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from Embeddings_Chunks import Create_Embedder, Embedder_Name
+
+
+
+
+WARM_UP_TEXT = "Warm-up query for the embedding model."
+
+REGISTRY_LOCK = threading.Lock()
+# (modèle, backend, quantification) -> SharedEmbedder, et verrous de chargement par modèle
+EMBEDDERS: Dict[Tuple[str, str, bool], "SharedEmbedder"] = {}
+LOADING_LOCKS: Dict[Tuple[str, str, bool], threading.Lock] = {}
+
+
+
+
+class SharedEmbedder:
+    """
+    Embedder partagé par tout le processus (requêtes Flask concurrentes, WikipediaRAG,
+    fonctions de Retrieval). Les appels sont sérialisés par un verrou : le tokenizer rapide
+    de HuggingFace ne supporte pas les appels concurrents sur une même instance.
+    """
+    def __init__(self, Embedder, Name: str):
+        self.Embedder = Embedder
+        self.Name = Name
+        self.Lock = threading.RLock()
+        self.Warm = False
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.Lock:
+            return self.Embedder.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self.Lock:
+            return self.Embedder.embed_documents(texts)
+
+    def Warm_Up(self):
+        """
+        Passe avant factice : initialisations paresseuses (poids, allocations, graphe ONNX)
+        faites au démarrage plutôt qu'à la première requête.
+        """
+        Start = time.perf_counter()
+        self.embed_query(WARM_UP_TEXT)
+        self.Warm = True
+        print(f"✅ Embedding model {self.Name} warmed up in {1000 * (time.perf_counter() - Start):.0f} ms")
+
+
+
+
+def Get_Embedder(Model_Name: str, Backend: str = "PyTorch", Quantize: bool = False, Warm_Up: bool = False) -> SharedEmbedder:
+    """
+    Retourne l'embedder du modèle, chargé une seule fois par processus. Le chargement d'un
+    modèle ne bloque pas l'accès aux modèles déjà chargés.
+    """
+    Key = (Model_Name, Backend, Quantize)
+    Shared = EMBEDDERS.get(Key)
+    if Shared is None:
+        with REGISTRY_LOCK:
+            Loading_Lock = LOADING_LOCKS.setdefault(Key, threading.Lock())
+        with Loading_Lock:
+            Shared = EMBEDDERS.get(Key)
+            if Shared is None:
+                Start = time.perf_counter()
+                Shared = SharedEmbedder(Create_Embedder(Embedding_Model=Model_Name, Backend=Backend, Quantize=Quantize),
+                                        Embedder_Name(Model_Name, Backend, Quantize))
+                print(f"Embedding model {Shared.Name} loaded in {time.perf_counter() - Start:.1f} s")
+                with REGISTRY_LOCK:
+                    EMBEDDERS[Key] = Shared
+    if Warm_Up and not Shared.Warm:
+        Shared.Warm_Up()
+    return Shared
+
+
+def Release_Embedders():
+    """
+    Oublie les modèles chargés (la mémoire est libérée quand plus rien ne les référence).
+    """
+    with REGISTRY_LOCK:
+        EMBEDDERS.clear()
+        LOADING_LOCKS.clear()
+
+
+if __name__ == "__main__":
+    # Example usage
+    Embedder = Get_Embedder("BAAI/bge-small-en-v1.5", Warm_Up=True)
+    assert Get_Embedder("BAAI/bge-small-en-v1.5") is Embedder
+    print(len(Embedder.embed_query("What is entropy?")))
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from Embeddings_Chunks import EmbeddingMatrixWriter
+
+
+
+
+CACHE_MAX_BYTES = 4 * 1024 ** 3
+# Nombre maximal de paramètres par requête SQLite (limite par défaut : 999)
+LOOKUP_BATCH = 900
+
+
+
+
+# ================ CLES =====================
+def Normalize_Text(Text: str) -> str:
+    """
+    Normalisation des textes avant hachage : les espaces multiples et retours à la ligne
+    sont réduits à une espace, ce qui ne change pas les tokens d'un tokenizer WordPiece
+    (HuggingFaceEmbeddings remplace déjà les retours à la ligne par des espaces).
+    """
+    return " ".join(Text.split())
+
+
+def Cache_Key(Model_Name: str, Text: str) -> bytes:
+    return hashlib.sha1(f"{Model_Name}\0{Normalize_Text(Text)}".encode("utf-8")).digest()
+
+
+
+
+# ================ CACHE =====================
+class EmbeddingCache:
+    """
+    Cache persistant des embeddings, adressé par le contenu : la clé est l'empreinte
+    (modèle, texte normalisé), la valeur le vecteur brut (float32 ou float16) dans une
+    base SQLite. La taille totale des vecteurs est bornée par Max_Bytes : au-delà, les
+    entrées les moins récemment utilisées sont supprimées.
+    """
+    def __init__(self, Cache_Path="Embeddings/cache.sqlite", Max_Bytes=CACHE_MAX_BYTES, Dtype="float32"):
+        Folder = os.path.dirname(Cache_Path)
+        if Folder:
+            os.makedirs(Folder, exist_ok=True)
+        self.Cache_Path = Cache_Path
+        self.Max_Bytes = Max_Bytes
+        self.Lock = threading.Lock()
+        self.Connection = sqlite3.connect(Cache_Path, check_same_thread=False)
+        self.Connection.execute("PRAGMA journal_mode=WAL")
+        self.Connection.execute("PRAGMA synchronous=NORMAL")
+        self.Connection.execute("CREATE TABLE IF NOT EXISTS vectors (key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID")
+        self.Connection.execute("CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors (last_used)")
+        self.Connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Le type des vecteurs est fixé à la création du cache
+        self.Connection.execute("INSERT OR IGNORE INTO meta VALUES ('dtype', ?), ('total_bytes', '0')", (np.dtype(Dtype).name,))
+        self.Connection.commit()
+        self.Dtype = np.dtype(self.Meta("dtype"))
+        self.Stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def Meta(self, Name):
+        return self.Connection.execute("SELECT value FROM meta WHERE name = ?", (Name,)).fetchone()[0]
+
+    def Total_Bytes(self) -> int:
+        return int(self.Meta("total_bytes"))
+
+    def Lookup(self, Model_Name: str, Texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Cherche tous les textes en une fois (requêtes groupées).
+
+        Returns:
+            {indice dans Texts: vecteur float32} pour les textes présents dans le cache.
+        """
+        Keys = [Cache_Key(Model_Name, Text) for Text in Texts]
+        Positions = {}
+        for Index, Key in enumerate(Keys):
+            Positions.setdefault(Key, []).append(Index)
+        Found = {}
+        with self.Lock:
+            Unique_Keys = list(Positions)
+            for Start in range(0, len(Unique_Keys), LOOKUP_BATCH):
+                Batch = Unique_Keys[Start:Start + LOOKUP_BATCH]
+                Rows = self.Connection.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(Batch))})", Batch
+                ).fetchall()
+                for Key, Blob in Rows:
+                    Vector = np.frombuffer(Blob, dtype=self.Dtype).astype(np.float32)
+                    for Index in Positions[Key]:
+                        Found[Index] = Vector
+            Now = time.time()
+            Hit_Keys = [Key for Key in Unique_Keys if Positions[Key][0] in Found]
+            self.Connection.executemany("UPDATE vectors SET last_used = ? WHERE key = ?", [(Now, Key) for Key in Hit_Keys])
+            self.Connection.commit()
+        self.Stats["hits"] += len(Found)
+        self.Stats["misses"] += len(Texts) - len(Found)
+        return Found
+
+    def Store(self, Model_Name: str, Texts: List[str], Vectors):
+        """
+        Ajoute les vecteurs des textes (ceux déjà présents sont ignorés), puis applique la borne de taille.
+        """
+        Now = time.time()
+        Rows = {}
+        for Text, Vector in zip(Texts, Vectors):
+            Rows[Cache_Key(Model_Name, Text)] = np.asarray(Vector, dtype=self.Dtype).tobytes()
+        if not Rows:
+            return
+        with self.Lock:
+            Added_Bytes = 0
+            for Key, Blob in Rows.items():
+                Cursor = self.Connection.execute("INSERT OR IGNORE INTO vectors VALUES (?, ?, ?)", (Key, Blob, Now))
+                Added_Bytes += len(Blob) * Cursor.rowcount
+                self.Stats["stored"] += Cursor.rowcount
+            self.Connection.execute("UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE name = 'total_bytes'", (Added_Bytes,))
+            self.Connection.commit()
+            self.Evict()
+
+    def Evict(self):
+        """
+        Supprime les entrées les moins récemment utilisées tant que la taille dépasse Max_Bytes.
+        """
+        Total = self.Total_Bytes()
+        while Total > self.Max_Bytes:
+            Rows = self.Connection.execute("SELECT key, length(vector) FROM vectors ORDER BY last_used LIMIT 1000").fetchall()
+            if not Rows:
+                break
+            Removed = []
+            for Key, Size in Rows:
+                if Total <= self.Max_Bytes:
+                    break
+                Removed.append((Key,))
+                Total -= Size
+            self.Connection.executemany("DELETE FROM vectors WHERE key = ?", Removed)
+            self.Connection.execute("UPDATE meta SET value = ? WHERE name = 'total_bytes'", (str(Total),))
+            self.Connection.commit()
+            self.Stats["evicted"] += len(Removed)
+
+    def Hit_Rate(self) -> float:
+        Requests = self.Stats["hits"] + self.Stats["misses"]
+        return self.Stats["hits"] / Requests if Requests else 0.0
+
+    def __len__(self):
+        return self.Connection.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def Close(self):
+        self.Connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *Exc_Info):
+        self.Close()
+
+
+
+
+# ================ EMBEDDING =====================
+def Embed_With_Cache(
+    Chunks: List,
+    Cache: EmbeddingCache,
+    Model_Name: str,
+    Embed_Function: Callable[[List], np.ndarray],
+    Output_Path: str = None,
+    Dtype: str = "float32"
+):
+    """
+    Consulte le cache pour tous les chunks avant tout batching ; seuls les textes absents
+    (une fois chacun) sont passés à Embed_Function, puis ajoutés au cache. Le résultat est
+    la matrice complète dans l'ordre des chunks (memory-mappée si Output_Path est fourni).
+    """
+    if not Chunks:
+        return []
+    Texts = [Chunk.page_content for Chunk in Chunks]
+    Found = Cache.Lookup(Model_Name, Texts)
+
+    # Un texte absent répété n'est calculé qu'une fois
+    Missing = {}
+    for Index, Text in enumerate(Texts):
+        if Index not in Found:
+            Missing.setdefault(Cache_Key(Model_Name, Text), []).append(Index)
+    Writer = EmbeddingMatrixWriter(len(Texts), Output_Path, Dtype, model_name=Model_Name)
+    if Found:
+        Indices = sorted(Found)
+        Writer.Write(Indices, np.stack([Found[Index] for Index in Indices]))
+    if Missing:
+        First_Indices = [Indices[0] for Indices in Missing.values()]
+        Vectors = np.asarray(Embed_Function([Chunks[Index] for Index in First_Indices]), dtype=np.float32)
+        Cache.Store(Model_Name, [Texts[Index] for Index in First_Indices], Vectors)
+        for Indices, Vector in zip(Missing.values(), Vectors):
+            Writer.Write(Indices, np.repeat(Vector[None, :], len(Indices), axis=0))
+    print(f"Embedding cache: {len(Found)} hit(s), {len(Texts) - len(Found)} miss(es) "
+          f"({100 * len(Found) / len(Texts):.1f} % hit rate), {len(Missing)} text(s) embedded.")
+    return Writer.Close()
+
+
+if __name__ == "__main__":
+    # Example usage
+    from langchain_core.documents import Document
+    from Embeddings_Chunks import Create_Embedder, Embed_Chunks
+
+    Embedder = Create_Embedder(Embedding_Model="BAAI/bge-small-en-v1.5")
+    Chunks = [Document(page_content="Water boils at 100 degrees Celsius."),
+              Document(page_content="The capital of France is Paris.")]
+    with EmbeddingCache("Embeddings/cache.sqlite") as Cache:
+        for _ in range(2):
+            Embeddings = Embed_With_Cache(Chunks, Cache, "BAAI/bge-small-en-v1.5", lambda Missing: Embed_Chunks(Missing, Embedder))
+        print(f"Hit rate: {100 * Cache.Hit_Rate():.1f} %, {len(Cache)} entries, {Cache.Total_Bytes()} bytes")
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from Embeddings_Chunks import EmbeddingMatrixWriter, Load_Embeddings
+
+
+
+
+SHARDS_MANIFEST_VERSION = 1
+SHARDS_MANIFEST_FILE = "manifest.json"
+SHARD_SIZE = 20000
+
+
+
+
+# ================ MANIFEST =====================
+def Shard_File_Name(Shard_Index: int) -> str:
+    return f"shard_{Shard_Index:05d}.npy"
+
+
+def Fingerprint_Texts(Texts: List[str]) -> str:
+    """
+    Empreinte des textes d'un shard : un shard terminé n'est réutilisé que pour les mêmes chunks.
+    """
+    Hasher = hashlib.sha1()
+    for Text in Texts:
+        Hasher.update(Text.encode("utf-8"))
+        Hasher.update(b"\0")
+    return Hasher.hexdigest()
+
+
+def Write_Json_Atomic(Data: Dict, Path: str):
+    with open(Path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(Data, f, indent=1)
+    os.replace(Path + ".tmp", Path)
+
+
+def Load_Shards_Manifest(Shards_Folder: str, Model_Name: str, Shard_Size: int, Dtype: str) -> Dict:
+    """
+    Charge le manifeste des shards terminés. Un manifeste d'un autre modèle, d'une autre
+    taille de shard ou d'un autre type est ignoré (tout est recalculé).
+    """
+    Settings = {"version": SHARDS_MANIFEST_VERSION, "model": Model_Name, "shard_size": Shard_Size, "dtype": np.dtype(Dtype).name}
+    Path = os.path.join(Shards_Folder, SHARDS_MANIFEST_FILE)
+    if os.path.isfile(Path):
+        with open(Path, "r", encoding="utf-8") as f:
+            Manifest = json.load(f)
+        if all(Manifest.get(Key) == Value for Key, Value in Settings.items()):
+            return Manifest
+        print(f"[Warn] Shards in {Shards_Folder} were made with other settings, starting over.")
+    return dict(Settings, shards={}, assembled=None)
+
+
+
+
+# ================ SHARDED EMBEDDING =====================
+def Embed_Chunks_Sharded(
+    Chunks: List,
+    Embed_Function: Callable[[List], np.ndarray],
+    Shards_Folder: str,
+    Output_Path: str = None,
+    Shard_Size: int = SHARD_SIZE,
+    Model_Name: str = None,
+    Dtype: str = "float32",
+    Resume: bool = True,
+    Shard_Stats: Dict = None
+):
+    """
+    Embedde les chunks par shards de Shard_Size chunks, chacun écrit sur disque (fichier
+    temporaire renommé) dès qu'il est calculé et inscrit dans le manifeste. Un calcul
+    interrompu reprend là où il s'est arrêté : les shards terminés dont les textes n'ont pas
+    changé sont ignorés. La matrice finale est assemblée en concaténant les shards.
+
+    Args:
+        Embed_Function: fonction chunks -> matrice d'embeddings (par exemple WikipediaRAG.Embed_Chunks).
+        Output_Path: matrice .npy assemblée (memory-mappée) ; en mémoire si None.
+        Resume: False pour effacer les shards existants et tout recalculer.
+        Shard_Stats: dict optionnel complété avec le nombre de shards calculés / ignorés,
+            de chunks embeddés et le temps passé à les embedder.
+
+    Returns:
+        la matrice des embeddings, dans l'ordre des chunks.
+    """
+    if not Resume and os.path.isdir(Shards_Folder):
+        shutil.rmtree(Shards_Folder)
+    os.makedirs(Shards_Folder, exist_ok=True)
+    Manifest = Load_Shards_Manifest(Shards_Folder, Model_Name, Shard_Size, Dtype)
+    Manifest_Path = os.path.join(Shards_Folder, SHARDS_MANIFEST_FILE)
+
+    Nb_Shards = (len(Chunks) + Shard_Size - 1) // Shard_Size
+    Fingerprints = []
+    Nb_Skipped = 0
+    Nb_Embedded_Chunks = 0
+    Embedding_Seconds = 0.0
+    for Shard_Index in range(Nb_Shards):
+        Shard_Chunks = Chunks[Shard_Index * Shard_Size:(Shard_Index + 1) * Shard_Size]
+        Fingerprint = Fingerprint_Texts([Chunk.page_content for Chunk in Shard_Chunks])
+        Fingerprints.append(Fingerprint)
+        Shard_Path = os.path.join(Shards_Folder, Shard_File_Name(Shard_Index))
+        Entry = Manifest["shards"].get(str(Shard_Index))
+        if Entry is not None and Entry["fingerprint"] == Fingerprint and os.path.isfile(Shard_Path):
+            Nb_Skipped += 1
+            continue
+
+        Start = time.perf_counter()
+        Embeddings = np.asarray(Embed_Function(Shard_Chunks), dtype=np.float32)
+        Embedding_Seconds += time.perf_counter() - Start
+        Nb_Embedded_Chunks += len(Shard_Chunks)
+        with open(Shard_Path + ".tmp", "wb") as f:
+            np.save(f, Embeddings.astype(Dtype))
+        os.replace(Shard_Path + ".tmp", Shard_Path)
+        Manifest["shards"][str(Shard_Index)] = {"file": Shard_File_Name(Shard_Index), "rows": len(Shard_Chunks),
+                                                "fingerprint": Fingerprint}
+        Manifest["assembled"] = None
+        Write_Json_Atomic(Manifest, Manifest_Path)
+        print(f"✅ Shard {Shard_Index + 1}/{Nb_Shards} embedded ({len(Shard_Chunks)} chunks)")
+
+    # Shards au-delà du corpus actuel (corpus raccourci)
+    for Shard_Index in [int(Key) for Key in Manifest["shards"] if int(Key) >= Nb_Shards]:
+        del Manifest["shards"][str(Shard_Index)]
+        Shard_Path = os.path.join(Shards_Folder, Shard_File_Name(Shard_Index))
+        if os.path.isfile(Shard_Path):
+            os.remove(Shard_Path)
+    print(f"{Nb_Shards - Nb_Skipped} shard(s) embedded, {Nb_Skipped} already done.")
+    if Shard_Stats is not None:
+        Shard_Stats.update(shards=Nb_Shards, embedded_shards=Nb_Shards - Nb_Skipped, skipped_shards=Nb_Skipped,
+                           embedded_chunks=Nb_Embedded_Chunks, elapsed_s=Embedding_Seconds)
+
+    # Matrice déjà assemblée à partir des mêmes shards : simple chargement
+    Job_Fingerprint = Fingerprint_Texts(Fingerprints)
+    if Output_Path and Manifest.get("assembled") == Job_Fingerprint and os.path.isfile(Output_Path):
+        return Load_Embeddings(Output_Path)
+    Embeddings = Assemble_Shards(Shards_Folder, Nb_Shards, Output_Path=Output_Path, Dtype=Dtype, Model_Name=Model_Name)
+    if Output_Path:
+        Manifest["assembled"] = Job_Fingerprint
+    Write_Json_Atomic(Manifest, Manifest_Path)
+    return Embeddings
+
+
+def Assemble_Shards(Shards_Folder: str, Nb_Shards: int, Output_Path: str = None, Dtype: str = "float32", Model_Name: str = None):
+    """
+    Concatène les Nb_Shards premiers shards dans une matrice (memory-mappée si Output_Path est fourni),
+    shard par shard, sans les charger tous en mémoire.
+    """
+    Shard_Paths = [os.path.join(Shards_Folder, Shard_File_Name(Shard_Index)) for Shard_Index in range(Nb_Shards)]
+    Shards = [np.load(Path, mmap_mode="r") for Path in Shard_Paths]
+    if not Shards:
+        return []
+    Writer = EmbeddingMatrixWriter(sum(len(Shard) for Shard in Shards), Output_Path, Dtype, model_name=Model_Name)
+    Start = 0
+    for Shard in Shards:
+        Writer.Write(slice(Start, Start + len(Shard)), np.asarray(Shard, dtype=np.float32))
+        Start += len(Shard)
+    return Writer.Close()
+
+
+if __name__ == "__main__":
+    # Example usage
+    from langchain_core.documents import Document
+    from Embeddings_Chunks import Create_Embedder, Embed_Chunks
+
+    Embedder = Create_Embedder(Embedding_Model="BAAI/bge-small-en-v1.5")
+    Chunks = [Document(page_content=f"Paragraph {Index} about thermodynamics.") for Index in range(10)]
+    Embeddings = Embed_Chunks_Sharded(Chunks, lambda Shard_Chunks: Embed_Chunks(Shard_Chunks, Embedder),
+                                      "Embeddings/shards", Output_Path="Embeddings/embeddings.npy", Shard_Size=4,
+                                      Model_Name="BAAI/bge-small-en-v1.5")
+    print(Embeddings.shape)
@@ -1,74 +1,407 @@
 
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import annoy
+import numpy as np
 from langchain.embeddings import HuggingFaceEmbeddings
 from tqdm import tqdm
 
 
 
 
-def Create_Embedder(Embedding_Model="all-MiniLM-L6-v2"):
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+
+
+def Create_Embedder(Embedding_Model="all-MiniLM-L6-v2", Backend="PyTorch", Quantize=False, Num_Threads=None):
     """
     Crée un objet d'embedding à partir du modèle spécifié.
-    """
 
+    Args:
+        Backend: "PyTorch" (HuggingFaceEmbeddings) ou "Onnx" (ONNX Runtime sur CPU, modèle exporté au premier usage).
+        Quantize: avec "Onnx", utilise le modèle quantifié dynamiquement en int8.
+        Num_Threads: avec "Onnx", threads d'ONNX Runtime (par défaut, tous les cœurs).
+    """
+    if Backend == "Onnx":
+        from Onnx_Embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(Embedding_Model, Quantize=Quantize, Num_Threads=Num_Threads)
+    if Backend != "PyTorch":
+        raise ValueError(f"Unknown embedding backend: {Backend} (expected 'PyTorch' or 'Onnx')")
     return HuggingFaceEmbeddings(model_name=Embedding_Model)
 
 
-def Embed_Chunks(chunks, embedder, batch_size=16):
+def Embedder_Name(Embedding_Model, Backend="PyTorch", Quantize=False):
+    """
+    Nom identifiant les vecteurs produits (cache, shards, description des matrices) :
+    les vecteurs ONNX int8 diffèrent légèrement de ceux de PyTorch.
+    """
+    if Backend == "Onnx" and Quantize:
+        return f"{Embedding_Model}@onnx-int8"
+    return Embedding_Model
+
+
+def Embed_Chunks(chunks, embedder, batch_size=16, token_budget=None, max_batch_size=256, embedding_stats=None,
+                 output_path=None, dtype="float32"):
     """
     Prend une liste de chunks et un objet d'embedding, et retourne les embeddings des chunks.
     Utilise un traitement par batch et affiche une barre de progression avec tqdm.
+
+    Args:
+        batch_size: nombre de chunks par batch, dans l'ordre du corpus (si token_budget est None).
+        token_budget: si fourni, les chunks sont triés par longueur en tokens et regroupés en
+            batches dont la taille paddée (nombre de chunks x plus long chunk) reste sous ce budget.
+            Les embeddings sont retournés dans l'ordre d'origine.
+        max_batch_size: nombre maximal de chunks par batch avec token_budget.
+        embedding_stats: dict optionnel complété avec le ratio de padding et le débit.
+        output_path: si fourni (.npy), les embeddings sont écrits directement dans une matrice
+            memory-mappée sur disque (avec son fichier .json de description).
+        dtype: "float32" ou "float16".
+
+    Returns:
+        Une matrice NumPy (nombre de chunks x dimension), memory-mappée si output_path est fourni.
     """
     if not chunks:
         return []
 
     texts = [chunk.page_content for chunk in chunks]
-    embeddings = []
+    start = time.perf_counter()
+
+    if token_budget is None:
+        batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+    else:
+        lengths = Count_Tokens(texts, embedder)
+        batches = Make_Token_Budget_Batches(lengths, token_budget, max_batch_size)
+
+    writer = EmbeddingMatrixWriter(len(texts), output_path, dtype, model_name=getattr(embedder, "model_name", None))
+    for batch in tqdm(batches, desc="Embedding chunks"):
+        writer.Write(batch, Embed_Batch(embedder, [texts[i] for i in batch]))
+    embeddings = writer.Close()
+
+    if embedding_stats is not None or token_budget is not None:
+        elapsed = time.perf_counter() - start
+        lengths = lengths if token_budget is not None else Count_Tokens(texts, embedder)
+        stats = Batching_Stats(lengths, batches, elapsed)
+        print(f"Embedded {len(texts)} chunks in {len(batches)} batches: {stats['chunks_per_s']:.1f} chunks/s, "
+              f"{stats['tokens_per_s']:.0f} tokens/s, padding {100 * stats['padding_ratio']:.1f} %")
+        if embedding_stats is not None:
+            embedding_stats.update(stats)
+
+    return embeddings
+
+
+def Embed_Batch(embedder, texts):
+    """
+    Embedde un batch en une seule passe : le batch_size interne de sentence-transformers
+    (encode_kwargs) est aligné sur la taille du batch, sur une copie de l'embedder
+    (l'embedder ONNX, lui, encode directement le batch entier).
+    """
+    if hasattr(embedder, "Encode"):
+        return embedder.Encode(texts)
+    encode_kwargs = getattr(embedder, "encode_kwargs", None)
+    if isinstance(encode_kwargs, dict) and hasattr(embedder, "model_copy"):
+        embedder = embedder.model_copy(update={"encode_kwargs": dict(encode_kwargs, batch_size=len(texts))})
+    return embedder.embed_documents(texts)
+
+
+def Count_Tokens(texts, embedder=None):
+    """
+    Longueur en tokens de chaque texte (tronquée à max_seq_length) avec le tokenizer du
+    modèle de l'embedder ; à défaut, estimation par le nombre de mots et de ponctuations.
+    """
+    # HuggingFaceEmbeddings porte le modèle dans client ; OnnxEmbeddings porte lui-même son tokenizer
+    client = getattr(embedder, "client", embedder)
+    tokenizer = getattr(client, "tokenizer", None)
+    if tokenizer is not None:
+        max_length = getattr(client, "max_seq_length", None) or 512
+        encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+    return [len(TOKEN_PATTERN.findall(text)) + 2 for text in texts]
+
+
+def Make_Token_Budget_Batches(lengths, token_budget, max_batch_size=256):
+    """
+    Trie les indices par longueur décroissante et forme des batches dont la taille
+    paddée (nombre d'éléments x longueur du premier, le plus long) ne dépasse pas token_budget.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches = []
+    batch = []
+    for i in order:
+        if batch and ((len(batch) + 1) * lengths[batch[0]] > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def Batching_Stats(lengths, batches, elapsed):
+    real_tokens = sum(lengths)
+    padded_tokens = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+    return {
+        "chunks": len(lengths),
+        "batches": len(batches),
+        "real_tokens": real_tokens,
+        "padded_tokens": padded_tokens,
+        "padding_ratio": 1 - real_tokens / padded_tokens if padded_tokens else 0.0,
+        "elapsed_s": elapsed,
+        "chunks_per_s": len(lengths) / elapsed if elapsed else 0.0,
+        "tokens_per_s": real_tokens / elapsed if elapsed else 0.0,
+    }
+
+
+
+# ================ MULTI-PROCESS EMBEDDING =====================
+# Embedder de chaque processus worker, chargé une seule fois à son démarrage
+worker_embedder = None
+
+
+def Count_Cores():
+    """
+    Nombre de cœurs utilisables par ce processus (affinité CPU si disponible).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def Init_Embedding_Worker(embedding_model, num_threads, backend="PyTorch", quantize=False):
+    global worker_embedder
+    # Threads intra-op limités avant le chargement de torch : les workers ne se disputent pas les cœurs
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(num_threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    if backend == "PyTorch":
+        import torch
+        torch.set_num_threads(num_threads)
+    worker_embedder = Create_Embedder(Embedding_Model=embedding_model, Backend=backend, Quantize=quantize,
+                                      Num_Threads=num_threads)
 
-    for i in tqdm(range(0, len(texts), batch_size), desc="Embedding chunks"):
-        batch_texts = texts[i:i+batch_size]
-        batch_embeddings = embedder.embed_documents(batch_texts)
-        embeddings.extend(batch_embeddings)
 
+def Embed_Batch_In_Worker(texts):
+    return Embed_Batch(worker_embedder, texts)
+
+
+def Embed_Chunks_Parallel(chunks, embedding_model, nb_workers=None, batch_size=16, token_budget=None,
+                          max_batch_size=256, threads_per_worker=None, embedding_stats=None, output_path=None, dtype="float32",
+                          backend="PyTorch", quantize=False):
+    """
+    Embedde les chunks dans un pool de processus ; chaque worker charge le modèle une fois
+    et limite torch à threads_per_worker threads. Les batches sont distribués à la demande
+    (les plus longs d'abord avec token_budget) et les embeddings sont retournés dans l'ordre.
+
+    Avec nb_workers <= 1, ou si le pool s'interrompt, le calcul se fait dans ce processus (Embed_Chunks).
+
+    Args:
+        nb_workers: nombre de processus (par défaut, le nombre de cœurs).
+        threads_per_worker: threads torch par worker (par défaut, cœurs / nb_workers).
+        token_budget: voir Embed_Chunks ; les longueurs sont estimées sans charger le modèle ici.
+        output_path, dtype: voir Embed_Chunks.
+        backend, quantize: voir Create_Embedder.
+    """
+    if not chunks:
+        return []
+    nb_cores = Count_Cores()
+    nb_workers = nb_workers or nb_cores
+    if nb_workers <= 1:
+        return Embed_Chunks(chunks, Create_Embedder(Embedding_Model=embedding_model, Backend=backend, Quantize=quantize),
+                            batch_size=batch_size, token_budget=token_budget, max_batch_size=max_batch_size,
+                            embedding_stats=embedding_stats, output_path=output_path, dtype=dtype)
+    threads_per_worker = threads_per_worker or max(1, nb_cores // nb_workers)
+
+    texts = [chunk.page_content for chunk in chunks]
+    start = time.perf_counter()
+    if token_budget is None:
+        batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+    else:
+        batches = Make_Token_Budget_Batches(Count_Tokens(texts), token_budget, max_batch_size)
+
+    # fork tant que torch n'est pas chargé ici (pas de threads OpenMP hérités), spawn sinon
+    start_method = "fork" if "torch" not in sys.modules and "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    writer = EmbeddingMatrixWriter(len(texts), output_path, dtype, model_name=embedding_model)
+    try:
+        with ProcessPoolExecutor(max_workers=nb_workers, mp_context=multiprocessing.get_context(start_method),
+                                 initializer=Init_Embedding_Worker, initargs=(embedding_model, threads_per_worker, backend, quantize)) as executor:
+            batch_results = executor.map(Embed_Batch_In_Worker, ([texts[i] for i in batch] for batch in batches))
+            for batch, batch_embeddings in tqdm(zip(batches, batch_results), total=len(batches), desc="Embedding chunks"):
+                writer.Write(batch, batch_embeddings)
+        embeddings = writer.Close()
+    except BrokenProcessPool as error:
+        writer.Abort()
+        print(f"[Warn] Embedding pool failed ({error}), falling back to a single process.")
+        return Embed_Chunks(chunks, Create_Embedder(Embedding_Model=embedding_model, Backend=backend, Quantize=quantize),
+                            batch_size=batch_size, token_budget=token_budget, max_batch_size=max_batch_size,
+                            embedding_stats=embedding_stats, output_path=output_path, dtype=dtype)
+
+    stats = Batching_Stats(Count_Tokens(texts), batches, time.perf_counter() - start)
+    stats.update(nb_workers=nb_workers, threads_per_worker=threads_per_worker)
+    print(f"Embedded {len(texts)} chunks with {nb_workers} processes x {threads_per_worker} threads: "
+          f"{stats['chunks_per_s']:.1f} chunks/s, padding {100 * stats['padding_ratio']:.1f} %")
+    if embedding_stats is not None:
+        embedding_stats.update(stats)
     return embeddings
 
 
 
-def Save_Embeddings(embeddings, saving_path):
+# ================ EMBEDDING MATRIX =====================
+def Sidecar_Path(matrix_path):
+    return os.path.splitext(matrix_path)[0] + ".json"
+
+
+class EmbeddingMatrixWriter:
     """
-    Sauvegarde les embeddings dans un fichier .pt avec torch.
+    Matrice d'embeddings préallouée, remplie batch par batch (lignes dans l'ordre des chunks).
+    Avec un chemin .npy, elle est memory-mappée dans un fichier temporaire renommé à la
+    fermeture, avec un fichier .json décrivant le modèle, la dimension et le nombre de lignes.
+    La dimension est connue au premier batch.
     """
-    import torch
-    torch.save(embeddings, saving_path)
+    def __init__(self, count, output_path=None, dtype="float32", model_name=None):
+        self.Count = count
+        self.Output_Path = output_path
+        self.Dtype = np.dtype(dtype)
+        self.Model_Name = model_name
+        self.Matrix = None
+        self.Temporary_Path = f"{os.path.splitext(output_path)[0]}.tmp.npy" if output_path else None
+
+    def Write(self, rows, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.Matrix is None:
+            shape = (self.Count, embeddings.shape[1])
+            if self.Output_Path is None:
+                self.Matrix = np.empty(shape, dtype=self.Dtype)
+            else:
+                folder = os.path.dirname(self.Output_Path)
+                if folder:
+                    os.makedirs(folder, exist_ok=True)
+                self.Matrix = np.lib.format.open_memmap(self.Temporary_Path, mode="w+", dtype=self.Dtype, shape=shape)
+        self.Matrix[rows] = embeddings
+
+    def Close(self):
+        if self.Matrix is None:
+            self.Write([], np.zeros((0, 0), dtype=np.float32))
+        if self.Output_Path is None:
+            return self.Matrix
+        self.Matrix.flush()
+        del self.Matrix
+        os.replace(self.Temporary_Path, self.Output_Path)
+        Write_Embedding_Sidecar(self.Output_Path, self.Model_Name, self.Count, self.Dtype)
+        return Load_Embeddings(self.Output_Path)
+
+    def Abort(self):
+        self.Matrix = None
+        if self.Temporary_Path and os.path.exists(self.Temporary_Path):
+            os.remove(self.Temporary_Path)
+
+
+def Write_Embedding_Sidecar(matrix_path, model_name, count, dtype):
+    matrix = np.load(matrix_path, mmap_mode="r")
+    with open(Sidecar_Path(matrix_path), "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "dimension": int(matrix.shape[1]), "count": int(count),
+                   "dtype": np.dtype(dtype).name}, f)
+
+
+def Read_Embedding_Sidecar(matrix_path):
+    with open(Sidecar_Path(matrix_path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def Save_Embeddings(embeddings, saving_path, model_name=None, dtype=None, block_rows=65536):
+    """
+    Sauvegarde les embeddings. Un chemin .npy donne une matrice dense (dtype float32 ou
+    float16) et son fichier .json ; tout autre chemin garde l'ancien format torch (.pth).
+    """
+    if not saving_path.endswith(".npy"):
+        import torch
+        torch.save(embeddings, saving_path)
+        return
+    if isinstance(embeddings, np.ndarray) and dtype is None:
+        dtype = embeddings.dtype
+    writer = EmbeddingMatrixWriter(len(embeddings), saving_path, dtype or "float32", model_name=model_name)
+    for start in range(0, len(embeddings), block_rows):
+        rows = list(range(start, min(start + block_rows, len(embeddings))))
+        writer.Write(rows, embeddings[start:start + block_rows])
+    writer.Close()
 
 def Load_Embeddings(saving_path):
     """
-    Charge les embeddings depuis un fichier .pt avec torch.
+    Charge les embeddings : une matrice .npy est ouverte en memory-map (lecture seule,
+    aucune ligne n'est chargée avant d'être lue) ; un fichier .pth est chargé avec torch.
     """
+    if saving_path.endswith(".npy"):
+        return np.load(saving_path, mmap_mode="r")
     import torch
     return torch.load(saving_path)
 
 
 
+def Iterate_Embedding_Blocks(embeddings, block_rows=65536):
+    """
+    Parcourt les embeddings par blocs de lignes en float32 (matrice memory-mappée ou liste).
+    """
+    for start in range(0, len(embeddings), block_rows):
+        yield start, np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+
+
 def Create_Annoy_Index(embeddings, num_trees=10):
     """
-    Crée un index Annoy à partir des embeddings fournis.
+    Crée un index Annoy à partir des embeddings fournis (liste ou matrice, éventuellement memory-mappée).
     """
-    if not embeddings:
+    if embeddings is None or len(embeddings) == 0:
         raise ValueError("Les embeddings ne peuvent pas être vides.")
 
     # Créer l'index Annoy
     index = annoy.AnnoyIndex(len(embeddings[0]), 'angular')
 
-    # Ajouter les embeddings à l'index
-    for i, embedding in enumerate(embeddings):
-        index.add_item(i, embedding)
+    # Ajouter les embeddings à l'index, un bloc de lignes à la fois
+    for start, block in Iterate_Embedding_Blocks(embeddings):
+        for offset, embedding in enumerate(block):
+            index.add_item(start + offset, embedding)
 
     # Construire l'index avec le nombre de trees spécifié
     index.build(num_trees)
 
     return index
 
+
+def Exact_Search(embeddings, query_embedding, num_results=10, block_rows=65536):
+    """
+    Recherche exacte (similarité cosinus) par blocs sur la matrice d'embeddings : sert de
+    référence pour mesurer le rappel d'Annoy. Les distances sont celles d'Annoy en mode
+    angular, sqrt(2 - 2 cos).
+
+    Returns:
+        (indices, distances) des num_results plus proches voisins.
+    """
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+    best_indices = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start, block in Iterate_Embedding_Blocks(embeddings, block_rows):
+        norms = np.linalg.norm(block, axis=1)
+        norms[norms == 0] = 1.0
+        scores = block @ query / norms
+        if len(scores) > num_results:
+            top = np.argpartition(-scores, num_results)[:num_results]
+        else:
+            top = np.arange(len(scores))
+        best_indices = np.concatenate([best_indices, start + top])
+        best_scores = np.concatenate([best_scores, scores[top]])
+        if len(best_scores) > num_results:
+            keep = np.argpartition(-best_scores, num_results)[:num_results]
+            best_indices, best_scores = best_indices[keep], best_scores[keep]
+    order = np.argsort(-best_scores, kind="stable")
+    distances = np.sqrt(np.maximum(0.0, 2 - 2 * best_scores[order]))
+    return best_indices[order].tolist(), distances.tolist()
+
 def Save_Annoy_Index(index, file_path):
     """
     Sauvegarde l'index Annoy dans un fichier.
@@ -87,7 +420,7 @@ def Search_Annoy_Index(index, query_embedding, num_results=10):
     """
     Recherche dans l'index Annoy et retourne les indices des résultats les plus proches.
     """
-    if not query_embedding:
+    if query_embedding is None or len(query_embedding) == 0:
         raise ValueError("L'embedding de la requête ne peut pas être vide.")
 
     # Trouver les indices des résultats les plus proches
@@ -0,0 +1,198 @@
+import copy
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Tuple
+
+from langchain_core.documents import Document
+
+
+
+
+class FastRecursiveSplitter:
+    """
+    Découpeur récursif équivalent à RecursiveCharacterTextSplitter (séparateurs
+    littéraux, keep_separator=True, strip_whitespace=True, longueur en caractères)
+    mais qui travaille uniquement sur des positions dans le texte : les morceaux,
+    leurs fusions et le strip final sont des couples (début, fin) et seule la
+    chaîne de chaque chunk émis est finalement extraite.
+
+    Expose split_text / split_documents / create_documents comme LangChain, il peut
+    donc remplacer le découpeur partout (Chunking, Pipeline, Chunk_Manifest). Les
+    documents créés portent metadata["start_index"] (position du chunk dans le texte,
+    comme add_start_index de LangChain), repris tel quel par le ChunkStore.
+    """
+    def __init__(self, Chunk_Size=1000, Chunk_Overlap=200, Separators=None):
+        if Chunk_Size <= 0:
+            raise ValueError(f"Chunk_Size must be > 0, got {Chunk_Size}")
+        if Chunk_Overlap < 0 or Chunk_Overlap > Chunk_Size:
+            raise ValueError(f"Chunk_Overlap must be between 0 and Chunk_Size, got {Chunk_Overlap}")
+        self.Chunk_Size = Chunk_Size
+        self.Chunk_Overlap = Chunk_Overlap
+        self.Separators = list(Separators or ["\n\n", "\n", " ", ""])
+
+    def Split_Spans(self, Text: str) -> List[Tuple[int, int]]:
+        """
+        Retourne les spans (début, fin) des chunks de Text, dans l'ordre.
+        """
+        Spans = []
+        self.Split_Range(Text, 0, len(Text), 0, Spans)
+        return Spans
+
+    def Split_Range(self, Text: str, Start: int, End: int, First_Separator: int, Spans: List[Tuple[int, int]]):
+        # Premier séparateur présent dans Text[Start:End] (le séparateur vide découpe par caractère)
+        Separators = self.Separators
+        Index = len(Separators) - 1
+        for Candidate in range(First_Separator, len(Separators)):
+            if not Separators[Candidate] or Text.find(Separators[Candidate], Start, End) != -1:
+                Index = Candidate
+                break
+        Separator = Separators[Index]
+        Has_Next_Separators = bool(Separator) and Index + 1 < len(Separators)
+
+        # Longueurs des morceaux avec le séparateur en tête (keep_separator=True), mesurées
+        # par str.find sur [Start, End) : ni copie de la plage ni chaîne par morceau
+        if Separator:
+            Lengths = []
+            Separator_Length = len(Separator)
+            Piece_Start = Start
+            Position = Text.find(Separator, Start, End)
+            while Position != -1:
+                Lengths.append(Position - Piece_Start)
+                Piece_Start = Position
+                Position = Text.find(Separator, Position + Separator_Length, End)
+            Lengths.append(End - Piece_Start)
+        else:
+            Lengths = [1] * (End - Start)
+
+        Chunk_Size = self.Chunk_Size
+        if not Lengths or max(Lengths) < Chunk_Size:
+            self.Merge_Pieces(Text, Start, [Length for Length in Lengths if Length], Spans)
+            return
+
+        Good_Start = None
+        Good_Lengths = []
+        Piece_Start = Start
+        for Length in Lengths:
+            if not Length:
+                continue
+            Piece_End = Piece_Start + Length
+            if Length < Chunk_Size:
+                if Good_Start is None:
+                    Good_Start = Piece_Start
+                Good_Lengths.append(Length)
+            else:
+                if Good_Lengths:
+                    self.Merge_Pieces(Text, Good_Start, Good_Lengths, Spans)
+                    Good_Start, Good_Lengths = None, []
+                if Has_Next_Separators:
+                    self.Split_Range(Text, Piece_Start, Piece_End, Index + 1, Spans)
+                else:
+                    self.Append_Stripped(Text, Piece_Start, Piece_End, Spans, Strip=False)
+            Piece_Start = Piece_End
+        if Good_Lengths:
+            self.Merge_Pieces(Text, Good_Start, Good_Lengths, Spans)
+
+    def Merge_Pieces(self, Text: str, Start: int, Lengths: List[int], Spans: List[Tuple[int, int]]):
+        """
+        Fusionne des morceaux contigus (commençant à Start) en chunks d'au plus
+        Chunk_Size caractères avec Chunk_Overlap de recouvrement, comme _merge_splits.
+        """
+        if not Lengths:
+            return
+        Chunk_Size, Chunk_Overlap = self.Chunk_Size, self.Chunk_Overlap
+        # Fenêtre [Head, Tail) de morceaux ; Offsets[i] = position du morceau i relative à Start.
+        # Chaque chunk se trouve par dichotomie, sans parcourir les morceaux un à un.
+        Offsets = list(accumulate(Lengths, initial=0))
+        Nb_Pieces = len(Lengths)
+        Head = 0
+        while True:
+            Tail = bisect_right(Offsets, Offsets[Head] + Chunk_Size, Head + 1) - 1
+            if Tail >= Nb_Pieces:
+                self.Append_Stripped(Text, Start + Offsets[Head], Start + Offsets[Nb_Pieces], Spans)
+                return
+            self.Append_Stripped(Text, Start + Offsets[Head], Start + Offsets[Tail], Spans)
+            # On retire des morceaux en tête tant que la fenêtre dépasse le recouvrement
+            # ou ne laisse pas de place au morceau suivant
+            Head = bisect_left(Offsets, max(Offsets[Tail] - Chunk_Overlap, Offsets[Tail + 1] - Chunk_Size), Head, Tail)
+
+    @staticmethod
+    def Append_Stripped(Text: str, Start: int, End: int, Spans: List[Tuple[int, int]], Strip: bool = True):
+        if Strip:
+            while Start < End and Text[Start].isspace():
+                Start += 1
+            while End > Start and Text[End - 1].isspace():
+                End -= 1
+        if End > Start:
+            Spans.append((Start, End))
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[Start:End] for Start, End in self.Split_Spans(text)]
+
+    def create_documents(self, texts: List[str], metadatas: List[dict] = None) -> List[Document]:
+        Metadatas = metadatas or [{}] * len(texts)
+        return [
+            Document(page_content=Text[Start:End], metadata=dict(copy.deepcopy(Metadatas[Index]), start_index=Start))
+            for Index, Text in enumerate(texts)
+            for Start, End in self.Split_Spans(Text)
+        ]
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        Documents = list(documents)
+        return self.create_documents([Doc.page_content for Doc in Documents], [Doc.metadata for Doc in Documents])
+
+
+
+
+# ================ PARITY AND BENCHMARK =====================
+# Cas limites toujours vérifiés en plus du corpus : texte vide, blancs seuls,
+# longues suites sans séparateur (seul le séparateur vide découpe)
+PARITY_EDGE_CASES = [
+    "",
+    " \n\n \t\n  ",
+    "x" * 5000,
+    "a" * 2500 + " " + "b" * 2500 + "\n\n" + "c" * 3000,
+    "word " * 1000,
+]
+
+
+def Check_Splitter_Parity(Texts: List[str], Reference_Splitter, Fast_Splitter: FastRecursiveSplitter) -> List[int]:
+    """
+    Compare chunk par chunk la sortie des deux découpeurs sur chaque texte, puis sur
+    PARITY_EDGE_CASES (indices len(Texts) et suivants).
+
+    Returns:
+        Les indices des textes pour lesquels les chunks diffèrent (liste vide si parité).
+    """
+    Mismatches = []
+    for Index, Text in enumerate(list(Texts) + PARITY_EDGE_CASES):
+        if Reference_Splitter.split_text(Text) != Fast_Splitter.split_text(Text):
+            Mismatches.append(Index)
+    return Mismatches
+
+
+def Benchmark_Splitters(Texts: List[str], Splitters: dict, Repeats: int = 3) -> dict:
+    """
+    Mesure le débit (Mo/s et chunks/s) de chaque découpeur sur Texts ; le meilleur de Repeats passages est retenu.
+
+    Args:
+        Splitters: {nom: découpeur} exposant split_text.
+    """
+    Nb_Bytes = sum(len(Text.encode("utf-8")) for Text in Texts)
+    Report = {}
+    for Name, Splitter in Splitters.items():
+        Best = float("inf")
+        for _ in range(Repeats):
+            Start = time.perf_counter()
+            Nb_Chunks = sum(len(Splitter.split_text(Text)) for Text in Texts)
+            Best = min(Best, time.perf_counter() - Start)
+        Report[Name] = {"seconds": Best, "mb_per_s": Nb_Bytes / 1e6 / Best, "chunks_per_s": Nb_Chunks / Best, "chunks": Nb_Chunks}
+        print(f"[{Name}] {Best:.3f} s, {Report[Name]['mb_per_s']:.2f} MB/s, {Report[Name]['chunks_per_s']:.0f} chunks/s")
+    return Report
+
+
+if __name__ == "__main__":
+    # Example usage
+    Splitter = FastRecursiveSplitter(Chunk_Size=50, Chunk_Overlap=10)
+    for Start, End in Splitter.Split_Spans("Lorem ipsum dolor sit amet.\n\nConsectetur adipiscing elit, sed do eiusmod tempor."):
+        print(Start, End)
@@ -1,4 +1,4 @@
-import requests
+from Http_Client import Get_Http_Client, OLLAMA_TIMEOUT
 
 
 def Define_Default_Resource_Template():
@@ -25,7 +25,7 @@ def Generate_Response_Straight(Querry, Chunk_Sources, Resource_Template=Define_D
         "prompt": Prompt_Text,
         "stream": False
     }
-    API_Response = requests.post(API_URL, json=Request_Payload)
+    API_Response = Get_Http_Client().Post(API_URL, Json=Request_Payload, Timeout=OLLAMA_TIMEOUT)
 
 
     print(f"API OLLAMA Response Status Code: {API_Response.status_code}")
@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+
+
+# Délais (connexion, lecture) en secondes
+DEFAULT_TIMEOUT = (5, 30)
+# Une génération Ollama peut prendre plusieurs minutes
+OLLAMA_TIMEOUT = (5, 600)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+NETWORK_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, TimeoutError)
+USER_AGENT = "Scientific_Wikipedia_RAG/1.0 (https://github.com/Ayoub-Choukri/Scientific_Wikipedia_RAG)"
+
+
+def Backoff_Delay(Attempt, Backoff_Base=0.5, Backoff_Max=30.0):
+    """
+    Délai exponentiel avec gigue complète : uniforme dans [0, min(Backoff_Max, Backoff_Base * 2^Attempt)].
+    """
+    return random.uniform(0, min(Backoff_Max, Backoff_Base * (2 ** Attempt)))
+
+
+def Call_With_Retries(Function, Args=(), Kwargs=None, Max_Retries=3, Backoff_Base=1.0, Backoff_Max=30.0,
+                      Exceptions=NETWORK_ERRORS, Description=None):
+    """
+    Appelle Function(*Args, **Kwargs) et réessaie au plus Max_Retries fois,
+    avec un délai exponentiel à gigue, si l'une des Exceptions est levée.
+    """
+    Kwargs = Kwargs or {}
+    Description = Description or getattr(Function, "__name__", "call")
+    for Attempt in range(Max_Retries + 1):
+        try:
+            return Function(*Args, **Kwargs)
+        except Exceptions as e:
+            if Attempt == Max_Retries:
+                raise
+            print(f"[Warn] Network error on {Description} (attempt {Attempt+1}/{Max_Retries+1}): {e}")
+            time.sleep(Backoff_Delay(Attempt, Backoff_Base, Backoff_Max))
+
+
+
+
+class HttpClient:
+    """
+    Client HTTP partagé : une session requests avec pool de connexions keep-alive,
+    compression gzip, délais par appel, nouvelles tentatives bornées avec délai
+    exponentiel à gigue et nombre de requêtes simultanées plafonné par hôte.
+
+    Les statistiques par hôte (requêtes, nouvelles tentatives, erreurs, latence)
+    permettent de mesurer le gain de la réutilisation des connexions.
+    """
+    def __init__(self, Max_Connections_Per_Host=8, Max_Retries=3, Backoff_Base=0.5, Backoff_Max=30.0,
+                 Timeout=DEFAULT_TIMEOUT, Host_Limits=None, User_Agent=USER_AGENT):
+        self.Max_Connections_Per_Host = Max_Connections_Per_Host
+        self.Max_Retries = Max_Retries
+        self.Backoff_Base = Backoff_Base
+        self.Backoff_Max = Backoff_Max
+        self.Timeout = Timeout
+        self.Host_Limits = dict(Host_Limits or {})
+
+        self.Session = requests.Session()
+        Adapter = HTTPAdapter(pool_connections=16, pool_maxsize=Max_Connections_Per_Host, max_retries=0)
+        self.Session.mount("http://", Adapter)
+        self.Session.mount("https://", Adapter)
+        self.Session.headers.update({
+            "User-Agent": User_Agent,
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+        self.Lock = threading.Lock()
+        self.Host_Semaphores = {}
+        self.Stats = {}
+
+    def Host_Of(self, Url):
+        return urlsplit(Url).netloc
+
+    def Host_Semaphore(self, Host):
+        with self.Lock:
+            if Host not in self.Host_Semaphores:
+                Limit = self.Host_Limits.get(Host, self.Max_Connections_Per_Host)
+                self.Host_Semaphores[Host] = threading.BoundedSemaphore(Limit)
+            return self.Host_Semaphores[Host]
+
+    def Record(self, Host, Key, Value=1):
+        with self.Lock:
+            Host_Stats = self.Stats.setdefault(
+                Host, {"requests": 0, "retries": 0, "errors": 0, "total_latency": 0.0}
+            )
+            Host_Stats[Key] += Value
+
+    def Count_Retry(self, Url):
+        """
+        Comptabilise une nouvelle tentative décidée par l'appelant (ex. erreur maxlag).
+        """
+        self.Record(self.Host_Of(Url), "retries")
+
+    def Request(self, Method, Url, Timeout=None, Max_Retries=None, Retry_Statuses=RETRY_STATUS_CODES, **Kwargs):
+        """
+        Envoie une requête HTTP et la réessaie en cas d'erreur réseau ou de statut
+        dans Retry_Statuses (en respectant l'en-tête Retry-After).
+        Retourne la dernière réponse ; lève l'exception réseau si toutes les tentatives échouent.
+        """
+        Host = self.Host_Of(Url)
+        Semaphore = self.Host_Semaphore(Host)
+        Max_Retries = self.Max_Retries if Max_Retries is None else Max_Retries
+
+        for Attempt in range(Max_Retries + 1):
+            Is_Last_Attempt = Attempt == Max_Retries
+            Start = time.perf_counter()
+            try:
+                with Semaphore:
+                    Response = self.Session.request(Method, Url, timeout=Timeout or self.Timeout, **Kwargs)
+            except NETWORK_ERRORS:
+                self.Record(Host, "errors")
+                if Is_Last_Attempt:
+                    raise
+                self.Record(Host, "retries")
+                time.sleep(Backoff_Delay(Attempt, self.Backoff_Base, self.Backoff_Max))
+                continue
+            finally:
+                self.Record(Host, "requests")
+                self.Record(Host, "total_latency", time.perf_counter() - Start)
+
+            if Response.status_code not in Retry_Statuses or Is_Last_Attempt:
+                return Response
+
+            self.Record(Host, "retries")
+            Retry_After = Response.headers.get("Retry-After", "")
+            if Retry_After.isdigit():
+                Delay = min(self.Backoff_Max, float(Retry_After))
+            else:
+                Delay = Backoff_Delay(Attempt, self.Backoff_Base, self.Backoff_Max)
+            time.sleep(Delay)
+
+    def Get(self, Url, Params=None, Timeout=None, **Kwargs):
+        return self.Request("GET", Url, Timeout=Timeout, params=Params, **Kwargs)
+
+    def Post(self, Url, Json=None, Timeout=None, **Kwargs):
+        return self.Request("POST", Url, Timeout=Timeout, json=Json, **Kwargs)
+
+    def Get_Stats(self):
+        """
+        Retourne {hôte: {requests, retries, errors, mean_latency_ms}}.
+        """
+        with self.Lock:
+            return {
+                Host: {
+                    "requests": Host_Stats["requests"],
+                    "retries": Host_Stats["retries"],
+                    "errors": Host_Stats["errors"],
+                    "mean_latency_ms": 1000 * Host_Stats["total_latency"] / max(1, Host_Stats["requests"]),
+                }
+                for Host, Host_Stats in self.Stats.items()
+            }
+
+    def Reset_Stats(self):
+        with self.Lock:
+            self.Stats = {}
+
+    def Close(self):
+        self.Session.close()
+
+
+
+
+Shared_Client = None
+Shared_Client_Lock = threading.Lock()
+
+def Get_Http_Client():
+    """
+    Retourne le client HTTP partagé par tout le processus (créé au premier appel).
+    """
+    global Shared_Client
+    with Shared_Client_Lock:
+        if Shared_Client is None:
+            Shared_Client = HttpClient()
+        return Shared_Client
+
+
+def Benchmark_Connection_Reuse(Url, Params=None, Nb_Requests=20):
+    """
+    Compare la latence moyenne de Nb_Requests requêtes GET avec une nouvelle
+    connexion à chaque appel (requests.get) et avec le client partagé.
+    """
+    Start = time.perf_counter()
+    for _ in range(Nb_Requests):
+        requests.get(Url, params=Params, headers={"User-Agent": USER_AGENT}, timeout=DEFAULT_TIMEOUT)
+    Bare_Latency = (time.perf_counter() - Start) / Nb_Requests
+
+    Client = Get_Http_Client()
+    Client.Get(Url, Params=Params)  # ouverture de la connexion
+    Start = time.perf_counter()
+    for _ in range(Nb_Requests):
+        Client.Get(Url, Params=Params)
+    Pooled_Latency = (time.perf_counter() - Start) / Nb_Requests
+
+    print(f"Sans réutilisation : {1000 * Bare_Latency:.1f} ms/requête")
+    print(f"Client partagé     : {1000 * Pooled_Latency:.1f} ms/requête")
+    return {"bare_ms": 1000 * Bare_Latency, "pooled_ms": 1000 * Pooled_Latency}
+
+
+if __name__ == "__main__":
+    # Example usage
+    Benchmark_Connection_Reuse(
+        "https://en.wikipedia.org/w/api.php",
+        Params={"action": "query", "format": "json", "meta": "siteinfo"},
+        Nb_Requests=10
+    )
+    print(Get_Http_Client().Get_Stats())
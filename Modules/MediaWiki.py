@@ -1,19 +1,93 @@
-import requests
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple, Optional
 from tqdm import tqdm
 import time
 import os
+import threading
 import networkx as nx
 import matplotlib.pyplot as plt
 from adjustText import adjust_text
 import wikipediaapi
+from concurrent.futures import ThreadPoolExecutor
+from Rate_Limiting import TokenBucket, AdaptiveBackoff
+from Crawl_Journal import CrawlJournal
+from Http_Client import Get_Http_Client, NETWORK_ERRORS
+from Corpus_Store import CorpusStore, Safe_File_Name
+
+# Surchargeable (variable d'environnement ou MediaWiki.WIKI_API_ENDPOINT) pour viser un stand-in local
+WIKI_API_ENDPOINT = os.environ.get("WIKI_API_ENDPOINT", "https://en.wikipedia.org/w/api.php")
+# Nombre maximal de titres par requête prop=revisions (limite API hors bots)
+MAX_TITLES_PER_REQUEST = 50
+# Paramètre maxlag : le serveur refuse la requête si la réplication a plus de N secondes de retard
+MAXLAG_SECONDS = 5
+
+def Normalize_Title(Title: str) -> str:
+    """
+    Normalise un titre comme MediaWiki : '_' remplacés par des espaces, espaces
+    superflus supprimés et première lettre en majuscule.
+    """
+    Title = " ".join(Title.replace("_", " ").split())
+    return Title[:1].upper() + Title[1:]
+
+def Request_Wiki_Api(
+    Params: Dict,
+    Rate_Limiter: TokenBucket = None,
+    Backoff: AdaptiveBackoff = None
+) -> Dict:
+    """
+    Envoie une requête GET à l'API MediaWiki et retourne la réponse JSON.
 
-WIKI_API_ENDPOINT = "https://en.wikipedia.org/w/api.php"
+    Respecte le débit du Rate_Limiter et réessaie (au plus Backoff.Max_Retries fois)
+    en cas d'erreur réseau, de HTTP 429/5xx ou d'erreur maxlag. Les requêtes passent
+    par le client HTTP partagé (connexions réutilisées, délais) ; les nouvelles
+    tentatives sont gérées ici pour que le débit s'adapte au serveur.
+    """
+    Client = Get_Http_Client()
+    if Backoff is None:
+        Backoff = AdaptiveBackoff(Rate_Limiter)
+    Params = dict(Params, maxlag=MAXLAG_SECONDS)
+
+    for Attempt in range(Backoff.Max_Retries + 1):
+        if Rate_Limiter is not None:
+            Rate_Limiter.Acquire()
+        Is_Last_Attempt = Attempt == Backoff.Max_Retries
+        try:
+            Response = Client.Get(WIKI_API_ENDPOINT, Params=Params, Max_Retries=0)
+        except NETWORK_ERRORS as e:
+            if Is_Last_Attempt:
+                raise
+            print(f"[Warn] Network error (attempt {Attempt+1}/{Backoff.Max_Retries+1}): {e}")
+            Client.Count_Retry(WIKI_API_ENDPOINT)
+            Backoff.On_Throttle(Attempt)
+            continue
+
+        Retry_After = Response.headers.get("Retry-After")
+        Retry_After = float(Retry_After) if Retry_After and Retry_After.isdigit() else None
+        if Response.status_code == 429 or Response.status_code >= 500:
+            if Is_Last_Attempt:
+                Response.raise_for_status()
+            Client.Count_Retry(WIKI_API_ENDPOINT)
+            Backoff.On_Throttle(Attempt, Retry_After)
+            continue
+
+        Data = Response.json()
+        if Data.get("error", {}).get("code") == "maxlag":
+            if Is_Last_Attempt:
+                raise RuntimeError(f"MediaWiki API still lagged after {Attempt+1} attempts: {Data['error']}")
+            Client.Count_Retry(WIKI_API_ENDPOINT)
+            Backoff.On_Throttle(Attempt, Retry_After)
+            continue
+
+        Backoff.On_Success()
+        return Data
+
+    raise RuntimeError("Unreachable")
 
 def Get_Category_Members(
     Category: str,
     Cmcontinue: str = None,
-    Max_Members: int = None
+    Max_Members: int = None,
+    Rate_Limiter: TokenBucket = None,
+    Backoff: AdaptiveBackoff = None
 ) -> Tuple[List[Dict], str]:
     """
     Récupère les membres d'une catégorie via MediaWiki API.
@@ -29,8 +103,7 @@ def Get_Category_Members(
     if Cmcontinue:
         Params["cmcontinue"] = Cmcontinue
 
-    Response = requests.get(WIKI_API_ENDPOINT, params=Params)
-    Data = Response.json()
+    Data = Request_Wiki_Api(Params, Rate_Limiter=Rate_Limiter, Backoff=Backoff)
     Members = Data.get("query", {}).get("categorymembers", [])
     Cmcontinue = Data.get("continue", {}).get("cmcontinue", None)
 
@@ -39,100 +112,277 @@ def Get_Category_Members(
 
     return Members, Cmcontinue
 
+def Get_Pages_Revisions(
+    Titles: List[str],
+    Rvprop: str = "content",
+    Batch_Size: int = MAX_TITLES_PER_REQUEST,
+    Delay_Between_Requests: float = 0.0,
+    Resolved_Titles: Dict[str, str] = None,
+    Rate_Limiter: TokenBucket = None,
+    Backoff: AdaptiveBackoff = None
+) -> Dict[str, Optional[Dict]]:
+    """
+    Récupère en bloc la dernière révision de plusieurs pages via MediaWiki API,
+    en envoyant jusqu'à Batch_Size titres par requête prop=revisions.
+
+    Les titres normalisés et les redirections sont résolus par l'API puis
+    ramenés vers les titres demandés ; une page manquante est associée à None.
+
+    Args:
+        Titles: liste de titres de pages.
+        Rvprop: propriétés de révision demandées (ex. "content", "ids|timestamp").
+        Batch_Size: nombre de titres par requête (max API : 50).
+        Delay_Between_Requests: délai entre deux requêtes API.
+        Resolved_Titles: si fourni, complété par {titre demandé: titre canonique}.
+        Rate_Limiter, Backoff: débit et attente partagés par les threads qui interrogent l'API.
+
+    Returns:
+        Dictionnaire {titre demandé: révision (dict) ou None}
+    """
+    Unique_Titles = list(dict.fromkeys(Titles))
+    Batch_Size = max(1, min(Batch_Size, MAX_TITLES_PER_REQUEST))
+    Result = {}
+
+    for Start in range(0, len(Unique_Titles), Batch_Size):
+        if Start > 0 and Delay_Between_Requests:
+            time.sleep(Delay_Between_Requests)
+        Batch = Unique_Titles[Start:Start + Batch_Size]
+        Params = {
+            "action": "query",
+            "format": "json",
+            "prop": "revisions",
+            "rvprop": Rvprop,
+            "titles": "|".join(Batch),
+            "redirects": 1,
+            "formatversion": 2
+        }
+
+        Revisions = {}
+        Aliases = {}
+        while True:
+            Data = Request_Wiki_Api(Params, Rate_Limiter=Rate_Limiter, Backoff=Backoff)
+            Query = Data.get("query", {})
+            for Alias in Query.get("normalized", []) + Query.get("redirects", []):
+                Aliases[Alias["from"]] = Alias["to"]
+            for Page in Query.get("pages", []):
+                # En cas de continuation, une page déjà servie revient sans révision
+                if "revisions" in Page:
+                    Revisions[Page["title"]] = Page["revisions"][0]
+            Continue = Data.get("continue")
+            if not Continue:
+                break
+            Params.update(Continue)
+
+        for Title in Batch:
+            Resolved = Title
+            Seen = {Resolved}
+            while Resolved in Aliases and Aliases[Resolved] not in Seen:
+                Resolved = Aliases[Resolved]
+                Seen.add(Resolved)
+            Result[Title] = Revisions.get(Resolved)
+            if Resolved_Titles is not None:
+                Resolved_Titles[Title] = Resolved
+
+    return Result
+
+def Get_Pages_Wikitext(
+    Titles: List[str],
+    Batch_Size: int = MAX_TITLES_PER_REQUEST,
+    Delay_Between_Requests: float = 0.0
+) -> Dict[str, str]:
+    """
+    Récupère le wikitexte brut de plusieurs pages en un minimum de requêtes.
+    Une page manquante est associée à une chaîne vide.
+    """
+    Revisions = Get_Pages_Revisions(
+        Titles,
+        Rvprop="content",
+        Batch_Size=Batch_Size,
+        Delay_Between_Requests=Delay_Between_Requests
+    )
+    return {
+        Title: (Revision.get("content", "") if Revision else "")
+        for Title, Revision in Revisions.items()
+    }
+
 def Get_Page_Wikitext(Title: str) -> str:
     """
     Récupère le contenu wikitexte brut d'une page via MediaWiki API.
     """
-    Params = {
-        "action": "query",
-        "format": "json",
-        "prop": "revisions",
-        "rvprop": "content",
-        "titles": Title,
-        "formatversion": 2
-    }
-    Response = requests.get(WIKI_API_ENDPOINT, params=Params)
-    Data = Response.json()
-    Pages = Data.get("query", {}).get("pages", [])
-    if Pages and "revisions" in Pages[0]:
-        return Pages[0]["revisions"][0]["content"]
-    else:
-        return ""
+    return Get_Pages_Wikitext([Title])[Title]
+
+def Fetch_All_Category_Members(
+    Category: str,
+    Rate_Limiter: TokenBucket = None,
+    Backoff: AdaptiveBackoff = None
+) -> List[Dict]:
+    """
+    Récupère tous les membres d'une catégorie en suivant la pagination cmcontinue.
+    """
+    Cmcontinue = None
+    Members_Accum = []
+    while True:
+        Members, Cmcontinue = Get_Category_Members(
+            Category,
+            Cmcontinue=Cmcontinue,
+            Max_Members=None,  # on récupère tout, on limite après
+            Rate_Limiter=Rate_Limiter,
+            Backoff=Backoff
+        )
+        Members_Accum.extend(Members)
+        if Cmcontinue is None:
+            return Members_Accum
 
 def Fetch_Wikipedia_Category_Tree(
     Input_Category_List: List[str],
     Max_Recursion_Level: int = 3,
     Max_Pages_Per_Category: int = None,
     Max_Subcategories_Per_Category: int = None,
-    Delay_Between_Requests: float = 0.5
+    Delay_Between_Requests: float = None,
+    Max_Workers: int = 8,
+    Requests_Per_Second: float = 10.0,
+    Journal: CrawlJournal = None,
+    Crawl_Stats: Dict[str, int] = None,
+    Listing_Function: Callable[[str], List[Dict]] = None
 ) -> Dict[str, Tuple[List[str], Dict]]:
     """
     Construit un arbre de catégories Wikipedia sous forme {cat: ([pages], {subcats})}
     en utilisant l’API MediaWiki.
 
+    Les catégories sont récupérées en parallèle par Max_Workers threads ; le débit
+    global est borné par un seau de jetons et ralenti automatiquement en cas de
+    réponse HTTP 429, 5xx ou maxlag.
+
+    Le graphe des catégories n'est pas un arbre (catégories partagées, cycles) :
+    les titres sont normalisés et un ensemble de catégories visitées, partagé par
+    toutes les racines, garantit que chaque liste de membres n'est demandée qu'une
+    fois (et relue depuis le Journal lors d'un crawl suivant). Une catégorie déjà
+    développée apparaît comme une feuille vide lorsqu'elle est atteinte à nouveau.
+
     Args:
         Input_Category_List: liste de catégories racines (sans 'Category:').
         Max_Recursion_Level: profondeur max.
         Max_Pages_Per_Category: nombre max de pages par catégorie.
         Max_Subcategories_Per_Category: nombre max de sous-catégories par catégorie.
-        Delay_Between_Requests: délai entre requêtes API.
+        Delay_Between_Requests: si fourni, fixe le débit à 1 / Delay_Between_Requests requêtes par seconde.
+        Max_Workers: nombre de requêtes simultanées.
+        Requests_Per_Second: débit maximal de requêtes API.
+        Journal: journal de crawl ; les catégories déjà listées y sont relues au lieu d'être retéléchargées.
+        Crawl_Stats: si fourni, complété par les compteurs de déduplication du crawl.
+        Listing_Function: source alternative des membres d'une catégorie (ex. dump local),
+            retournant des dicts {'ns', 'title'} comme l'API ; par défaut l'API MediaWiki.
 
     Returns:
         Dictionnaire imbriqué {cat: ([pages], {subcats})}
     """
-
-    def Build_Category_Tree(
-        Category: str,
-        Current_Level: int = 0
-    ) -> Tuple[List[str], Dict]:
-
-        Pages = []
-        Subcategories = []
-        Subcategories_Dict = {}
-
-        Cmcontinue = None
-        Members_Accum = []
-
-        while True:
-            Members, Cmcontinue = Get_Category_Members(
-                Category,
-                Cmcontinue=Cmcontinue,
-                Max_Members=None  # on récupère tout, on limite après
-            )
-            Members_Accum.extend(Members)
-            if Cmcontinue is None:
-                break
-            time.sleep(Delay_Between_Requests)
-
+    if Delay_Between_Requests:
+        Requests_Per_Second = 1.0 / Delay_Between_Requests
+
+    Rate_Limiter = TokenBucket(Rate=Requests_Per_Second, Capacity=Max_Workers)
+    Backoff = AdaptiveBackoff(Rate_Limiter)
+
+    Stats = Crawl_Stats if Crawl_Stats is not None else {}
+    for Key in ("categories_reached", "categories_expanded", "categories_revisited",
+                "listings_fetched", "listings_from_journal"):
+        Stats.setdefault(Key, 0)
+    Stats_Lock = threading.Lock()
+
+    def Count(Key, Value=1):
+        with Stats_Lock:
+            Stats[Key] += Value
+
+    def Fetch_Category_Listing(Category: str) -> List[Dict]:
+        if Listing_Function is not None:
+            Count("listings_fetched")
+            return Listing_Function(Category)
+        if Journal is not None:
+            Members_Accum = Journal.Get_Category_Members(Category)
+            if Members_Accum is not None:
+                Count("listings_from_journal")
+                return Members_Accum
+        Members_Accum = Fetch_All_Category_Members(Category, Rate_Limiter, Backoff)
+        Count("listings_fetched")
+        if Journal is not None:
+            Journal.Record_Category_Members(Category, Members_Accum)
+        return Members_Accum
+
+    def Split_Members(Members_Accum: List[Dict]) -> Tuple[List[str], List[str]]:
+        # filtrer uniquement pages (ns=0)
+        pages_only = [m for m in Members_Accum if m['ns'] == 0]
         if Max_Pages_Per_Category is not None:
-            # filtrer uniquement pages (ns=0)
-            pages_only = [m for m in Members_Accum if m['ns'] == 0]
             pages_only = pages_only[:Max_Pages_Per_Category]
-        else:
-            pages_only = [m for m in Members_Accum if m['ns'] == 0]
-
-        Pages = [p['title'] for p in pages_only]
+        Pages = list(dict.fromkeys(Normalize_Title(p['title']) for p in pages_only))
 
         subcats_all = [m['title'].replace("Category:", "") for m in Members_Accum if m['ns'] == 14]
-
         if Max_Subcategories_Per_Category is not None:
             Subcategories = subcats_all[:Max_Subcategories_Per_Category]
         else:
             Subcategories = subcats_all
-
-        if Current_Level < Max_Recursion_Level:
-            # *** Ici plus de tqdm, simple boucle ***
-            for Subcat in Subcategories:
-                Subcategories_Dict[Subcat] = Build_Category_Tree(Subcat, Current_Level + 1)
-        else:
-            Subcategories_Dict = {}
-
-        return Pages, Subcategories_Dict
+        return Pages, Subcategories
 
     Result_Tree = {}
-    # tqdm uniquement sur la liste racine
-    for Root_Cat in tqdm(Input_Category_List, desc="Root categories"):
-        Result_Tree[Root_Cat] = Build_Category_Tree(Root_Cat, 0)
+    Expanded_Categories = set()
+    Progress = tqdm(total=0, desc="Categories", unit="cat")
+
+    def Claim(Category: str, Parent: Dict, Level_Entries: List):
+        Category = Normalize_Title(Category)
+        if Category in Parent:
+            return
+        Count("categories_reached")
+        # Emplacement réservé tout de suite pour conserver l'ordre des clés
+        Parent[Category] = ([], {})
+        if Category in Expanded_Categories:
+            Count("categories_revisited")
+            return
+        Expanded_Categories.add(Category)
+        Level_Entries.append((Category, Parent))
+
+    Level_Entries = []
+    for Root_Cat in Input_Category_List:
+        Claim(Root_Cat, Result_Tree, Level_Entries)
+
+    # Parcours en largeur niveau par niveau : une catégorie est toujours développée
+    # à sa profondeur minimale, et l'arbre obtenu ne dépend pas de l'ordre des réponses
+    with ThreadPoolExecutor(max_workers=Max_Workers) as Executor:
+        for Current_Level in range(Max_Recursion_Level + 1):
+            if not Level_Entries:
+                break
+            Progress.total += len(Level_Entries)
+            Progress.refresh()
+            Futures = [Executor.submit(Fetch_Category_Listing, Category) for Category, _ in Level_Entries]
+            Next_Level_Entries = []
+            for (Category, Parent), Future in zip(Level_Entries, Futures):
+                try:
+                    Members_Accum = Future.result()
+                except Exception as e:
+                    print(f"[Error] Failed to fetch category '{Category}': {e}")
+                    Members_Accum = []
+
+                Pages, Subcategories = Split_Members(Members_Accum)
+                Subcategories_Dict = {}
+                Parent[Category] = (Pages, Subcategories_Dict)
+                Count("categories_expanded")
+
+                if Current_Level < Max_Recursion_Level:
+                    for Subcat in Subcategories:
+                        Claim(Subcat, Subcategories_Dict, Next_Level_Entries)
+                Progress.update(1)
+            Level_Entries = Next_Level_Entries
+
+    Progress.close()
+    if Backoff.Nb_Retries:
+        print(f"{Backoff.Nb_Retries} requête(s) réessayée(s) après limitation du serveur.")
+
+    def Count_Page_Occurrences(Tree: dict) -> int:
+        return sum(len(pages) + Count_Page_Occurrences(subcats) for pages, subcats in Tree.values())
+
+    Stats["pages_reached"] = Count_Page_Occurrences(Result_Tree)
+    Stats["unique_pages"] = len(Collect_Tree_Pages(Result_Tree))
+    Stats["unique_categories"] = len(Expanded_Categories)
+    print(f"Déduplication : {Stats['categories_reached']} catégorie(s) atteinte(s), "
+          f"{Stats['unique_categories']} listée(s) ({Stats['listings_fetched']} à la source, "
+          f"{Stats['listings_from_journal']} depuis le journal), {Stats['categories_revisited']} revisite(s) ; "
+          f"{Stats['unique_pages']} page(s) unique(s) pour {Stats['pages_reached']} occurrence(s).")
 
     return Result_Tree
 
@@ -203,67 +453,208 @@ def Draw_Tree_Graph_Colored(Graph: nx.DiGraph, Figure_Size=(20, 12)):
 def Save_Wikipedia_Tree_To_Files(
     Tree_Dict: dict,
     Root_Folder: str = "Data",
-    Delay_Between_Requests: float = 0.5
+    Delay_Between_Requests: float = 0.5,
+    Batch_Size: int = MAX_TITLES_PER_REQUEST,
+    Journal: CrawlJournal = None
 ):
     """
     Sauvegarde le contenu des pages Wikipedia dans une arborescence de dossiers,
-    structure suivant Tree_Dict.
+    structure suivant Tree_Dict. Les pages sont récupérées par lots de Batch_Size
+    titres ; une page présente dans plusieurs catégories n'est téléchargée qu'une fois.
 
     Args:
         Tree_Dict: arbre {cat: ([pages], {subcats})}
         Root_Folder: dossier racine
-        Delay_Between_Requests: délai entre requêtes API
+        Delay_Between_Requests: délai entre requêtes API (une requête par lot)
+        Batch_Size: nombre de titres par requête
+        Journal: journal de crawl ; seules les pages nouvelles ou dont le revid a changé sont téléchargées
     """
 
     os.makedirs(Root_Folder, exist_ok=True)
 
-    def Save_Pages_And_Subcats(Tree: dict, Folder: str):
+    Folders_By_Title = {}
+
+    def Collect_Pages_And_Subcats(Tree: dict, Folder: str):
         for category_name, (pages, subcats) in Tree.items():
             category_folder = os.path.join(Folder, category_name)
             os.makedirs(category_folder, exist_ok=True)
+            for page_title in pages:
+                Folders_By_Title.setdefault(page_title, []).append(category_folder)
+            if subcats:
+                Collect_Pages_And_Subcats(subcats, category_folder)
 
-            for page_title in tqdm(pages, desc=f"Saving pages in {category_name}", unit="page"):
-                wikitext = Get_Page_Wikitext(page_title)
-                safe_title = page_title.replace("/", "_").replace("\\", "_")
-                file_path = os.path.join(category_folder, f"{safe_title}.txt")
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(wikitext)
-                time.sleep(Delay_Between_Requests)
+    Collect_Pages_And_Subcats(Tree_Dict, Root_Folder)
 
-            if subcats:
-                Save_Pages_And_Subcats(subcats, category_folder)
+    def Write_Page(page_title: str, wikitext: str) -> List[str]:
+        file_paths = []
+        for category_folder in Folders_By_Title[page_title]:
+            file_path = os.path.join(category_folder, f"{Safe_File_Name(page_title)}.txt")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(wikitext)
+            file_paths.append(file_path)
+        return file_paths
 
-    Save_Pages_And_Subcats(Tree_Dict, Root_Folder)
+    Save_Pages_In_Batches(list(Folders_By_Title), Write_Page, Delay_Between_Requests, Batch_Size, Journal)
 
 def Save_Wikipedia_Tree_Flat_To_Files(
     Tree_Dict: dict,
     Root_Folder: str = "Data",
-    Delay_Between_Requests: float = 0.5
+    Delay_Between_Requests: float = 0.5,
+    Batch_Size: int = MAX_TITLES_PER_REQUEST,
+    Journal: CrawlJournal = None
 ):
     """
     Sauvegarde tous les textes de pages Wikipedia dans un dossier plat,
-    sans structure hiérarchique.
+    sans structure hiérarchique. Les pages sont récupérées par lots de
+    Batch_Size titres, chaque page n'étant téléchargée qu'une fois.
 
     Args:
         Tree_Dict: arbre {cat: ([pages], {subcats})}
         Root_Folder: dossier de sortie
-        Delay_Between_Requests: délai entre requêtes API
+        Delay_Between_Requests: délai entre requêtes API (une requête par lot)
+        Batch_Size: nombre de titres par requête
+        Journal: journal de crawl ; seules les pages nouvelles ou dont le revid a changé sont téléchargées
     """
     os.makedirs(Root_Folder, exist_ok=True)
 
-    def Save_Pages_Flat(Tree: dict):
+    def Write_Page(page_title: str, wikitext: str) -> List[str]:
+        file_path = os.path.join(Root_Folder, f"{Safe_File_Name(page_title)}.txt")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(wikitext)
+        return [file_path]
+
+    Save_Pages_In_Batches(Collect_Tree_Pages(Tree_Dict), Write_Page, Delay_Between_Requests, Batch_Size, Journal)
+
+def Save_Wikipedia_Tree_To_Corpus_Store(
+    Tree_Dict: dict,
+    Store_Folder: str = "Data",
+    Delay_Between_Requests: float = 0.5,
+    Batch_Size: int = MAX_TITLES_PER_REQUEST,
+    Journal: CrawlJournal = None
+):
+    """
+    Sauvegarde tous les textes de pages Wikipedia dans un corpus compacté
+    (shards append-only + index), au lieu d'un fichier .txt par page.
+    Une page présente dans plusieurs catégories n'est stockée qu'une fois.
+
+    Args:
+        Tree_Dict: arbre {cat: ([pages], {subcats})}
+        Store_Folder: dossier du corpus compacté
+        Delay_Between_Requests: délai entre requêtes API (une requête par lot)
+        Batch_Size: nombre de titres par requête
+        Journal: journal de crawl ; seules les pages nouvelles ou dont le revid a changé sont téléchargées
+    """
+    with CorpusStore(Store_Folder) as Store:
+
+        def Write_Page(page_title: str, wikitext: str) -> List[str]:
+            Store.Put(page_title, wikitext)
+            return []
+
+        Save_Pages_In_Batches(Collect_Tree_Pages(Tree_Dict), Write_Page, Delay_Between_Requests, Batch_Size, Journal,
+                              Store=Store)
+        print(f"Corpus store {Store_Folder}: {Store.Stats()}")
+
+def Collect_Tree_Pages(Tree_Dict: dict) -> List[str]:
+    """
+    Retourne la liste ordonnée et sans doublons des pages d'un arbre {cat: ([pages], {subcats})}.
+    """
+    Titles = {}
+
+    def Collect(Tree: dict):
         for category_name, (pages, subcats) in Tree.items():
-            for page_title in tqdm(pages, desc=f"Saving pages from {category_name}", unit="page"):
-                wikitext = Get_Page_Wikitext(page_title)
-                safe_title = page_title.replace("/", "_").replace("\\", "_")
-                file_path = os.path.join(Root_Folder, f"{safe_title}.txt")
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(wikitext)
-                time.sleep(Delay_Between_Requests)
+            for page_title in pages:
+                Titles[page_title] = None
             if subcats:
-                Save_Pages_Flat(subcats)
+                Collect(subcats)
+
+    Collect(Tree_Dict)
+    return list(Titles)
+
+def Save_Pages_In_Batches(
+    Titles: List[str],
+    Write_Page,
+    Delay_Between_Requests: float = 0.5,
+    Batch_Size: int = MAX_TITLES_PER_REQUEST,
+    Journal: CrawlJournal = None,
+    Store: CorpusStore = None
+) -> int:
+    """
+    Télécharge les pages par lots et appelle Write_Page(titre, wikitexte) pour
+    chaque page existante ; Write_Page retourne la liste des fichiers écrits.
+
+    Avec un Journal, les révisions de toutes les pages sont d'abord sondées en bloc
+    (rvprop=ids|timestamp, sans contenu) et seules les pages inconnues, modifiées
+    ou dont le fichier a disparu sont téléchargées ; chaque lot écrit est
+    enregistré dans le journal, ce qui permet de reprendre un crawl interrompu.
+    Si les pages vont dans un corpus compacté (Store), une page absente du corpus
+    est aussi retéléchargée.
 
-    Save_Pages_Flat(Tree_Dict)
+    Plusieurs titres menant à la même page (redirections) ne donnent lieu qu'à
+    une seule écriture, sous le premier titre rencontré.
+
+    Retourne le nombre de pages écrites.
+    """
+    Missing_Titles = []
+    Resolved_Titles = {}
+    Written_Canonical = set()
+    Nb_Aliases = 0
+    if Journal is not None:
+        Probed_Revisions = Get_Pages_Revisions(
+            Titles, Rvprop="ids|timestamp", Delay_Between_Requests=Delay_Between_Requests,
+            Resolved_Titles=Resolved_Titles
+        )
+        Missing_Titles = [Title for Title, Revision in Probed_Revisions.items() if Revision is None]
+        # Les alias d'une page déjà présente sont retirés avant le téléchargement
+        Canonical_Titles = {}
+        for Title, Revision in Probed_Revisions.items():
+            if Revision is not None and Canonical_Titles.setdefault(Resolved_Titles[Title], Title) != Title:
+                Nb_Aliases += 1
+        Probed_Revisions = {Title: Revision for Title, Revision in Probed_Revisions.items()
+                            if Revision is None or Canonical_Titles[Resolved_Titles[Title]] == Title}
+        Titles_To_Fetch = Journal.Titles_To_Fetch(Probed_Revisions, Store=Store)
+        print(f"{len(Probed_Revisions) - len(Missing_Titles) - len(Titles_To_Fetch)} page(s) à jour, "
+              f"{len(Titles_To_Fetch)} page(s) à télécharger.")
+        Titles = Titles_To_Fetch
+
+    Nb_Written = 0
+    Progress = tqdm(total=len(Titles), desc="Saving pages", unit="page")
+    for Start in range(0, len(Titles), Batch_Size):
+        if Start > 0:
+            time.sleep(Delay_Between_Requests)
+        Batch = Titles[Start:Start + Batch_Size]
+        Revisions = Get_Pages_Revisions(
+            Batch, Rvprop="ids|timestamp|content", Batch_Size=Batch_Size, Resolved_Titles=Resolved_Titles
+        )
+        Records = []
+        for page_title in Batch:
+            Revision = Revisions.get(page_title)
+            if Revision is None:
+                Missing_Titles.append(page_title)
+                continue
+            if Resolved_Titles[page_title] in Written_Canonical:
+                Nb_Aliases += 1
+                continue
+            Written_Canonical.add(Resolved_Titles[page_title])
+            wikitext = Revision.get("content", "")
+            file_paths = Write_Page(page_title, wikitext)
+            Records.append({
+                "title": page_title,
+                "revid": Revision.get("revid"),
+                "timestamp": Revision.get("timestamp"),
+                "content": wikitext,
+                "file_paths": file_paths,
+            })
+            Nb_Written += 1
+        if Journal is not None:
+            Journal.Record_Pages(Records)
+        Progress.update(len(Batch))
+    Progress.close()
+
+    if Missing_Titles:
+        print(f"{len(Missing_Titles)} page(s) introuvable(s) : {Missing_Titles[:10]}")
+    if Nb_Aliases:
+        print(f"{Nb_Aliases} titre(s) redirigé(s) vers une page déjà sauvegardée, ignoré(s).")
+    return Nb_Written
 
 # Exemple d'utilisation :
 
@@ -362,12 +753,18 @@ if __name__ == "__main__":
         "Nuclear engineering", "Geotechnical engineering", "Bioinformatics engineering",
     ]
 
+    # Journal de crawl : permet de reprendre un crawl interrompu et de ne
+    # retélécharger que les pages modifiées lors d'un rafraîchissement
+    Journal = CrawlJournal("Data/Crawl_Journal.sqlite")
+
     Tree = Fetch_Wikipedia_Category_Tree(
         Input_Category_List=Input_Categories,
         Max_Recursion_Level=1,
         Max_Pages_Per_Category=10,
         Max_Subcategories_Per_Category=3,
-        Delay_Between_Requests=0.5
+        Max_Workers=8,
+        Requests_Per_Second=10.0,
+        Journal=Journal
     )
 
     print(Tree)
@@ -379,5 +776,6 @@ if __name__ == "__main__":
     # Sauvegarde dans un dossier plat
     Save_Wikipedia_Tree_Flat_To_Files(
         Tree_Dict=Tree,
-        Root_Folder="Data"
+        Root_Folder="Data",
+        Journal=Journal
     )
@@ -0,0 +1,270 @@
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict
+from urllib.parse import urlsplit, parse_qs
+
+
+
+
+# ================ CORPUS DE TEST =====================
+
+def Generate_Fixture_Corpus(
+    Nb_Root_Categories: int = 10,
+    Depth: int = 2,
+    Subcategories_Per_Category: int = 3,
+    Pages_Per_Category: int = 20,
+    Shared_Page_Ratio: float = 0.2,
+    Page_Size: int = 2000,
+    Seed: int = 0
+) -> Dict:
+    """
+    Génère un corpus synthétique {categories, pages, redirects} pour le stand-in.
+
+    Une fraction Shared_Page_Ratio des pages de chaque catégorie est tirée parmi
+    des pages déjà existantes (pages partagées entre catégories), et chaque
+    catégorie feuille renvoie vers une catégorie racine (le graphe a des cycles,
+    comme celui de Wikipedia).
+    """
+    Random = random.Random(Seed)
+    Categories = {}
+    Pages = {}
+    Redirects = {}
+    Words = ["energy", "field", "wave", "particle", "cell", "protein", "theorem", "equation",
+             "model", "system", "structure", "process", "function", "matrix", "quantum", "signal"]
+
+    def New_Page():
+        Title = f"Page {len(Pages) + 1}"
+        Sentences = []
+        while sum(len(Sentence) for Sentence in Sentences) < Page_Size:
+            Sentences.append(" ".join(Random.choice(Words) for _ in range(12)).capitalize() + ".")
+        Pages[Title] = {
+            "revid": 1000 + len(Pages),
+            "timestamp": "2025-01-01T00:00:00Z",
+            "content": f"'''{Title}''' is a [[{Random.choice(Words)}]] article.\n\n" + " ".join(Sentences),
+        }
+        if len(Pages) % 10 == 0:
+            Redirects[f"{Title} (alias)"] = Title
+        return Title
+
+    def Build(Category, Level):
+        Members = []
+        for _ in range(Pages_Per_Category):
+            if Pages and Random.random() < Shared_Page_Ratio:
+                Members.append(Random.choice(list(Pages)))
+            else:
+                Members.append(New_Page())
+        Categories[Category] = Members
+        if Level < Depth:
+            for Index in range(Subcategories_Per_Category):
+                Subcategory = f"{Category} {Index + 1}"
+                Members.append(f"Category:{Subcategory}")
+                Build(Subcategory, Level + 1)
+        else:
+            Members.append(f"Category:Root category {Random.randint(1, Nb_Root_Categories)}")
+
+    for Index in range(Nb_Root_Categories):
+        Build(f"Root category {Index + 1}", 0)
+
+    return {"categories": Categories, "pages": Pages, "redirects": Redirects}
+
+
+def Save_Fixture_Corpus(Corpus: Dict, Path: str):
+    with open(Path, "w", encoding="utf-8") as f:
+        json.dump(Corpus, f, ensure_ascii=False)
+
+
+def Load_Fixture_Corpus(Path: str) -> Dict:
+    with open(Path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def Normalize_Api_Title(Title: str) -> str:
+    Title = " ".join(Title.replace("_", " ").split())
+    return Title[:1].upper() + Title[1:]
+
+
+# ================ SERVEUR =====================
+
+class MediaWikiStandIn:
+    """
+    Stand-in local de l'API MediaWiki (action=query) servant list=categorymembers
+    (avec pagination cmcontinue) et prop=revisions (multi-titres, normalisation,
+    redirections, pages manquantes) à partir d'un corpus de test.
+
+    Latence, taux d'erreurs HTTP 5xx, taux d'erreurs maxlag et limite de débit
+    (HTTP 429 au-delà de Rate_Limit requêtes par seconde) sont configurables.
+    """
+    def __init__(self, Corpus: Dict, Latency: float = 0.0, Error_Rate: float = 0.0, Maxlag_Rate: float = 0.0,
+                 Rate_Limit: float = None, Retry_After: int = 0, Cmlimit: int = 500, Max_Titles: int = 50,
+                 Seed: int = 0):
+        self.Corpus = Corpus
+        self.Latency = Latency
+        self.Error_Rate = Error_Rate
+        self.Maxlag_Rate = Maxlag_Rate
+        self.Rate_Limit = Rate_Limit
+        self.Retry_After = Retry_After
+        self.Cmlimit = Cmlimit
+        self.Max_Titles = Max_Titles
+        self.Random = random.Random(Seed)
+        self.Lock = threading.Lock()
+        self.Request_Times = []
+        self.Counters = {"requests": 0, "errors_injected": 0, "maxlag_injected": 0, "throttled": 0}
+        self.Server = None
+        self.Thread = None
+
+    @property
+    def Url(self):
+        Host, Port = self.Server.server_address
+        return f"http://{Host}:{Port}/w/api.php"
+
+    def Start(self):
+        Stand_In = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                Params = {Key: Values[-1] for Key, Values in parse_qs(urlsplit(self.path).query).items()}
+                Status, Headers, Body = Stand_In.Handle(Params)
+                Payload = json.dumps(Body).encode("utf-8")
+                self.send_response(Status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(Payload)))
+                for Key, Value in Headers.items():
+                    self.send_header(Key, Value)
+                self.end_headers()
+                self.wfile.write(Payload)
+
+            def log_message(self, *Args):
+                pass
+
+        self.Server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.Server.daemon_threads = True
+        self.Thread = threading.Thread(target=self.Server.serve_forever, daemon=True)
+        self.Thread.start()
+        return self
+
+    def Stop(self):
+        if self.Server is not None:
+            self.Server.shutdown()
+            self.Server.server_close()
+            self.Server = None
+
+    def __enter__(self):
+        return self.Start()
+
+    def __exit__(self, *Exc_Info):
+        self.Stop()
+
+    def Get_Counters(self):
+        with self.Lock:
+            return dict(self.Counters)
+
+    # ================ TRAITEMENT DES REQUÊTES =====================
+
+    def Handle(self, Params):
+        with self.Lock:
+            self.Counters["requests"] += 1
+            Now = time.monotonic()
+            Throttled = False
+            if self.Rate_Limit is not None:
+                self.Request_Times = [T for T in self.Request_Times if Now - T < 1.0]
+                Throttled = len(self.Request_Times) >= self.Rate_Limit
+                if not Throttled:
+                    self.Request_Times.append(Now)
+            Draw = self.Random.random()
+
+        if self.Latency:
+            time.sleep(self.Latency)
+
+        Retry_Headers = {"Retry-After": str(self.Retry_After)}
+        if Throttled:
+            self.Count("throttled")
+            return 429, Retry_Headers, {"error": {"code": "ratelimited", "info": "Too many requests"}}
+        if Draw < self.Error_Rate:
+            self.Count("errors_injected")
+            return 503, Retry_Headers, {"error": {"code": "internal_api_error", "info": "Injected error"}}
+        if "maxlag" in Params and Draw < self.Error_Rate + self.Maxlag_Rate:
+            self.Count("maxlag_injected")
+            return 200, Retry_Headers, {"error": {"code": "maxlag", "info": "Waiting for a database server", "lag": 6}}
+
+        if Params.get("action") != "query":
+            return 200, {}, {"error": {"code": "badvalue", "info": "Only action=query is supported"}}
+        if Params.get("list") == "categorymembers":
+            return 200, {}, self.Category_Members(Params)
+        if Params.get("prop") == "revisions":
+            return 200, {}, self.Revisions(Params)
+        return 200, {}, {"batchcomplete": True, "query": {}}
+
+    def Count(self, Key):
+        with self.Lock:
+            self.Counters[Key] += 1
+
+    def Category_Members(self, Params):
+        Category = Normalize_Api_Title(Params.get("cmtitle", "").replace("Category:", "", 1))
+        Members = self.Sorted_Members(Category)
+        Limit = self.Cmlimit if Params.get("cmlimit", "max") == "max" else min(self.Cmlimit, int(Params["cmlimit"]))
+        Offset = int(Params.get("cmcontinue", "0").split("|")[-1])
+        Batch = Members[Offset:Offset + Limit]
+        Result = {"query": {"categorymembers": [
+            {"pageid": Offset + Index + 1, "ns": 14 if Title.startswith("Category:") else 0, "title": Title}
+            for Index, Title in enumerate(Batch)
+        ]}}
+        if Offset + Limit < len(Members):
+            Result["continue"] = {"cmcontinue": f"page|{Offset + Limit}", "continue": "-||"}
+        else:
+            Result["batchcomplete"] = True
+        return Result
+
+    def Sorted_Members(self, Category):
+        """
+        Membres dans l'ordre de l'API : pages puis sous-catégories, par clé de tri (titre en majuscules).
+        """
+        def Sort_Key(Title):
+            Is_Category = Title.startswith("Category:")
+            return (Is_Category, Title.split(":", 1)[1].upper() if Is_Category else Title.upper())
+        return sorted(self.Corpus["categories"].get(Category, []), key=Sort_Key)
+
+    def Revisions(self, Params):
+        Titles = [Title for Title in Params.get("titles", "").split("|") if Title]
+        if len(Titles) > self.Max_Titles:
+            return {"error": {"code": "toomanyvalues", "info": f"Too many values supplied for parameter 'titles'. The limit is {self.Max_Titles}."}}
+        Rvprop = set(Params.get("rvprop", "ids|timestamp").split("|"))
+        Query = {"normalized": [], "redirects": [], "pages": []}
+        Seen = set()
+        for Title in Titles:
+            Normalized = Normalize_Api_Title(Title)
+            if Normalized != Title:
+                Query["normalized"].append({"from": Title, "to": Normalized})
+            if Params.get("redirects") and Normalized in self.Corpus["redirects"]:
+                Target = self.Corpus["redirects"][Normalized]
+                Query["redirects"].append({"from": Normalized, "to": Target})
+                Normalized = Target
+            if Normalized in Seen:
+                continue
+            Seen.add(Normalized)
+            Page = self.Corpus["pages"].get(Normalized)
+            if Page is None:
+                Query["pages"].append({"ns": 0, "title": Normalized, "missing": True})
+                continue
+            Revision = {}
+            if "ids" in Rvprop:
+                Revision["revid"] = Page["revid"]
+            if "timestamp" in Rvprop:
+                Revision["timestamp"] = Page["timestamp"]
+            if "content" in Rvprop:
+                Revision["content"] = Page["content"]
+            Query["pages"].append({"ns": 0, "title": Normalized, "revisions": [Revision]})
+        Query = {Key: Value for Key, Value in Query.items() if Value}
+        return {"batchcomplete": True, "query": Query}
+
+
+if __name__ == "__main__":
+    # Example usage
+    Corpus = Generate_Fixture_Corpus(Nb_Root_Categories=3, Depth=1, Pages_Per_Category=5)
+    with MediaWikiStandIn(Corpus, Latency=0.01) as Stand_In:
+        print(f"MediaWiki stand-in running at {Stand_In.Url}")
+        print(f"{len(Corpus['categories'])} categories, {len(Corpus['pages'])} pages")
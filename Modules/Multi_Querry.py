@@ -1,5 +1,5 @@
-import requests
 import re
+from Http_Client import Get_Http_Client, OLLAMA_TIMEOUT
 
 
 
@@ -55,7 +55,7 @@ def Generate_Multi_Querries(Question, Nb_Multi_Querries=5 , API_OLLAMA_URL = "ht
     }
         
     print(API_OLLAMA_URL)
-    API_Response = requests.post(API_OLLAMA_URL, json=Request_Payload)
+    API_Response = Get_Http_Client().Post(API_OLLAMA_URL, Json=Request_Payload, Timeout=OLLAMA_TIMEOUT)
 
     print(f"API OLLAMA Response Status Code: {API_Response.status_code}")
     if API_Response.status_code != 200:
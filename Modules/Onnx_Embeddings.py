@@ -0,0 +1,229 @@
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+
+
+ONNX_FOLDER = "Onnx_Models"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_int8.onnx"
+ONNX_OPSET = 14
+# Configuration du pooling des modèles sentence-transformers
+POOLING_CONFIG_FILE = "1_Pooling/config.json"
+
+
+
+
+# ================ EXPORT =====================
+def Hub_Model_Id(Model_Name: str) -> str:
+    """
+    Identifiant HuggingFace du modèle : comme sentence-transformers, un nom court
+    (all-MiniLM-L6-v2) désigne un modèle de l'organisation sentence-transformers.
+    """
+    if "/" in Model_Name or os.path.isdir(Model_Name):
+        return Model_Name
+    return f"sentence-transformers/{Model_Name}"
+
+
+def Detect_Pooling(Model_Name: str) -> str:
+    """
+    Mode de pooling du modèle ("cls" ou "mean"), lu dans sa configuration
+    sentence-transformers (1_Pooling/config.json). Sans cette configuration,
+    seuls les modèles BAAI/bge-* (pooling CLS) sont acceptés.
+    """
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import HfHubHTTPError
+
+    Model_Id = Hub_Model_Id(Model_Name)
+    Config_Path = os.path.join(Model_Id, POOLING_CONFIG_FILE)
+    if not os.path.isdir(Model_Id):
+        try:
+            Config_Path = hf_hub_download(Model_Id, POOLING_CONFIG_FILE)
+        except (OSError, HfHubHTTPError):
+            Config_Path = None
+    if Config_Path is not None and os.path.isfile(Config_Path):
+        with open(Config_Path, "r", encoding="utf-8") as f:
+            Config = json.load(f)
+        if Config.get("pooling_mode_cls_token"):
+            return "cls"
+        if Config.get("pooling_mode_mean_tokens"):
+            return "mean"
+        raise ValueError(f"Unsupported pooling for {Model_Name} (only CLS and mean pooling): {Config}")
+    if Model_Id.startswith("BAAI/bge-"):
+        return "cls"
+    raise ValueError(f"Cannot find the pooling configuration of {Model_Name} ({POOLING_CONFIG_FILE}); "
+                     f"pass Pooling='cls' or 'mean' explicitly.")
+
+
+def Onnx_Model_Folder(Model_Name: str, Onnx_Folder: str = ONNX_FOLDER) -> str:
+    return os.path.join(Onnx_Folder, Model_Name.replace("/", "__"))
+
+
+def Export_Onnx_Model(Model_Name: str, Onnx_Folder: str = ONNX_FOLDER, Quantize: bool = False) -> str:
+    """
+    Exporte le modèle HuggingFace (BAAI/bge-*) en ONNX, axes batch et séquence dynamiques,
+    avec son tokenizer. Avec Quantize, une version quantifiée dynamiquement en int8
+    (poids int8, activations quantifiées à l'exécution) est écrite à côté.
+
+    Returns:
+        chemin du fichier .onnx à charger.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    Folder = Onnx_Model_Folder(Model_Name, Onnx_Folder)
+    Model_Path = os.path.join(Folder, ONNX_MODEL_FILE)
+    if not os.path.exists(Model_Path):
+        os.makedirs(Folder, exist_ok=True)
+        Tokenizer = AutoTokenizer.from_pretrained(Hub_Model_Id(Model_Name))
+        Model = AutoModel.from_pretrained(Hub_Model_Id(Model_Name)).eval()
+        Dummy = Tokenizer(["export"], return_tensors="pt")
+        Input_Names = [Name for Name in ("input_ids", "attention_mask", "token_type_ids") if Name in Dummy]
+        Dynamic_Axes = {Name: {0: "batch", 1: "sequence"} for Name in Input_Names}
+        Dynamic_Axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(Model, tuple(Dummy[Name] for Name in Input_Names), Model_Path + ".tmp",
+                              input_names=Input_Names, output_names=["last_hidden_state"],
+                              dynamic_axes=Dynamic_Axes, opset_version=ONNX_OPSET)
+        os.replace(Model_Path + ".tmp", Model_Path)
+        Tokenizer.save_pretrained(Folder)
+        print(f"✅ {Model_Name} exported to {Model_Path}")
+    if not Quantize:
+        return Model_Path
+
+    Quantized_Path = os.path.join(Folder, ONNX_QUANTIZED_MODEL_FILE)
+    if not os.path.exists(Quantized_Path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(Model_Path, Quantized_Path + ".tmp", weight_type=QuantType.QInt8)
+        os.replace(Quantized_Path + ".tmp", Quantized_Path)
+        print(f"✅ {Model_Name} quantized to int8 in {Quantized_Path} "
+              f"({os.path.getsize(Model_Path) / 1e6:.0f} MB -> {os.path.getsize(Quantized_Path) / 1e6:.0f} MB)")
+    return Quantized_Path
+
+
+
+
+# ================ EMBEDDER =====================
+class OnnxEmbeddings:
+    """
+    Embeddings calculés avec ONNX Runtime sur CPU, avec la même interface que
+    HuggingFaceEmbeddings (embed_documents / embed_query). Le modèle est exporté au premier
+    usage. Le pooling (token CLS pour BAAI/bge-*, moyenne pour all-MiniLM-L6-v2) est lu
+    dans la configuration sentence-transformers du modèle si Pooling n'est pas fourni,
+    puis les vecteurs sont normalisés (L2).
+    """
+    def __init__(self, Model_Name: str, Onnx_Folder: str = ONNX_FOLDER, Quantize: bool = False, Batch_Size: int = 32,
+                 Max_Length: int = 512, Num_Threads: int = None, Pooling: str = None, Normalize: bool = True):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.Model_Name = Model_Name
+        self.Quantize = Quantize
+        self.Batch_Size = Batch_Size
+        self.Max_Length = Max_Length
+        self.Pooling = Pooling or Detect_Pooling(Model_Name)
+        self.Normalize = Normalize
+        Model_Path = Export_Onnx_Model(Model_Name, Onnx_Folder, Quantize=Quantize)
+        Options = onnxruntime.SessionOptions()
+        Options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if Num_Threads:
+            Options.intra_op_num_threads = Num_Threads
+        self.Session = onnxruntime.InferenceSession(Model_Path, Options, providers=["CPUExecutionProvider"])
+        self.Input_Names = [Input.name for Input in self.Session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(Model_Path))
+
+    @property
+    def max_seq_length(self):
+        return self.Max_Length
+
+    def Encode(self, Texts: List[str]) -> np.ndarray:
+        """
+        Embedde les textes en une seule passe (un seul batch, paddé au plus long).
+        """
+        # Même prétraitement que HuggingFaceEmbeddings
+        Texts = [Text.replace("\n", " ") for Text in Texts]
+        Encoded = self.tokenizer(Texts, padding=True, truncation=True, max_length=self.Max_Length, return_tensors="np")
+        Inputs = {Name: Encoded[Name].astype(np.int64) for Name in self.Input_Names}
+        Hidden = self.Session.run(None, Inputs)[0]
+        if self.Pooling == "cls":
+            Embeddings = Hidden[:, 0]
+        else:
+            Mask = Encoded["attention_mask"][:, :, None].astype(np.float32)
+            Embeddings = (Hidden * Mask).sum(axis=1) / np.maximum(Mask.sum(axis=1), 1e-9)
+        if self.Normalize:
+            Embeddings = Embeddings / np.maximum(np.linalg.norm(Embeddings, axis=1, keepdims=True), 1e-12)
+        return Embeddings.astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return np.concatenate([self.Encode(texts[Start:Start + self.Batch_Size])
+                               for Start in range(0, len(texts), self.Batch_Size)]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.Encode([text])[0].tolist()
+
+
+
+
+# ================ PARITY =====================
+def Check_Embedder_Parity(Texts: List[str], Queries: List[str], Reference, Candidate, Num_Results: int = 10) -> Dict:
+    """
+    Compare deux embedders (PyTorch de référence, ONNX) : cosinus entre les vecteurs des
+    mêmes textes, et recouvrement des Num_Results plus proches voisins (recherche exacte)
+    des requêtes parmi Texts.
+    """
+    from Embeddings_Chunks import Exact_Search
+
+    Reference_Embeddings = np.asarray(Reference.embed_documents(Texts), dtype=np.float32)
+    Candidate_Embeddings = np.asarray(Candidate.embed_documents(Texts), dtype=np.float32)
+    Cosines = (Reference_Embeddings * Candidate_Embeddings).sum(axis=1) / np.maximum(
+        np.linalg.norm(Reference_Embeddings, axis=1) * np.linalg.norm(Candidate_Embeddings, axis=1), 1e-12)
+
+    Overlaps = []
+    for Query in Queries:
+        Reference_Indices, _ = Exact_Search(Reference_Embeddings, Reference.embed_query(Query), Num_Results)
+        Candidate_Indices, _ = Exact_Search(Candidate_Embeddings, Candidate.embed_query(Query), Num_Results)
+        Overlaps.append(len(set(Reference_Indices) & set(Candidate_Indices)) / max(1, len(Reference_Indices)))
+
+    Report = {
+        "mean_cosine": float(Cosines.mean()),
+        "min_cosine": float(Cosines.min()),
+        "mean_overlap": float(np.mean(Overlaps)) if Overlaps else 1.0,
+        "min_overlap": float(np.min(Overlaps)) if Overlaps else 1.0,
+        "num_results": Num_Results,
+    }
+    print(f"Cosine agreement: mean {Report['mean_cosine']:.5f}, min {Report['min_cosine']:.5f} ; "
+          f"top-{Num_Results} overlap: mean {100 * Report['mean_overlap']:.1f} %, min {100 * Report['min_overlap']:.1f} %")
+    return Report
+
+
+def Time_Embedder(Embedder, Texts: List[str], Query: str, Nb_Queries: int = 20) -> Dict:
+    """
+    Débit d'embedding des documents et latence moyenne d'une requête seule.
+    """
+    Embedder.embed_query(Query)  # préchauffage
+    Start = time.perf_counter()
+    Embedder.embed_documents(Texts)
+    Documents_Seconds = time.perf_counter() - Start
+    Start = time.perf_counter()
+    for _ in range(Nb_Queries):
+        Embedder.embed_query(Query)
+    return {"chunks_per_s": len(Texts) / Documents_Seconds,
+            "query_latency_ms": 1000 * (time.perf_counter() - Start) / Nb_Queries}
+
+
+if __name__ == "__main__":
+    # Example usage
+    from Embeddings_Chunks import Create_Embedder
+
+    Texts = ["Water boils at 100 degrees Celsius at sea level.",
+             "The mitochondrion is the powerhouse of the cell.",
+             "Paris is the capital of France."]
+    Reference = Create_Embedder(Embedding_Model="BAAI/bge-small-en-v1.5")
+    Candidate = OnnxEmbeddings("BAAI/bge-small-en-v1.5", Quantize=True)
+    Check_Embedder_Parity(Texts, ["What is the boiling point of water?"], Reference, Candidate, Num_Results=2)
@@ -0,0 +1,282 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List
+
+import annoy
+from langchain_core.documents import Document
+from tqdm import tqdm
+
+from MediaWiki import Get_Pages_Revisions, MAX_TITLES_PER_REQUEST
+from Rate_Limiting import TokenBucket, AdaptiveBackoff
+from Wikitext_Cleaning import Clean_Documents, New_Cleaning_Stats
+from Chunking import Create_Text_Splitter
+from Embedder_Registry import Get_Embedder, SharedEmbedder
+from Corpus_Store import CorpusStore
+from Chunk_Store import Save_Chunks_To_Chunk_Store
+
+
+
+
+# Marqueur de fin de flux : chaque worker d'une étape s'arrête en le recevant
+STOP = object()
+QUEUE_SIZE = 256
+
+
+
+
+def Start_Stage(
+    Name: str,
+    Function: Callable[[List], List],
+    Input_Queue: queue.Queue,
+    Output_Queue: queue.Queue = None,
+    Nb_Workers: int = 1,
+    Nb_Downstream_Workers: int = 1,
+    Batch_Size: int = 1,
+    Errors: List = None
+) -> threading.Thread:
+    """
+    Démarre Nb_Workers threads qui consomment Input_Queue par lots d'au plus
+    Batch_Size éléments, appellent Function(Lot) et placent chaque élément
+    retourné dans Output_Queue (bornée : un étage lent freine l'étage amont).
+
+    Quand tous les workers ont reçu STOP, Nb_Downstream_Workers marqueurs STOP
+    sont transmis à l'étage suivant. Retourne le thread qui attend la fin de l'étage.
+    """
+    def Worker():
+        Finished = False
+        while not Finished:
+            Batch = []
+            while len(Batch) < Batch_Size:
+                Item = Input_Queue.get()
+                if Item is STOP:
+                    Finished = True
+                    break
+                Batch.append(Item)
+            if not Batch:
+                continue
+            try:
+                Outputs = Function(Batch)
+            except Exception as e:
+                print(f"[Error] Stage {Name} failed on a batch of {len(Batch)} item(s): {e}")
+                if Errors is not None:
+                    Errors.append((Name, e))
+                continue
+            if Output_Queue is not None:
+                for Output in Outputs:
+                    Output_Queue.put(Output)
+
+    Workers = [threading.Thread(target=Worker, name=f"{Name}-{Index}", daemon=True) for Index in range(Nb_Workers)]
+    for Thread in Workers:
+        Thread.start()
+
+    def Close_Stage():
+        for Thread in Workers:
+            Thread.join()
+        if Output_Queue is not None:
+            for _ in range(Nb_Downstream_Workers):
+                Output_Queue.put(STOP)
+
+    Closer = threading.Thread(target=Close_Stage, name=f"{Name}-closer", daemon=True)
+    Closer.start()
+    return Closer
+
+
+
+
+def Run_Streaming_Pipeline(
+    Titles: List[str] = None,
+    Documents=None,
+    Chunks_Path: str = "Chunks/chunks.jsonl",
+    Index_Path: str = "Annoy_Index/wikipedia_index.ann",
+    Chunk_Store_Folder: str = None,
+    Raw_Store_Folder: str = None,
+    Cleaning: bool = True,
+    Min_Characters: int = 500,
+    Chunk_Size: int = 1000,
+    Chunk_Overlap: int = 200,
+    Embedding_Model: str = "BAAI/bge-base-en-v1.5",
+    Embedder=None,
+    Batch_Size_Embedding: int = 64,
+    Num_Trees: int = 100,
+    Nb_Download_Workers: int = 4,
+    Requests_Per_Second: float = 10.0,
+    Nb_Cleaning_Workers: int = 2,
+    Nb_Chunking_Workers: int = 2,
+    Queue_Size: int = QUEUE_SIZE
+) -> Dict:
+    """
+    Construit l'index en flux : téléchargement → nettoyage → découpage → embedding
+    → écriture, chaque étage étant relié au suivant par une file bornée.
+
+    Les pages ne sont jamais toutes en mémoire : les chunks sont écrits au fil de
+    l'eau dans Chunks_Path (JSONL, une ligne par chunk, dans l'ordre des
+    identifiants Annoy) et l'index Annoy est construit sur disque (on_disk_build).
+    Les téléchargements (réseau) se poursuivent pendant le calcul des embeddings.
+
+    Args:
+        Titles: titres des pages à télécharger via l'API MediaWiki.
+        Documents: à défaut, itérable de (titre, wikitexte) déjà téléchargés.
+        Chunk_Store_Folder: si renseigné, les chunks y sont aussi écrits en ChunkStore à la fin
+            (format chargé par la webapp, dans l'ordre des identifiants Annoy).
+        Raw_Store_Folder: si renseigné, le wikitexte téléchargé y est aussi conservé (CorpusStore) ;
+            un dossier à part, pas celui des pages en .txt.
+        Cleaning: nettoie le wikitexte (Wikitext_Cleaning) avant le découpage.
+        Embedder: objet d'embedding déjà créé (sinon l'embedder partagé de Embedding_Model).
+            L'embedding se fait dans un seul thread : les appels au modèle sont sérialisés
+            par le verrou de l'embedder partagé.
+        Requests_Per_Second: débit maximal de requêtes API, partagé par les Nb_Download_Workers
+            threads de téléchargement (divisé par deux à chaque 429 / maxlag).
+
+    Returns:
+        dict: statistiques de chaque étage et durée totale.
+    """
+    if (Titles is None) == (Documents is None):
+        raise ValueError("Provide either Titles or Documents.")
+    for Path in (Chunks_Path, Index_Path):
+        if os.path.dirname(Path):
+            os.makedirs(os.path.dirname(Path), exist_ok=True)
+
+    if Embedder is None:
+        Embedder = Get_Embedder(Embedding_Model)
+    elif not isinstance(Embedder, SharedEmbedder):
+        Embedder = SharedEmbedder(Embedder, Embedding_Model)
+    Text_Splitter = Create_Text_Splitter(Chunk_Size=Chunk_Size, Chunk_Overlap=Chunk_Overlap)
+    Raw_Store = CorpusStore(Raw_Store_Folder) if Raw_Store_Folder else None
+    Rate_Limiter = TokenBucket(Rate=Requests_Per_Second, Capacity=Nb_Download_Workers)
+    Backoff = AdaptiveBackoff(Rate_Limiter)
+
+    Stats_Lock = threading.Lock()
+    Stats = {"pages_downloaded": 0, "pages_missing": 0, "pages_chunked": 0, "chunks": 0, "chunks_indexed": 0}
+    Cleaning_Stats = New_Cleaning_Stats()
+    Errors = []
+
+    def Count(Key, Value=1):
+        with Stats_Lock:
+            Stats[Key] += Value
+
+    Title_Queue = queue.Queue(maxsize=Queue_Size)
+    Raw_Queue = queue.Queue(maxsize=Queue_Size)
+    Clean_Queue = queue.Queue(maxsize=Queue_Size)
+    Chunk_Queue = queue.Queue(maxsize=Queue_Size)
+    Embedded_Queue = queue.Queue(maxsize=Queue_Size)
+
+    # ================ ÉTAGES =====================
+
+    def Download(Batch):
+        Revisions = Get_Pages_Revisions(Batch, Rvprop="content", Batch_Size=len(Batch),
+                                        Rate_Limiter=Rate_Limiter, Backoff=Backoff)
+        Pages = []
+        for Title in Batch:
+            Revision = Revisions.get(Title)
+            if Revision is None:
+                Count("pages_missing")
+                continue
+            Pages.append((Title, Revision["content"]))
+        Count("pages_downloaded", len(Pages))
+        if Raw_Store is not None:
+            for Title, Wikitext in Pages:
+                Raw_Store.Put(Title, Wikitext)
+        return Pages
+
+    def Clean(Batch):
+        Batch_Stats = New_Cleaning_Stats()
+        Pages = list(Clean_Documents(Batch, Batch_Stats, Min_Characters, Chunk_Size, Chunk_Overlap))
+        with Stats_Lock:
+            for Key, Value in Batch_Stats.items():
+                Cleaning_Stats[Key] += Value
+        return Pages
+
+    def Chunk(Batch):
+        Chunks = []
+        for Title, Text in Batch:
+            Chunks.extend(Text_Splitter.split_documents([Document(page_content=Text, metadata={"source": Title})]))
+        Count("pages_chunked", len(Batch))
+        Count("chunks", len(Chunks))
+        return Chunks
+
+    def Embed(Batch):
+        Embeddings = Embedder.embed_documents([Chunk.page_content for Chunk in Batch])
+        return list(zip(Batch, Embeddings))
+
+    # L'écrivain est unique : il attribue les identifiants Annoy dans l'ordre
+    # des lignes du fichier de chunks
+    Writer_State = {"index": None}
+    Chunks_File = open(Chunks_Path, "w", encoding="utf-8")
+    Progress = tqdm(desc="Indexing chunks", unit="chunk")
+
+    def Write(Batch):
+        if Writer_State["index"] is None:
+            Writer_State["index"] = annoy.AnnoyIndex(len(Batch[0][1]), 'angular')
+            Writer_State["index"].on_disk_build(Index_Path)
+        for Chunk, Embedding in Batch:
+            Writer_State["index"].add_item(Stats["chunks_indexed"], Embedding)
+            Chunks_File.write(json.dumps(
+                {"page_content": Chunk.page_content, "metadata": Chunk.metadata}, ensure_ascii=False
+            ) + "\n")
+            Stats["chunks_indexed"] += 1
+        Progress.update(len(Batch))
+        return []
+
+    Start = time.perf_counter()
+    if Titles is not None:
+        Source_Queue, First_Workers = Title_Queue, Nb_Download_Workers
+        Start_Stage("download", Download, Title_Queue, Raw_Queue, Nb_Download_Workers,
+                    Nb_Cleaning_Workers if Cleaning else Nb_Chunking_Workers,
+                    Batch_Size=MAX_TITLES_PER_REQUEST, Errors=Errors)
+    else:
+        Source_Queue, First_Workers = Raw_Queue, Nb_Cleaning_Workers if Cleaning else Nb_Chunking_Workers
+    if Cleaning:
+        Start_Stage("clean", Clean, Raw_Queue, Clean_Queue, Nb_Cleaning_Workers, Nb_Chunking_Workers, Errors=Errors)
+    Start_Stage("chunk", Chunk, Clean_Queue if Cleaning else Raw_Queue, Chunk_Queue, Nb_Chunking_Workers,
+                1, Errors=Errors)
+    Start_Stage("embed", Embed, Chunk_Queue, Embedded_Queue, 1, 1,
+                Batch_Size=Batch_Size_Embedding, Errors=Errors)
+    Writer = Start_Stage("write", Write, Embedded_Queue, None, 1, Batch_Size=Batch_Size_Embedding, Errors=Errors)
+
+    # Alimentation du premier étage (bloquante dès que sa file est pleine)
+    for Item in (Titles if Titles is not None else Documents):
+        Source_Queue.put(Item)
+    for _ in range(First_Workers):
+        Source_Queue.put(STOP)
+
+    Writer.join()
+    Progress.close()
+    Chunks_File.close()
+    if Raw_Store is not None:
+        Raw_Store.Close()
+
+    if Writer_State["index"] is None:
+        raise ValueError("No chunk was produced: the Annoy index is empty.")
+    Writer_State["index"].build(Num_Trees)
+    Writer_State["index"].unload()
+    if Chunk_Store_Folder:
+        # Relecture du JSONL en flux : les chunks ne sont pas chargés en mémoire
+        with open(Chunks_Path, "r", encoding="utf-8") as f:
+            Save_Chunks_To_Chunk_Store((json.loads(Line) for Line in f), Chunk_Store_Folder,
+                                       Nb_Chunks=Stats["chunks_indexed"])
+
+    Elapsed = time.perf_counter() - Start
+    Stats.update({"cleaning": Cleaning_Stats, "errors": len(Errors), "elapsed_s": Elapsed})
+    print(f"✅ {Stats['chunks_indexed']} chunks from {Stats['pages_chunked']} pages indexed in {Elapsed:.1f} s "
+          f"({Stats['chunks_indexed'] / Elapsed:.1f} chunks/s)")
+    print(f"Chunks saved to {Chunks_Path}, Annoy index saved to {Index_Path}")
+    if Errors:
+        print(f"[Warn] {len(Errors)} batch(es) failed and were skipped.")
+    return Stats
+
+
+if __name__ == "__main__":
+    # Example usage
+    from MediaWiki import Fetch_Wikipedia_Category_Tree, Collect_Tree_Pages
+
+    Tree = Fetch_Wikipedia_Category_Tree(["Optics", "Thermodynamics"], Max_Recursion_Level=1, Max_Pages_Per_Category=20)
+    Run_Streaming_Pipeline(
+        Titles=Collect_Tree_Pages(Tree),
+        Chunks_Path="Chunks/chunks_pipeline.jsonl",
+        Index_Path="Annoy_Index/wikipedia_index_pipeline.ann",
+        Embedding_Model="BAAI/bge-small-en-v1.5",
+        Num_Trees=10
+    )
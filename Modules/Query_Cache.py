@@ -0,0 +1,169 @@
+import atexit
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+import numpy as np
+
+from Embedding_Cache import Normalize_Text
+
+
+
+
+QUERY_CACHE_MAX_ENTRIES = 10000
+
+
+
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU borné des embeddings de requêtes : (modèle, texte normalisé) -> vecteur.
+    Les requêtes répétées (utilisateurs, reformulations identiques du LLM) ne repassent
+    pas par le modèle. Sûr entre threads (requêtes Flask concurrentes).
+
+    Args:
+        Max_Entries: nombre maximal d'entrées ; au-delà, la moins récemment utilisée est retirée.
+        TTL_Seconds: durée de vie d'une entrée (None : pas d'expiration).
+        Persist_Path: fichier où le cache est sauvegardé (toutes les Save_Every nouvelles
+            entrées et à la sortie du processus) et rechargé au démarrage.
+    """
+    def __init__(self, Max_Entries: int = QUERY_CACHE_MAX_ENTRIES, TTL_Seconds: float = None,
+                 Persist_Path: str = None, Save_Every: int = 100):
+        self.Max_Entries = Max_Entries
+        self.TTL_Seconds = TTL_Seconds
+        self.Persist_Path = Persist_Path
+        self.Save_Every = Save_Every
+        self.Lock = threading.Lock()
+        # Une seule sauvegarde à la fois (les requêtes Flask concurrentes peuvent en déclencher plusieurs)
+        self.Save_Lock = threading.Lock()
+        self.Entries = OrderedDict()  # (modèle, texte normalisé) -> (vecteur, date d'insertion)
+        self.Stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self.Unsaved = 0
+        if Persist_Path:
+            self.Load()
+            atexit.register(self.Save)
+
+    def Get_Many(self, Model_Name: str, Queries: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Returns:
+            {indice dans Queries: vecteur} pour les requêtes présentes (et non expirées).
+        """
+        Now = time.time()
+        Found = {}
+        with self.Lock:
+            for Index, Query in enumerate(Queries):
+                Key = (Model_Name, Normalize_Text(Query))
+                Entry = self.Entries.get(Key)
+                if Entry is not None and self.TTL_Seconds is not None and Now - Entry[1] > self.TTL_Seconds:
+                    del self.Entries[Key]
+                    self.Stats["expirations"] += 1
+                    Entry = None
+                if Entry is None:
+                    self.Stats["misses"] += 1
+                    continue
+                self.Entries.move_to_end(Key)
+                self.Stats["hits"] += 1
+                Found[Index] = Entry[0]
+        return Found
+
+    def Put_Many(self, Model_Name: str, Queries: List[str], Vectors):
+        Now = time.time()
+        with self.Lock:
+            for Query, Vector in zip(Queries, Vectors):
+                Key = (Model_Name, Normalize_Text(Query))
+                Vector = np.array(Vector, dtype=np.float32)
+                Vector.flags.writeable = False
+                self.Entries[Key] = (Vector, Now)
+                self.Entries.move_to_end(Key)
+                self.Unsaved += 1
+            while len(self.Entries) > self.Max_Entries:
+                self.Entries.popitem(last=False)
+                self.Stats["evictions"] += 1
+            Save_Now = self.Persist_Path and self.Unsaved >= self.Save_Every
+            if Save_Now:
+                self.Unsaved = 0
+        if Save_Now:
+            self.Save()
+
+    def Get_Stats(self) -> Dict:
+        with self.Lock:
+            Stats = dict(self.Stats, size=len(self.Entries), max_entries=self.Max_Entries, ttl_seconds=self.TTL_Seconds)
+        Requests = Stats["hits"] + Stats["misses"]
+        Stats["hit_rate"] = Stats["hits"] / Requests if Requests else 0.0
+        return Stats
+
+    def Clear(self):
+        with self.Lock:
+            self.Entries.clear()
+
+    def Save(self):
+        """
+        Sauvegarde le cache dans Persist_Path (fichier temporaire propre au processus et
+        au thread, renommé). Une erreur d'écriture est signalée sans interrompre la requête.
+        """
+        if not self.Persist_Path:
+            return
+        with self.Save_Lock:
+            with self.Lock:
+                Entries = list(self.Entries.items())
+                self.Unsaved = 0
+            Temporary_Path = f"{self.Persist_Path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                Folder = os.path.dirname(self.Persist_Path)
+                if Folder:
+                    os.makedirs(Folder, exist_ok=True)
+                with open(Temporary_Path, "wb") as f:
+                    pickle.dump(Entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(Temporary_Path, self.Persist_Path)
+            except OSError as e:
+                print(f"[Warn] Could not save the query cache {self.Persist_Path}: {e}")
+                if os.path.exists(Temporary_Path):
+                    os.remove(Temporary_Path)
+
+    def Load(self):
+        # Max_Entries=0 : cache désactivé (Entries[-0:] rechargerait tout)
+        if self.Max_Entries <= 0 or not os.path.isfile(self.Persist_Path):
+            return
+        try:
+            with open(self.Persist_Path, "rb") as f:
+                Entries = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"[Warn] Could not load the query cache {self.Persist_Path}: {e}")
+            return
+        Now = time.time()
+        with self.Lock:
+            for Key, (Vector, Stored) in Entries[-self.Max_Entries:]:
+                if self.TTL_Seconds is None or Now - Stored <= self.TTL_Seconds:
+                    self.Entries[Key] = (Vector, Stored)
+        print(f"Query cache: {len(self.Entries)} embedding(s) loaded from {self.Persist_Path}")
+
+
+
+
+QUERY_CACHE = QueryEmbeddingCache()
+
+
+def Configure_Query_Cache(Max_Entries: int = QUERY_CACHE_MAX_ENTRIES, TTL_Seconds: float = None,
+                          Persist_Path: str = None, Save_Every: int = 100) -> QueryEmbeddingCache:
+    """
+    Remplace le cache de requêtes du processus (utilisé par Retrieval) ; Max_Entries=0 le désactive.
+    """
+    global QUERY_CACHE
+    QUERY_CACHE = QueryEmbeddingCache(Max_Entries=Max_Entries, TTL_Seconds=TTL_Seconds,
+                                      Persist_Path=Persist_Path, Save_Every=Save_Every)
+    return QUERY_CACHE
+
+
+def Get_Query_Cache() -> QueryEmbeddingCache:
+    return QUERY_CACHE
+
+
+if __name__ == "__main__":
+    # Example usage
+    Cache = QueryEmbeddingCache(Max_Entries=2, TTL_Seconds=3600)
+    Cache.Put_Many("BAAI/bge-small-en-v1.5", ["What is entropy?"], [[0.1, 0.2, 0.3]])
+    print(Cache.Get_Many("BAAI/bge-small-en-v1.5", ["What  is entropy?", "What is enthalpy?"]))
+    print(Cache.Get_Stats())
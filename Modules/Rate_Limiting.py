@@ -0,0 +1,93 @@
+import random
+import threading
+import time
+
+
+
+
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons, partagé entre plusieurs threads.
+    Rate jetons sont ajoutés par seconde, dans la limite de Capacity.
+    """
+    def __init__(self, Rate=5.0, Capacity=None):
+        self.Rate = float(Rate)
+        self.Capacity = float(Capacity if Capacity is not None else max(1.0, Rate))
+        self.Tokens = self.Capacity
+        self.Last_Refill = time.monotonic()
+        self.Lock = threading.Lock()
+
+    def Refill(self):
+        Now = time.monotonic()
+        self.Tokens = min(self.Capacity, self.Tokens + (Now - self.Last_Refill) * self.Rate)
+        self.Last_Refill = Now
+
+    def Acquire(self, Nb_Tokens=1.0):
+        """
+        Bloque jusqu'à ce que Nb_Tokens jetons soient disponibles, puis les consomme.
+        """
+        while True:
+            with self.Lock:
+                self.Refill()
+                if self.Tokens >= Nb_Tokens:
+                    self.Tokens -= Nb_Tokens
+                    return
+                Wait_Time = (Nb_Tokens - self.Tokens) / self.Rate
+            time.sleep(Wait_Time)
+
+    def Set_Rate(self, Rate):
+        """
+        Modifie le débit (les jetons déjà accumulés sont conservés).
+        """
+        with self.Lock:
+            self.Refill()
+            self.Rate = float(Rate)
+
+
+
+
+class AdaptiveBackoff:
+    """
+    Attente adaptative en cas de limitation côté serveur (HTTP 429, 5xx, maxlag).
+
+    Chaque limitation divise le débit du TokenBucket associé par deux et attend
+    Retry-After ou un délai exponentiel avec gigue ; chaque succès fait remonter
+    progressivement le débit vers sa valeur initiale.
+    """
+    def __init__(self, Rate_Limiter=None, Min_Rate=0.5, Base_Delay=1.0, Max_Delay=60.0, Max_Retries=5):
+        self.Rate_Limiter = Rate_Limiter
+        self.Initial_Rate = Rate_Limiter.Rate if Rate_Limiter is not None else None
+        self.Min_Rate = Min_Rate
+        self.Base_Delay = Base_Delay
+        self.Max_Delay = Max_Delay
+        self.Max_Retries = Max_Retries
+        self.Nb_Retries = 0
+        self.Lock = threading.Lock()
+
+    def Delay(self, Attempt, Retry_After=None):
+        """
+        Délai d'attente avant la tentative suivante (Retry-After prioritaire, sinon exponentiel avec gigue).
+        """
+        if Retry_After is not None:
+            return min(self.Max_Delay, float(Retry_After))
+        Delay = min(self.Max_Delay, self.Base_Delay * (2 ** Attempt))
+        return Delay * random.uniform(0.5, 1.0)
+
+    def On_Throttle(self, Attempt, Retry_After=None):
+        """
+        À appeler quand le serveur demande de ralentir : réduit le débit puis attend.
+        """
+        with self.Lock:
+            self.Nb_Retries += 1
+            if self.Rate_Limiter is not None:
+                self.Rate_Limiter.Set_Rate(max(self.Min_Rate, self.Rate_Limiter.Rate / 2))
+        time.sleep(self.Delay(Attempt, Retry_After))
+
+    def On_Success(self):
+        """
+        À appeler après une réponse valide : remonte le débit de 10 % de sa valeur initiale.
+        """
+        if self.Rate_Limiter is None or self.Rate_Limiter.Rate >= self.Initial_Rate:
+            return
+        with self.Lock:
+            self.Rate_Limiter.Set_Rate(min(self.Initial_Rate, self.Rate_Limiter.Rate + 0.1 * self.Initial_Rate))
@@ -1,9 +1,15 @@
 
+import os
+import threading
 import annoy
-from langchain.embeddings import HuggingFaceEmbeddings
-from tqdm import tqdm
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 
+from Embedder_Registry import Get_Embedder
+from Embeddings_Chunks import Embedder_Name
+from Query_Cache import Get_Query_Cache
+
 
 
 
@@ -27,6 +33,80 @@ def Search_Annoy_Index(index, query_embedding, num_results=10,search_k = 500):
 
     return indices, distances
 
+# Threads de recherche Annoy partagés par les requêtes (Annoy relâche le GIL pendant la recherche)
+SEARCH_THREADS = min(8, os.cpu_count() or 1)
+SEARCH_POOL = None
+SEARCH_POOL_LOCK = threading.Lock()
+
+
+def Get_Search_Pool():
+    global SEARCH_POOL
+    with SEARCH_POOL_LOCK:
+        if SEARCH_POOL is None:
+            SEARCH_POOL = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="annoy-search")
+        return SEARCH_POOL
+
+
+def Embed_Queries(Model_Name, Queries, Backend="PyTorch", Quantize=False):
+    """
+    Embedde toutes les requêtes : celles déjà vues sont lues dans le cache de requêtes du
+    processus (Query_Cache), les autres sont calculées en une seule passe du modèle.
+
+    Returns:
+        matrice (nombre de requêtes, dimension) en float32.
+    """
+    Queries = list(Queries)
+    cache = Get_Query_Cache()
+    cache_key = Embedder_Name(Model_Name, Backend, Quantize)
+    found = cache.Get_Many(cache_key, Queries)
+    missing = [i for i in range(len(Queries)) if i not in found]
+    if missing:
+        embeddings = Get_Embedder(Model_Name, Backend=Backend, Quantize=Quantize)
+        vectors = np.asarray(embeddings.embed_documents([Queries[i] for i in missing]), dtype=np.float32)
+        cache.Put_Many(cache_key, [Queries[i] for i in missing], vectors)
+        found.update(zip(missing, vectors))
+    if not Queries:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([found[i] for i in range(len(Queries))])
+
+
+def Search_Annoy_Index_Batch(index, query_embeddings, num_results=10, search_k=500):
+    """
+    Recherche les plus proches voisins de plusieurs requêtes en parallèle (pool de threads).
+
+    Returns:
+        (indices, distances) : matrices (nombre de requêtes, num_results) ; quand Annoy
+        trouve moins de num_results voisins, les cases restantes valent -1 et inf.
+    """
+    query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+    indices = np.full((len(query_embeddings), num_results), -1, dtype=np.int64)
+    distances = np.full((len(query_embeddings), num_results), np.inf, dtype=np.float32)
+
+    def Search(row):
+        return index.get_nns_by_vector(query_embeddings[row].tolist(), num_results, search_k=search_k, include_distances=True)
+
+    if len(query_embeddings) == 1:
+        results = [Search(0)]
+    else:
+        results = Get_Search_Pool().map(Search, range(len(query_embeddings)))
+    for row, (row_indices, row_distances) in enumerate(results):
+        indices[row, :len(row_indices)] = row_indices
+        distances[row, :len(row_distances)] = row_distances
+    return indices, distances
+
+
+def Retrieve_Batch(Model_Name, Annoy_Index, Queries, Num_Results=10, Search_K=500, Backend="PyTorch", Quantize=False):
+    """
+    Embedde les requêtes en une passe puis cherche leurs voisins en parallèle.
+
+    Returns:
+        (indices, distances) par requête, voir Search_Annoy_Index_Batch.
+    """
+    query_embeddings = Embed_Queries(Model_Name, Queries, Backend=Backend, Quantize=Quantize)
+    print(f"Embedded {len(Queries)} queries, size of query embedding: {query_embeddings.shape[1]}")
+    return Search_Annoy_Index_Batch(Annoy_Index, query_embeddings, Num_Results, search_k=Search_K)
+
+
 def Get_Chunk_By_Index(chunks, index):
     """
     Retourne les chunks correspondants aux indices fournis.
@@ -41,16 +121,15 @@ def Get_Chunk_By_Index(chunks, index):
 
 
 
-def Retrieve_Chunks_Straight(Model_Name,Annoy_Index, Query, Chunks, Num_Results=10,Search_K = 500):
+def Retrieve_Chunks_Straight(Model_Name,Annoy_Index, Query, Chunks, Num_Results=10,Search_K = 500, Backend="PyTorch", Quantize=False):
     """
     Récupère les chunks les plus pertinents en fonction de la requête.
     """
     if not Annoy_Index or not Query or not Chunks:
         return []
 
-    # Créer l'embedding pour la requête
-    embeddings = HuggingFaceEmbeddings(model_name=Model_Name)
-    query_embedding = embeddings.embed_query(Query)
+    # Créer l'embedding pour la requête (cache de requêtes, puis modèle chargé une fois par processus)
+    query_embedding = Embed_Queries(Model_Name, [Query], Backend=Backend, Quantize=Quantize)[0].tolist()
     print(f"Size of query embedding: {len(query_embedding)}")
     # Rechercher dans l'index Annoy
     indices,distances = Search_Annoy_Index(Annoy_Index, query_embedding, Num_Results,search_k=Search_K)
@@ -64,22 +143,18 @@ def Retrieve_Chunks_Straight(Model_Name,Annoy_Index, Query, Chunks, Num_Results=
 
 # Multi_Query Retrieval
 
-def Retrieve_Chunks_Multi_Query(Model_Name, Annoy_Index, Queries, Chunks, Num_Results=10, Search_K=500):
+def Retrieve_Chunks_Multi_Query(Model_Name, Annoy_Index, Queries, Chunks, Num_Results=10, Search_K=500, Backend="PyTorch", Quantize=False):
     """
     Récupère les chunks les plus pertinents en fonction de plusieurs requêtes, en garantissant l'unicité des résultats.
     """
     if not Annoy_Index or not Queries or not Chunks:
         return []
 
-    unique_indices = set()
-    embeddings = HuggingFaceEmbeddings(model_name=Model_Name)
-    for Query in Queries:
-        query_embedding = embeddings.embed_query(Query)
-        print(f"Size of query embedding: {len(query_embedding)}")
-        indices,distances = Search_Annoy_Index(Annoy_Index, query_embedding, Num_Results, search_k=Search_K)
-        unique_indices.update(indices)
+    indices, _ = Retrieve_Batch(Model_Name, Annoy_Index, Queries, Num_Results, Search_K=Search_K, Backend=Backend, Quantize=Quantize)
+    # Indices uniques, dans l'ordre de première apparition
+    unique_indices = list(dict.fromkeys(int(i) for i in indices.ravel() if i >= 0))
 
-    result_chunks = Get_Chunk_By_Index(Chunks, list(unique_indices))
+    result_chunks = Get_Chunk_By_Index(Chunks, unique_indices)
     return result_chunks
 
 
@@ -103,21 +178,15 @@ def reciprocal_rank_fusion(results_lists, k=60):
     return [item for item, score in ranked_items]
 
 
-def Retrieve_Chunks_RAG_Fusion(Model_Name, Annoy_Index, Queries, Chunks, Num_Results=10, Search_K=500):
+def Retrieve_Chunks_RAG_Fusion(Model_Name, Annoy_Index, Queries, Chunks, Num_Results=10, Search_K=500, Backend="PyTorch", Quantize=False):
     """
     Récupère les chunks les plus pertinents en fonction de plusieurs requêtes et fusionne les résultats avec RRF.
     """
     if not Annoy_Index or not Queries or not Chunks:
         return []
 
-    embeddings = HuggingFaceEmbeddings(model_name=Model_Name)
-    all_indices = []
-
-    for Query in tqdm(Queries, desc="Processing Queries"):
-        query_embedding = embeddings.embed_query(Query)
-        print(f"Size of query embedding: {len(query_embedding)}")
-        indices, _ = Search_Annoy_Index(Annoy_Index, query_embedding, Num_Results, search_k=Search_K)
-        all_indices.append(indices)
+    indices, _ = Retrieve_Batch(Model_Name, Annoy_Index, Queries, Num_Results, Search_K=Search_K, Backend=Backend, Quantize=Quantize)
+    all_indices = [[int(i) for i in row if i >= 0] for row in indices]
 
     fused_indices = reciprocal_rank_fusion(all_indices)
     result_chunks = Get_Chunk_By_Index(Chunks, fused_indices)
@@ -3,43 +3,143 @@ from Embeddings_Chunks import *
 from Retrieval import *
 from Generation import *
 from Multi_Querry import *
+from Wikitext_Cleaning import Clean_Corpus
+from Corpus_Store import Is_Corpus_Store
+from Pipeline import Run_Streaming_Pipeline
+from Chunk_Manifest import ChunkManifest, Rechunk_Incremental, Save_Chunk_Delta, Update_Embeddings
+from Chunk_Store import ChunkStore, Is_Chunk_Store, Save_Chunks_To_Chunk_Store
+from Chunk_Deduplication import Deduplicate_Chunks, Save_Duplicate_Map, Report_Deduplication_Savings
+from Embedding_Cache import CACHE_MAX_BYTES, EmbeddingCache, Embed_With_Cache
+from Embedding_Shards import SHARD_SIZE, Embed_Chunks_Sharded
+from Embedder_Registry import Get_Embedder
 
 
 
 class WikipediaRAG:
-    def __init__(self, Data_Folder_Path, Embedding_Model="BAAI/bge-small-en",Batch_Size_Embedding=16, Search_K = 500,Api_Url="http://localhost:11434/api/generate", Model_Name="llama3",Use_Multi_Query=False, Use_Rag_Fusion = False,Nb_Chunks_To_Retrieve = 5, Nb_Multi_Querries=5):
+    def __init__(self, Data_Folder_Path, Embedding_Model="BAAI/bge-small-en",Batch_Size_Embedding=16, Search_K = 500,Api_Url="http://localhost:11434/api/generate", Model_Name="llama3",Use_Multi_Query=False, Use_Rag_Fusion = False,Nb_Chunks_To_Retrieve = 5, Nb_Multi_Querries=5, Token_Budget_Embedding=None, Nb_Embedding_Processes=1, Embeddings_Dtype="float32", Embedding_Cache_Path=None, Embedding_Cache_Max_Bytes=CACHE_MAX_BYTES, Embedding_Backend="PyTorch", Quantize_Embeddings=False):
         self.Data_Folder_Path = Data_Folder_Path
         self.Embedding_Model = Embedding_Model
         self.Api_Url = Api_Url
         self.Model_Name = Model_Name
         self.Batch_Size_Embedding = Batch_Size_Embedding
+        # Budget de tokens (paddés) par batch : si fourni, les chunks sont regroupés par longueur
+        self.Token_Budget_Embedding = Token_Budget_Embedding
+        # Nombre de processus d'embedding (1 : un seul processus, None : un par cœur)
+        self.Nb_Embedding_Processes = Nb_Embedding_Processes
+        # Type des embeddings sauvegardés en .npy ("float32" ou "float16", deux fois plus compact)
+        self.Embeddings_Dtype = Embeddings_Dtype
+        # Cache persistant (modèle, texte) -> vecteur : seuls les textes absents sont embeddés
+        self.Embedding_Cache_Path = Embedding_Cache_Path
+        self.Embedding_Cache_Max_Bytes = Embedding_Cache_Max_Bytes
+        # Backend d'embedding des chunks : "PyTorch" ou "Onnx" (ONNX Runtime, quantifié en int8 avec Quantize_Embeddings)
+        self.Embedding_Backend = Embedding_Backend
+        self.Quantize_Embeddings = Quantize_Embeddings
         self.Search_K = Search_K  # Number of neighbors to search for in Annoy index
         self.Use_Multi_Query = Use_Multi_Query
         self.Use_Rag_Fusion = Use_Rag_Fusion
         self.Nb_Multi_Querries = Nb_Multi_Querries
         self.Nb_Chunks_To_Retrieve = Nb_Chunks_To_Retrieve
-    def Chunk_Articles(self, Chunk_Size=1000, Chunk_Overlap=200):
+    def Clean_Articles(self, Raw_Data_Folder_Path, Min_Characters=500, Chunk_Size=1000, Chunk_Overlap=200):
         """
-        Charge les articles Wikipedia, les divise en chunks.
+        Nettoie le wikitexte brut de Raw_Data_Folder_Path (modèles, références, tableaux,
+        balisage ; redirections, homonymies et ébauches ignorées) et écrit le résultat
+        dans Data_Folder_Path. Retourne les statistiques de nettoyage.
+        """
+        return Clean_Corpus(Raw_Data_Folder_Path, self.Data_Folder_Path, Min_Characters=Min_Characters,
+                            Chunk_Size=Chunk_Size, Chunk_Overlap=Chunk_Overlap)
+
+    def Run_Pipeline(self, Titles=None, Documents=None, Chunks_Path="Chunks/chunks.jsonl",
+                     Index_Path="Annoy_Index/wikipedia_index.ann", Num_Trees=10, **Kwargs):
+        """
+        Construit chunks et index Annoy en flux (téléchargement → nettoyage → découpage
+        → embedding → index) avec des files bornées, en mémoire constante.
+        Voir Pipeline.Run_Streaming_Pipeline pour les paramètres supplémentaires.
+        """
+        Kwargs.setdefault("Embedder", self.Get_Embedder())
+        return Run_Streaming_Pipeline(
+            Titles=Titles, Documents=Documents, Chunks_Path=Chunks_Path, Index_Path=Index_Path,
+            Embedding_Model=self.Embedding_Model, Batch_Size_Embedding=self.Batch_Size_Embedding,
+            Num_Trees=Num_Trees, **Kwargs
+        )
+
+    def Chunk_Articles(self, Chunk_Size=1000, Chunk_Overlap=200, Nb_Workers=1, Files_Per_Task=16):
+        """
+        Charge les articles Wikipedia (dossier de .txt ou corpus compacté), les divise en chunks.
+        Avec Nb_Workers > 1 (ou None : un par cœur), les fichiers d'un dossier sont
+        découpés en parallèle par un pool de processus, avec un résultat identique.
         """
         Text_Splitter = Create_Text_Splitter(Chunk_Size=Chunk_Size, Chunk_Overlap=Chunk_Overlap)
-        Chunks = Chunk_Text_Of_Folder(self.Data_Folder_Path, Text_Splitter, Extension=".txt")
+        if Is_Corpus_Store(self.Data_Folder_Path):
+            Chunks = Chunk_Text_Of_Corpus_Store(self.Data_Folder_Path, Text_Splitter)
+        elif Nb_Workers != 1:
+            Chunks = Chunk_Text_Of_Folder_Parallel(self.Data_Folder_Path, Text_Splitter, Extension=".txt",
+                                                   Nb_Workers=Nb_Workers, Files_Per_Task=Files_Per_Task)
+        else:
+            Chunks = Chunk_Text_Of_Folder(self.Data_Folder_Path, Text_Splitter, Extension=".txt")
         return Chunks
 
 
+    def Chunk_Articles_Incremental(self, Previous_Chunks=None, Manifest_Path="Chunks/manifest.json",
+                                   Chunk_Size=1000, Chunk_Overlap=200):
+        """
+        Ne redécoupe que les articles ajoutés ou modifiés depuis le dernier passage
+        (manifeste d'empreintes) et reprend les autres chunks de Previous_Chunks.
+        Chaque chunk porte un identifiant stable (metadata["chunk_id"]).
+        Retourne (chunks, delta) ; voir Chunk_Manifest.Rechunk_Incremental.
+        """
+        Manifest = ChunkManifest(Manifest_Path, Chunk_Size=Chunk_Size, Chunk_Overlap=Chunk_Overlap)
+        Text_Splitter = Create_Text_Splitter(Chunk_Size=Chunk_Size, Chunk_Overlap=Chunk_Overlap)
+        Chunks, Delta = Rechunk_Incremental(self.Data_Folder_Path, Text_Splitter, Manifest, Previous_Chunks)
+        Manifest.Save()
+        return Chunks, Delta
+
+    def Save_Chunk_Delta(self, Delta, Saving_Path):
+        """
+        Sauvegarde le delta du dernier découpage incrémental (identifiants ajoutés et retirés).
+        """
+        Save_Chunk_Delta(Delta, Saving_Path)
+
     def Save_Chunks(self, Chunks, Saving_Path):
         """
-        Sauvegarde les chunks dans un fichier pickle.
+        Sauvegarde les chunks dans un fichier pickle, ou dans un ChunkStore si
+        Saving_Path est un dossier (chemin sans extension .pickle).
         """
+        if not Saving_Path.endswith(".pickle"):
+            Save_Chunks_To_Chunk_Store(Chunks, Saving_Path)
+            return
         Save_Chunks_To_Pickle(Chunks, Saving_Path)
 
     def Load_Chunks(self, Saving_Path):
         """
-        Charge les chunks à partir d'un fichier pickle.
+        Charge les chunks à partir d'un fichier pickle (ou JSONL écrit par le pipeline en flux).
+        Un dossier ChunkStore est ouvert en memory-map : les textes ne sont lus qu'à l'accès.
         """
+        if Is_Chunk_Store(Saving_Path):
+            return ChunkStore(Saving_Path)
+        if Saving_Path.endswith(".jsonl"):
+            return Load_Chunks_From_Jsonl(Saving_Path)
         Chunks = Load_Chunks_From_Pickle(Saving_Path)
         return Chunks
     
+    def Deduplicate_Chunks(self, Chunks, Threshold=0.85, Num_Perm=128, Shingle_Size=5, Duplicates_Path=None):
+        """
+        Retire les doublons exacts et quasi-doublons (MinHash/LSH) avant l'embedding.
+        La correspondance doublon -> chunk canonique est sauvegardée dans Duplicates_Path si fourni.
+
+        Returns:
+            (chunks gardés, correspondance {indice du doublon: indice canonique}, statistiques)
+        """
+        Kept, Duplicate_Map, Stats = Deduplicate_Chunks(Chunks, Threshold=Threshold, Num_Perm=Num_Perm, Shingle_Size=Shingle_Size)
+        if Duplicates_Path is not None:
+            Save_Duplicate_Map(Chunks, Duplicate_Map, Duplicates_Path)
+        return Kept, Duplicate_Map, Stats
+
+    def Report_Deduplication_Savings(self, Stats, Seconds_Per_Chunk, Embedding_Size, Index_Bytes=None):
+        """
+        Estime le temps d'embedding et la taille d'index économisés par la déduplication.
+        """
+        return Report_Deduplication_Savings(Stats, Seconds_Per_Chunk, Embedding_Size, Index_Bytes)
+
     def Access_Text_Of_Chunks(self, Chunks):
         """
         Retourne une liste des textes de chaque chunk dans Chunks, avec une barre de progression.
@@ -48,19 +148,72 @@ class WikipediaRAG:
         return Texts_Of_Chunks
     
     
-    def Embed_Chunks(self, Chunks):
+    def Embed_Chunks(self, Chunks, Output_Path=None):
         """
-        Crée des embeddings pour les chunks de texte.
+        Crée des embeddings pour les chunks de texte (matrice NumPy). Avec Output_Path (.npy),
+        ils sont écrits directement dans une matrice memory-mappée sur disque.
+        Si Embedding_Cache_Path est défini, le cache est consulté d'abord pour tous les chunks.
         """
-        Embedder = Create_Embedder(Embedding_Model=self.Embedding_Model)
-        Embeddings = Embed_Chunks(Chunks, Embedder, batch_size=self.Batch_Size_Embedding)
+        if self.Embedding_Cache_Path:
+            with EmbeddingCache(self.Embedding_Cache_Path, Max_Bytes=self.Embedding_Cache_Max_Bytes) as Cache:
+                return Embed_With_Cache(Chunks, Cache, self.Embedder_Key(), self.Compute_Embeddings,
+                                        Output_Path=Output_Path, Dtype=self.Embeddings_Dtype)
+        return self.Compute_Embeddings(Chunks, Output_Path)
+
+    def Get_Embedder(self, Warm_Up=False):
+        """
+        Embedder du modèle partagé par tout le processus (chargé une fois, voir Embedder_Registry).
+        """
+        return Get_Embedder(self.Embedding_Model, Backend=self.Embedding_Backend, Quantize=self.Quantize_Embeddings,
+                            Warm_Up=Warm_Up)
+
+    def Warm_Up_Embedder(self):
+        """
+        Charge le modèle d'embedding et fait une passe factice (à appeler au démarrage d'un serveur).
+        """
+        return self.Get_Embedder(Warm_Up=True)
+
+    def Embedder_Key(self):
+        """
+        Nom des vecteurs produits dans le cache et les shards (voir Embeddings_Chunks.Embedder_Name).
+        """
+        return Embedder_Name(self.Embedding_Model, self.Embedding_Backend, self.Quantize_Embeddings)
+
+    def Compute_Embeddings(self, Chunks, Output_Path=None):
+        """
+        Calcule les embeddings avec le modèle, sans passer par le cache.
+        """
+        if self.Nb_Embedding_Processes != 1:
+            return Embed_Chunks_Parallel(Chunks, self.Embedding_Model, nb_workers=self.Nb_Embedding_Processes,
+                                         batch_size=self.Batch_Size_Embedding, token_budget=self.Token_Budget_Embedding,
+                                         output_path=Output_Path, dtype=self.Embeddings_Dtype,
+                                         backend=self.Embedding_Backend, quantize=self.Quantize_Embeddings)
+        Shared = self.Get_Embedder()
+        with Shared.Lock:
+            Embeddings = Embed_Chunks(Chunks, Shared.Embedder, batch_size=self.Batch_Size_Embedding,
+                                      token_budget=self.Token_Budget_Embedding, output_path=Output_Path, dtype=self.Embeddings_Dtype)
         return Embeddings
     
+    def Embed_Chunks_Resumable(self, Chunks, Shards_Folder, Output_Path=None, Shard_Size=SHARD_SIZE, Resume=True, Shard_Stats=None):
+        """
+        Embedde les chunks par shards écrits sur disque au fil du calcul ; relancé après une
+        interruption, il ignore les shards déjà terminés. Voir Embedding_Shards.Embed_Chunks_Sharded.
+        """
+        return Embed_Chunks_Sharded(Chunks, self.Embed_Chunks, Shards_Folder, Output_Path=Output_Path, Shard_Size=Shard_Size,
+                                    Model_Name=self.Embedder_Key(), Dtype=self.Embeddings_Dtype, Resume=Resume,
+                                    Shard_Stats=Shard_Stats)
+
+    def Embed_Chunks_Incremental(self, Chunks, Previous_Chunks, Previous_Embeddings):
+        """
+        Réutilise les embeddings des chunks inchangés (même chunk_id) et n'embedde que les nouveaux.
+        """
+        return Update_Embeddings(Previous_Chunks, Previous_Embeddings, Chunks, self.Embed_Chunks)
+
     def Save_Embeddings_Of_Chunks(self, Embeddings, Saving_Path):
         """
-        Sauvegarde les embeddings dans un fichier.
+        Sauvegarde les embeddings dans un fichier (.npy : matrice dense avec sa description .json).
         """
-        Save_Embeddings(Embeddings, Saving_Path)
+        Save_Embeddings(Embeddings, Saving_Path, model_name=self.Embedder_Key(), dtype=self.Embeddings_Dtype)
 
 
     def Load_Embeddings_Of_Chunks(self, Saving_Path):
@@ -80,6 +233,12 @@ class WikipediaRAG:
         Save_Annoy_Index(Index, File_Path)
         return Index
 
+    def Exact_Search(self, Embeddings, Query_Embedding, Num_Results=5):
+        """
+        Recherche exacte par blocs dans la matrice d'embeddings (référence pour le rappel d'Annoy).
+        """
+        return Exact_Search(Embeddings, Query_Embedding, num_results=Num_Results)
+
     def Load_Annoy_Index(self, File_Path, Embedding_Size):
         """
         Charge un index Annoy à partir d'un fichier.
@@ -107,14 +266,17 @@ class WikipediaRAG:
             Multi_Queries = self.Generate_Multi_Queries(Query=Query)
 
             Result_Chunks = Retrieve_Chunks_Multi_Query(self.Embedding_Model,Annoy_Index, Multi_Queries, Chunks, Num_Results,
-                                                  Search_K=self.Search_K)
+                                                  Search_K=self.Search_K, Backend=self.Embedding_Backend,
+                                                  Quantize=self.Quantize_Embeddings)
         elif self.Use_Rag_Fusion : 
             Multi_Queries = self.Generate_Multi_Queries(Query=Query)
             Result_Chunks = Retrieve_Chunks_RAG_Fusion(self.Embedding_Model, Annoy_Index, Multi_Queries, Chunks, Num_Results,
-                                                  Search_K=self.Search_K)
+                                                  Search_K=self.Search_K, Backend=self.Embedding_Backend,
+                                                  Quantize=self.Quantize_Embeddings)
         else :  
             Result_Chunks = Retrieve_Chunks_Straight(self.Embedding_Model, Annoy_Index, Query, Chunks, Num_Results,
-                                                  Search_K=self.Search_K)
+                                                  Search_K=self.Search_K, Backend=self.Embedding_Backend,
+                                                  Quantize=self.Quantize_Embeddings)
         return Result_Chunks
     
     def Generate_Response(self, Query, Chunk_Sources, Resource_Template=Define_Default_Resource_Template()):
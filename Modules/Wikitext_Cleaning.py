@@ -0,0 +1,336 @@
+import html
+import math
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from tqdm.auto import tqdm
+from Corpus_Store import CorpusStore, Is_Corpus_Store
+
+
+
+
+# ================ DÉTECTION DES PAGES À IGNORER =====================
+
+REDIRECT_PATTERN = re.compile(r"^\s*#REDIRECT", re.IGNORECASE)
+DISAMBIGUATION_PATTERN = re.compile(
+    r"\{\{\s*(disambiguation|disambig|dab|hndis|geodis|numberdis|letter-number combination disambiguation)\s*[|}]",
+    re.IGNORECASE
+)
+STUB_TEMPLATE_PATTERN = re.compile(r"\{\{[^{}|]*-stub\s*\}\}", re.IGNORECASE)
+
+# ================ NETTOYAGE =====================
+
+COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+REF_PATTERN = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref\s*>", re.DOTALL | re.IGNORECASE)
+MATH_PATTERN = re.compile(r"<math[^>]*>(.*?)</math\s*>", re.DOTALL | re.IGNORECASE)
+# Marqueur opaque (caractères à usage privé) : aucune autre expression ne le modifie
+MATH_PLACEHOLDER = "\ue000{}\ue001"
+MATH_PLACEHOLDER_PATTERN = re.compile("\ue000(\\d+)\ue001")
+DROPPED_BLOCK_PATTERN = re.compile(
+    r"<(gallery|timeline|imagemap|templatedata|graph|mapframe)[^>]*>.*?</\1\s*>", re.DOTALL | re.IGNORECASE
+)
+TEMPLATE_PATTERN = re.compile(r"\{\{([^{}]*)\}\}")
+TABLE_PATTERN = re.compile(r"\{\|(?:(?!\{\|).)*?\|\}", re.DOTALL)
+PIPED_LINK_PATTERN = re.compile(r"\[\[([^\[\]|]*)\|([^\[\]]*)\]\]")
+LINK_PATTERN = re.compile(r"\[\[([^\[\]|]*)\]\]")
+EXTERNAL_LINK_PATTERN = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+BOLD_ITALIC_PATTERN = re.compile(r"'{2,5}")
+HEADING_PATTERN = re.compile(r"^(=+)\s*(.*?)\s*=+\s*$")
+HTML_TAG_PATTERN = re.compile(r"</?[a-zA-Z][^>]*>")
+MAGIC_WORD_PATTERN = re.compile(r"__[A-Z]+__")
+LIST_MARKUP_PATTERN = re.compile(r"^[*#:;]+\s*", re.MULTILINE)
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+# Liens vers des fichiers, des catégories ou d'autres langues : supprimés
+DROPPED_LINK_PREFIXES = ("file:", "image:", "media:", "category:")
+INTERLANGUAGE_PATTERN = re.compile(r"^[a-z]{2,3}(-[a-z]+)?:")
+# Modèles dont on garde le premier paramètre (formules, mise en forme)
+INLINE_TEMPLATES = {"math", "mvar", "nowrap", "nobr", "var", "em", "strong", "small", "big", "sub", "sup", "sfrac"}
+# Sections finales sans intérêt pour répondre à une question
+DROPPED_SECTIONS = {
+    "references", "external links", "see also", "further reading", "notes",
+    "bibliography", "sources", "citations", "footnotes", "notes and references",
+}
+
+
+def Detect_Skip_Reason(Wikitext: str, Cleaned_Text: str = None, Min_Characters: int = 500) -> str:
+    """
+    Retourne la raison d'ignorer une page ("redirect", "disambiguation", "stub") ou None.
+    Une page est une ébauche si elle porte un modèle *-stub ou si son texte nettoyé
+    fait moins de Min_Characters caractères.
+    """
+    if REDIRECT_PATTERN.match(Wikitext):
+        return "redirect"
+    if DISAMBIGUATION_PATTERN.search(Wikitext):
+        return "disambiguation"
+    if STUB_TEMPLATE_PATTERN.search(Wikitext):
+        return "stub"
+    if Cleaned_Text is not None and len(Cleaned_Text) < Min_Characters:
+        return "stub"
+    return None
+
+
+def Replace_Template(Match: re.Match) -> str:
+    Parts = [Part.strip() for Part in Match.group(1).split("|")]
+    Name = Parts[0].lower()
+    # Paramètres positionnels (les paramètres nommés "x=..." sont ignorés, sauf "1=")
+    Positional = [Part[2:] if Part.startswith("1=") else Part
+                  for Part in Parts[1:] if "=" not in Part or Part.startswith("1=")]
+    if Name in INLINE_TEMPLATES and Positional:
+        return Positional[0]
+    if Name == "lang" and Positional:
+        return Positional[-1]
+    if Name in ("convert", "cvt") and len(Positional) >= 2:
+        return f"{Positional[0]} {Positional[1]}"
+    return ""
+
+
+def Replace_Link(Target: str, Label: str) -> str:
+    Target = Target.strip()
+    if Target.lower().startswith(DROPPED_LINK_PREFIXES) or INTERLANGUAGE_PATTERN.match(Target):
+        return ""
+    return Label
+
+
+def Replace_Until_Stable(Text: str, Replacements) -> str:
+    """
+    Applique les remplacements jusqu'à stabilité : chaque passe retire le niveau
+    d'imbrication le plus interne (modèles, tableaux, liens dans des légendes).
+    """
+    while True:
+        New_Text = Text
+        for Pattern, Replacement in Replacements:
+            New_Text = Pattern.sub(Replacement, New_Text)
+        if New_Text == Text:
+            return Text
+        Text = New_Text
+
+
+def Drop_Sections_And_Headings(Text: str) -> str:
+    Lines = []
+    Dropped_Level = None
+    for Line in Text.split("\n"):
+        Heading = HEADING_PATTERN.match(Line)
+        if Heading:
+            Level = len(Heading.group(1))
+            if Dropped_Level is not None and Level > Dropped_Level:
+                continue
+            if Heading.group(2).strip().lower() in DROPPED_SECTIONS:
+                Dropped_Level = Level
+                continue
+            Dropped_Level = None
+            Lines.append("")
+            Lines.append(Heading.group(2))
+            continue
+        if Dropped_Level is None:
+            Lines.append(Line)
+    return "\n".join(Lines)
+
+
+def Clean_Wikitext(Wikitext: str) -> str:
+    """
+    Convertit du wikitexte brut en texte simple : supprime commentaires, références,
+    modèles, infobox, tableaux, fichiers, catégories et balisage, en conservant
+    le texte des liens, les titres de sections et les formules (<math> -> $...$).
+    Les formules sont mises de côté pendant le nettoyage : leurs accolades, crochets
+    et apostrophes ne doivent pas être pris pour des modèles, liens ou du gras.
+    """
+    Formulas = []
+
+    def Hide_Formula(Match: re.Match) -> str:
+        Formulas.append(Match.group(1).strip())
+        return MATH_PLACEHOLDER.format(len(Formulas) - 1)
+
+    def Restore_Formula(Match: re.Match) -> str:
+        Formula = html.unescape(Formulas[int(Match.group(1))]).replace("\xa0", " ")
+        return f"${Formula}$"
+
+    Text = COMMENT_PATTERN.sub("", Wikitext)
+    Text = REF_PATTERN.sub("", Text)
+    Text = DROPPED_BLOCK_PATTERN.sub("", Text)
+    Text = MATH_PATTERN.sub(Hide_Formula, Text)
+    Text = Replace_Until_Stable(Text, [
+        (TEMPLATE_PATTERN, Replace_Template),
+        (TABLE_PATTERN, ""),
+    ])
+    Text = Replace_Until_Stable(Text, [
+        (PIPED_LINK_PATTERN, lambda Match: Replace_Link(Match.group(1), Match.group(2))),
+        (LINK_PATTERN, lambda Match: Replace_Link(Match.group(1), Match.group(1))),
+    ])
+    Text = EXTERNAL_LINK_PATTERN.sub(r"\1", Text)
+    Text = BOLD_ITALIC_PATTERN.sub("", Text)
+    Text = MAGIC_WORD_PATTERN.sub("", Text)
+    Text = HTML_TAG_PATTERN.sub("", Text)
+    Text = html.unescape(Text).replace("\xa0", " ")
+    Text = Drop_Sections_And_Headings(Text)
+    Text = LIST_MARKUP_PATTERN.sub("", Text)
+    Text = "\n".join(Line.rstrip() for Line in Text.split("\n"))
+    Text = BLANK_LINES_PATTERN.sub("\n\n", Text)
+    Text = MATH_PLACEHOLDER_PATTERN.sub(Restore_Formula, Text)
+    return Text.strip()
+
+
+# ================ ÉTAPE DE NETTOYAGE EN FLUX =====================
+
+def Estimate_Nb_Chunks(Nb_Characters: int, Chunk_Size: int = 1000, Chunk_Overlap: int = 200) -> int:
+    """
+    Estime le nombre de chunks produits par un texte de Nb_Characters caractères.
+    """
+    if Nb_Characters <= 0:
+        return 0
+    if Nb_Characters <= Chunk_Size:
+        return 1
+    return math.ceil((Nb_Characters - Chunk_Overlap) / (Chunk_Size - Chunk_Overlap))
+
+
+def New_Cleaning_Stats() -> Dict[str, int]:
+    return {
+        "pages_read": 0, "pages_kept": 0,
+        "skipped_redirect": 0, "skipped_disambiguation": 0, "skipped_stub": 0,
+        "characters_in": 0, "characters_out": 0,
+        "chunks_in": 0, "chunks_out": 0,
+    }
+
+
+def Clean_Documents(
+    Documents: Iterable[Tuple[str, str]],
+    Stats: Dict[str, int] = None,
+    Min_Characters: int = 500,
+    Chunk_Size: int = 1000,
+    Chunk_Overlap: int = 200
+) -> Iterator[Tuple[str, str]]:
+    """
+    Nettoie en flux des documents (nom, wikitexte) et produit les couples
+    (nom, texte nettoyé) des pages conservées. Stats est mis à jour au fil de l'eau.
+    """
+    if Stats is None:
+        Stats = New_Cleaning_Stats()
+    for Name, Wikitext in Documents:
+        Stats["pages_read"] += 1
+        Stats["characters_in"] += len(Wikitext)
+        Stats["chunks_in"] += Estimate_Nb_Chunks(len(Wikitext), Chunk_Size, Chunk_Overlap)
+
+        Reason = Detect_Skip_Reason(Wikitext)
+        Cleaned_Text = None
+        if Reason is None:
+            Cleaned_Text = Clean_Wikitext(Wikitext)
+            Reason = Detect_Skip_Reason(Wikitext, Cleaned_Text, Min_Characters)
+        if Reason is not None:
+            Stats[f"skipped_{Reason}"] += 1
+            continue
+
+        Stats["pages_kept"] += 1
+        Stats["characters_out"] += len(Cleaned_Text)
+        Stats["chunks_out"] += Estimate_Nb_Chunks(len(Cleaned_Text), Chunk_Size, Chunk_Overlap)
+        yield Name, Cleaned_Text
+
+
+def Print_Cleaning_Report(Stats: Dict[str, int]):
+    Saved_Characters = Stats["characters_in"] - Stats["characters_out"]
+    Saved_Chunks = Stats["chunks_in"] - Stats["chunks_out"]
+    print(f"Pages : {Stats['pages_read']} lues, {Stats['pages_kept']} conservées "
+          f"({Stats['skipped_redirect']} redirections, {Stats['skipped_disambiguation']} homonymies, "
+          f"{Stats['skipped_stub']} ébauches ignorées)")
+    print(f"Caractères : {Stats['characters_in']} -> {Stats['characters_out']} "
+          f"({Saved_Characters} économisés, {100 * Saved_Characters / max(1, Stats['characters_in']):.1f} %)")
+    print(f"Chunks estimés : {Stats['chunks_in']} -> {Stats['chunks_out']} "
+          f"({Saved_Chunks} économisés, {100 * Saved_Chunks / max(1, Stats['chunks_in']):.1f} %)")
+
+
+def Iterate_Folder_Documents(Folder_Path: str, Extension: str = ".txt") -> Iterator[Tuple[str, str]]:
+    for File_Name in sorted(os.listdir(Folder_Path)):
+        if not File_Name.endswith(Extension):
+            continue
+        with open(os.path.join(Folder_Path, File_Name), "r", encoding="utf-8") as f:
+            yield File_Name, f.read()
+
+
+def Write_Text_If_Changed(File_Path: str, Text: str) -> bool:
+    """
+    Écrit Text dans File_Path sauf si le fichier a déjà ce contenu (date de
+    modification inchangée : le mode incrémental ne le relit pas).
+    """
+    if os.path.isfile(File_Path):
+        with open(File_Path, "r", encoding="utf-8") as f:
+            if f.read() == Text:
+                return False
+    with open(File_Path, "w", encoding="utf-8") as f:
+        f.write(Text)
+    return True
+
+
+def Clean_Corpus(
+    Input_Path: str,
+    Output_Path: str,
+    Min_Characters: int = 500,
+    Chunk_Size: int = 1000,
+    Chunk_Overlap: int = 200
+) -> Dict[str, int]:
+    """
+    Étape de nettoyage entre le téléchargement et le chunking : lit les pages brutes
+    (dossier de .txt ou corpus compacté), écrit les pages nettoyées au même format
+    dans Output_Path et affiche les caractères et chunks économisés.
+    Seules les pages modifiées sont réécrites ; les pages de la sortie qui ne sont plus
+    produites (supprimées ou désormais ignorées) sont retirées, les autres fichiers
+    du dossier ne sont pas touchés.
+    """
+    Real_Input, Real_Output = os.path.realpath(Input_Path), os.path.realpath(Output_Path)
+    if os.path.commonpath([Real_Input, Real_Output]) in (Real_Input, Real_Output):
+        raise ValueError(f"Output_Path ({Output_Path}) must be outside Input_Path ({Input_Path}) and not contain it.")
+    Stats = New_Cleaning_Stats()
+
+    if Is_Corpus_Store(Input_Path):
+        Input_Store = CorpusStore(Input_Path, Read_Only=True)
+        with CorpusStore(Output_Path) as Output_Store:
+            Stale_Titles = set(Output_Store.Titles())
+            Documents = tqdm(Input_Store.Iterate_Documents(), total=len(Input_Store), desc="Cleaning pages")
+            for Title, Cleaned_Text in Clean_Documents(Documents, Stats, Min_Characters, Chunk_Size, Chunk_Overlap):
+                Output_Store.Put(Title, Cleaned_Text)
+                Stale_Titles.discard(Title)
+            for Title in Stale_Titles:
+                Output_Store.Delete(Title)
+        Input_Store.Close()
+    else:
+        os.makedirs(Output_Path, exist_ok=True)
+        Stale_File_Names = {File_Name for File_Name in os.listdir(Output_Path) if File_Name.endswith(".txt")}
+        Documents = tqdm(Iterate_Folder_Documents(Input_Path), desc="Cleaning pages")
+        for File_Name, Cleaned_Text in Clean_Documents(Documents, Stats, Min_Characters, Chunk_Size, Chunk_Overlap):
+            Write_Text_If_Changed(os.path.join(Output_Path, File_Name), Cleaned_Text)
+            Stale_File_Names.discard(File_Name)
+        for File_Name in Stale_File_Names:
+            os.remove(os.path.join(Output_Path, File_Name))
+
+    Print_Cleaning_Report(Stats)
+    return Stats
+
+
+# ================ VÉRIFICATION =====================
+
+# (wikitexte, texte attendu) : cas de régression de Clean_Wikitext
+CLEANING_CHECKS = [
+    (r"<math>x^{{2}} + \frac{a}{b}</math>", r"$x^{{2}} + \frac{a}{b}$"),
+    (r"Energy {{cite web|url=x}}is <math>E = m c^{2}</math>.", r"Energy is $E = m c^{2}$."),
+    (r"[[Derivative|Slope]] <math>f''(x) \in [a, b]</math>", r"Slope $f''(x) \in [a, b]$"),
+    (r"{{math|<math>a &lt; b</math>}} holds.", r"$a < b$ holds."),
+    (r"'''Euler''' : <math>\sum_{n} \left\{ {{n}} \right\}</math>", r"Euler : $\sum_{n} \left\{ {{n}} \right\}$"),
+]
+
+
+def Check_Clean_Wikitext(Checks: List[Tuple[str, str]] = CLEANING_CHECKS) -> List[Tuple[str, str, str]]:
+    """
+    Returns:
+        les cas en échec (wikitexte, attendu, obtenu).
+    """
+    Failures = []
+    for Wikitext, Expected in Checks:
+        Cleaned_Text = Clean_Wikitext(Wikitext)
+        if Cleaned_Text != Expected:
+            Failures.append((Wikitext, Expected, Cleaned_Text))
+    return Failures
+
+
+if __name__ == "__main__":
+    # Example usage
+    assert not Check_Clean_Wikitext(), Check_Clean_Wikitext()
+    Clean_Corpus("Data", "Data_Clean", Min_Characters=500, Chunk_Size=1000, Chunk_Overlap=200)
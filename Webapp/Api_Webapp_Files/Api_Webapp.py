@@ -2,7 +2,7 @@ import os
 from flask import Flask, render_template, send_from_directory
 from Api_Webapp_Home_Page import Api_Webapp_Home_Page
 from Api_Webapp_Wikipedia_Pages import Api_Webapp_Wikipedia_Pages
-from Api_Webapp_Rag_Using_Page import Api_Webapp_Rag_Using_Page
+from Api_Webapp_Rag_Using_Page import Api_Webapp_Rag_Using_Page, Warm_Up_Rag
 
 IN_DOCKER = os.environ.get('IN_DOCKER', False)
 
@@ -11,6 +11,7 @@ URL_API_WEBAPP = "0.0.0.0" if IN_DOCKER else "127.0.0.1"
 URL_API_MODEL = "model" if IN_DOCKER else "0.0.0.0"
 PORT_API_WEBAPP = 5000
 PORT_API_MODEL = 5001
+DEBUG = True
 
 # Définir les chemins absolus vers les dossiers 'Templates' et 'Static'
 template_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Templates')
@@ -30,4 +31,7 @@ def serve_static(filename):
     return send_from_directory(App.static_folder, filename)
 
 if __name__ == '__main__':
-    App.run(host=URL_API_WEBAPP, port=PORT_API_WEBAPP, debug=True)
\ No newline at end of file
+    # En debug, le processus de rechargement ne sert aucune requête : seul le serveur (WERKZEUG_RUN_MAIN) charge le modèle et le cache de requêtes
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        Warm_Up_Rag()
+    App.run(host=URL_API_WEBAPP, port=PORT_API_WEBAPP, debug=DEBUG)
\ No newline at end of file
@@ -8,6 +8,7 @@ MODULES_PATH = "Modules/"
 sys.path.append(MODULES_PATH)
 
 from Wikipedia_Rag import WikipediaRAG
+from Query_Cache import Configure_Query_Cache, Get_Query_Cache
 
 
 
@@ -51,6 +52,26 @@ MyRAG = WikipediaRAG(
     Nb_Multi_Querries=5
 )
 
+# Cache des embeddings de requêtes (questions répétées, reformulations identiques), sauvegardé entre deux démarrages
+QUERY_CACHE_MAX_ENTRIES = 10000
+QUERY_CACHE_TTL_SECONDS = 7 * 24 * 3600
+PATH_SAVING_QUERY_CACHE = "Embeddings/query_cache.pickle"
+
+def Warm_Up_Rag():
+    """
+    Charge et préchauffe le modèle d'embedding des requêtes au démarrage du serveur :
+    la première requête n'a plus à le charger depuis le disque. Le cache de requêtes
+    persistant n'est ouvert qu'ici, dans le processus qui sert les requêtes : en debug,
+    le processus de rechargement écraserait sinon le cache sauvegardé à sa sortie.
+    """
+    Configure_Query_Cache(Max_Entries=QUERY_CACHE_MAX_ENTRIES, TTL_Seconds=QUERY_CACHE_TTL_SECONDS,
+                          Persist_Path=PATH_SAVING_QUERY_CACHE)
+    MyRAG.Warm_Up_Embedder()
+
+@Api_Webapp_Rag_Using_Page.route('/Query_Cache_Stats', methods=["GET"])
+def Query_Cache_Stats_Api():
+    return jsonify({"status": "success", "stats": Get_Query_Cache().Get_Stats()})
+
 @Api_Webapp_Rag_Using_Page.route('/set_rag_mode', methods=["GET", "POST"])
 def Define_Rag_Mode():
     global Use_Multi_Query
@@ -93,6 +114,8 @@ def Define_Rag_Mode():
 
 
 PATH_SAVING_ANNOY_INDEX = "Annoy_Index/wikipedia_index.ann"
+# Dossier ChunkStore (memory-map, chargement immédiat) ; le pickle n'est utilisé qu'en l'absence du store
+PATH_SAVING_CHUNK_STORE = "Chunks/chunk_store"
 PATH_SAVING_CHUNKS = "Chunks/chunks.pickle"
 EMBEDDING_SIZE = 768  # Adjust this based on your embedding model
 Annoy_Index=None
@@ -118,7 +141,8 @@ def Load_Chunks_Api():
     global Text_Of_Chunks
     print("================== Load Chunks =====================")
     try:
-        Chunks = MyRAG.Load_Chunks(Saving_Path=PATH_SAVING_CHUNKS)
+        Chunks_Path = PATH_SAVING_CHUNK_STORE if os.path.isdir(PATH_SAVING_CHUNK_STORE) else PATH_SAVING_CHUNKS
+        Chunks = MyRAG.Load_Chunks(Saving_Path=Chunks_Path)
         Text_Of_Chunks = MyRAG.Access_Text_Of_Chunks(Chunks=Chunks)
 
         return jsonify({"status": "success", "message": "Chunks loaded successfully and texts extracted.", 
@@ -1,10 +1,19 @@
-from flask import Blueprint, request, jsonify, render_template, send_from_directory
+from flask import Blueprint, request, jsonify, render_template, send_from_directory, Response
 import os
+import sys
+
+MODULES_PATH = "Modules/"
+sys.path.append(MODULES_PATH)
+
+from Corpus_Store import CorpusStore, Is_Corpus_Store
 
 Api_Webapp_Wikipedia_Pages = Blueprint('Api_Webapp_Wikipedia_Pages', __name__, url_prefix='/Wikipedia_Pages')
 
 WIKIPEDIA_DATA_PATH = os.path.join("Data")
 
+# Corpus compacté ouvert une seule fois (None si Data/ contient des fichiers .txt)
+Corpus = CorpusStore(WIKIPEDIA_DATA_PATH, Read_Only=True) if Is_Corpus_Store(WIKIPEDIA_DATA_PATH) else None
+
 @Api_Webapp_Wikipedia_Pages.route('/')
 def Home_Page_Wikipedia_Pages():
     return render_template('Wikipedia_Pages.html')
@@ -14,8 +23,11 @@ def Home_Page_Wikipedia_Pages():
 def list_files():
     """
     Retourne la liste des fichiers .txt disponibles dans le dossier Data/
+    (ou des pages du corpus compacté, sous la forme '<titre>.txt').
     """
     try:
+        if Corpus is not None:
+            return jsonify(Corpus.File_Names())
         files = [f for f in os.listdir(WIKIPEDIA_DATA_PATH) if f.endswith(".txt")]
         return jsonify(files)
     except Exception as e:
@@ -30,6 +42,11 @@ def get_file(filename):
     Retourne le contenu d’un fichier texte depuis le dossier Data.
     """
     try:
+        if Corpus is not None:
+            if filename not in Corpus.Titles_By_File_Name:
+                raise FileNotFoundError(f"Page introuvable dans le corpus : {filename}")
+            return Response(Corpus.Get_By_File_Name(filename), mimetype='text/plain')
+
         # Construction du chemin absolu
         full_path = os.path.abspath(os.path.join(WIKIPEDIA_DATA_PATH, filename))
         print(f"✅ Envoi du fichier : {full_path}")